@@ -61,10 +61,11 @@ class BackendConfig(RunConfig):
     """Backend mode configuration"""
     mode: str = "backend"
     backend_mode: str = "deepsearch"  # deepsearch, general_assistant, repository_agent
-    api_type: str = "basic"  # basic, azure_openai, openai, claude, deepseek
+    api_type: str = "basic"  # basic, azure_openai, openai, claude, deepseek, local_stub
     temperature: float = 0.1
     max_tokens: int = 4000
     max_turns: int = 30
+    stream: bool = False
 
 @dataclass
 class DeepSearchConfig(BackendConfig):
@@ -184,7 +185,7 @@ class ModeConfigManager:
         
         # Backend-specific parameters  
         backend_params = base_params + [
-            'api_type', 'temperature', 'max_tokens', 'max_turns'
+            'api_type', 'temperature', 'max_tokens', 'max_turns', 'stream'
         ]
         
         # Filter parameters based on mode
@@ -307,6 +308,12 @@ def create_argument_parser() -> argparse.ArgumentParser:
         help='Maximum token count (default: 4000)'
     )
     
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream partial assistant text and tool progress to the terminal'
+    )
+    
     # Configuration check options
     parser.add_argument(
         '--skip-config-check',
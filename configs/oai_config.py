@@ -72,6 +72,15 @@ def get_api_config():
                 "api_key": os.environ.get("CLAUDE_API_KEY"),
                 "base_url": os.environ.get("CLAUDE_BASE_URL"),
             }],
+        },
+        # Local deterministic stand-in (src/utils/llm_stub_server.py), used for every request when LLM_STUB=1
+        'local_stub': {
+            "config_list": [{
+                "model": os.environ.get("LLM_STUB_MODEL", "stub-model"),
+                "api_key": os.environ.get("LLM_STUB_API_KEY", "stub"),
+                "base_url": os.environ.get("LLM_STUB_BASE_URL", "http://127.0.0.1:8765/v1"),
+                "price": [0.0, 0.0],
+            }],
         }
     }
 
@@ -81,39 +90,97 @@ service_config = {
     "code_explore": get_api_config()["basic"],
 }
 
+# Model tiers for auxiliary LLM calls (see src/utils/llm_tiers.py). A tier keeps the provider of
+# the call and swaps its model: "model" names it explicitly, otherwise "models" maps the configured
+# model to its tier counterpart and an unknown model is kept. The map only applies to first-party
+# OpenAI/Anthropic endpoints, never to azure deployments or custom base URLs, and a mapped model
+# the endpoint does not know falls back to the configured one. "provider" switches to another
+# get_api_config() entry and "price" is (prompt, completion) per 1k tokens for the cost metrics.
+model_tiers = {
+    "small": {
+        "model": os.environ.get("LLM_TIER_SMALL_MODEL", ""),
+        "provider": os.environ.get("LLM_TIER_SMALL_PROVIDER", ""),
+        "models": {
+            "gpt-4o": "gpt-4o-mini",
+            "gpt-4.1": "gpt-4.1-mini",
+            "gpt-5": "gpt-5-mini",
+            "claude-3-5-sonnet-20241022": "claude-3-5-haiku-20241022",
+            "claude-sonnet-4-20250514": "claude-3-5-haiku-20241022",
+        },
+    },
+    "medium": {
+        "model": os.environ.get("LLM_TIER_MEDIUM_MODEL", ""),
+        "provider": os.environ.get("LLM_TIER_MEDIUM_PROVIDER", ""),
+    },
+    "large": {
+        "model": os.environ.get("LLM_TIER_LARGE_MODEL", ""),
+        "provider": os.environ.get("LLM_TIER_LARGE_PROVIDER", ""),
+    },
+}
+
+# Auxiliary call type -> model tier. LLM_TIER_OVERRIDES="tool_summary=large,..." changes single
+# entries and LLM_TIER_FORCE=<tier> sends every auxiliary call to one tier.
+aux_task_tiers = {
+    "code_block_judge": "small",
+    "search_sufficiency": "small",
+    "query_rewrite": "small",
+    "tool_summary": "small",
+    "history_compression": "medium",
+    "dialog_optimization": "medium",
+}
+
 
 def get_default_provider():
     """Get the default API provider from environment variable or use the first in priority list."""
     return os.environ.get('DEFAULT_API_PROVIDER', DEFAULT_PROVIDER_PRIORITY[0])
 
-def get_provider_by_priority():
-    """Get the first available provider based on priority order."""
-    # First try the default provider
+def stub_provider_enabled():
+    """LLM_STUB=1 sends every request to the local stub server, started on demand."""
+    if os.environ.get("LLM_STUB", "0").lower() not in ("1", "true", "yes"):
+        return False
+    from src.utils.llm_stub_server import ensure_stub_server
+    ensure_stub_server()
+    return True
+
+def get_available_providers():
+    """Get all providers with an API key, the default provider first, then in priority order."""
     default_provider = get_default_provider()
     api_configs = get_api_config()
+    if stub_provider_enabled():
+        return {'local_stub': api_configs['local_stub']}
     
-    if default_provider in api_configs:
-        config = api_configs[default_provider]
+    available = {}
+    for provider in [default_provider] + DEFAULT_PROVIDER_PRIORITY:
+        if provider in available or provider not in api_configs:
+            continue
+        config = api_configs[provider]
         config_list = config.get("config_list", [])
         if config_list:
             api_key = config_list[0].get("api_key")
             if api_key and api_key.strip():
-                return default_provider, config
+                available[provider] = config
+    return available
+
+def get_provider_by_priority():
+    """Get the first available provider based on priority order.
     
-    # If default provider is not available, try others in priority order
-    for provider in DEFAULT_PROVIDER_PRIORITY:
-        if provider == default_provider:
-            continue  # Already tried
-            
-        if provider in api_configs:
-            config = api_configs[provider]
-            config_list = config.get("config_list", [])
-            if config_list:
-                api_key = config_list[0].get("api_key")
-                if api_key and api_key.strip():
-                    return provider, config
+    With LLM_ROUTING=latency the fastest healthy provider measured so far is used instead.
+    """
+    available = get_available_providers()
+    if not available:
+        raise ValueError("No valid API provider found. Please configure at least one API key.")
+    
+    if os.environ.get("LLM_ROUTING", "priority").lower() == "latency":
+        from src.utils.llm_router import endpoint_key, llm_router
+        endpoints = {}
+        for provider, config in available.items():
+            entry = config["config_list"][0]
+            endpoints.setdefault(endpoint_key(entry.get("base_url"), entry.get("model")), provider)
+        provider = endpoints[llm_router.rank(list(endpoints))[0]]
+        return provider, available[provider]
     
-    raise ValueError("No valid API provider found. Please configure at least one API key.")
+    provider = next(iter(available))
+    return provider, available[provider]
 
 def validate_and_get_fallback_config(api_type: str = None, service_type: str = ''):
     """
@@ -129,6 +196,9 @@ def validate_and_get_fallback_config(api_type: str = None, service_type: str = '
     Raises:
         ValueError: If no valid API key is found in any configuration
     """
+    if stub_provider_enabled():
+        return 'local_stub', get_api_config()['local_stub']
+    
     # If no api_type specified, use provider priority
     if api_type is None:
         provider, config = get_provider_by_priority()
@@ -200,6 +270,8 @@ def get_llm_config(api_type: str = None, timeout: int = 240, temperature: float
         api_config = get_api_config()[api_type]
         if service_type and service_type in service_config:
             api_config = service_config[service_type]
+        if stub_provider_enabled():
+            api_config = get_api_config()['local_stub']
     
     # Add runtime parameters
     api_config["timeout"] = timeout
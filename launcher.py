@@ -17,6 +17,7 @@ Usage:
     python launcher.py --mode backend --backend-mode deepsearch     # Deep Search Agent
     python launcher.py --mode backend --backend-mode general_assistant  # Programming Assistant Agent
     python launcher.py --mode backend --backend-mode repository_agent   # Repository Exploration Agent
+    python launcher.py --mode backend --stream  # Stream partial answers and tool progress
     python launcher.py --help  # View all options
 """
 
@@ -29,6 +30,7 @@ from pathlib import Path
 
 
 from configs.mode_config import ModeConfigManager, create_argument_parser, print_config_info
+from src.utils.llm_stream import stream_to_console
 from src.frontend.terminal_show import (
     print_repomaster_cli, print_startup_banner, print_environment_status, 
     print_api_config_status, print_launch_config, print_service_starting,
@@ -207,7 +209,8 @@ def run_deepsearch_mode(config_manager: ModeConfigManager):
             conversation.add_message("user", query)
             
             print("🔍 Searching...")
-            result = asyncio.run(agent.deep_search(optimized_query))
+            with stream_to_console(config_manager.config.stream):
+                result = asyncio.run(agent.deep_search(optimized_query))
             conversation.add_message("assistant", result)
             print(f"\n📋 Search results:\n{result}\n")
             
@@ -272,10 +275,11 @@ def run_general_assistant_mode(config_manager: ModeConfigManager):
             
             print("🔧 Processing...")
             # Call run_general_code_assistant
-            result = agent.run_general_code_assistant(
-                task_description=optimized_task,
-                work_directory=execution_config.get("work_dir")
-            )
+            with stream_to_console(config_manager.config.stream):
+                result = agent.run_general_code_assistant(
+                    task_description=optimized_task,
+                    work_directory=execution_config.get("work_dir")
+                )
             conversation.add_message("assistant", result)
             print_repomaster_title()
             print(f"\n📋 Task result:\n{result}\n")
@@ -357,11 +361,12 @@ def run_repository_agent_mode(config_manager: ModeConfigManager):
             print("🔧 Processing repository task...")
             
             # Call run_repository_agent
-            result = agent.run_repository_agent(
-                task_description=optimized_task,
-                repository=repository,
-                input_data=input_data
-            )
+            with stream_to_console(config_manager.config.stream):
+                result = agent.run_repository_agent(
+                    task_description=optimized_task,
+                    repository=repository,
+                    input_data=input_data
+                )
             conversation.add_message("assistant", result)
             print_repomaster_title()
             print(f"\n📋 Task result:\n{result}\n")
@@ -420,7 +425,8 @@ def run_unified_mode(config_manager: ModeConfigManager):
             
             # Use solve_task_with_repo method, it will automatically select the optimal mode
             try:
-                result = agent.solve_task_with_repo(optimized_task)
+                with stream_to_console(config_manager.config.stream):
+                    result = agent.solve_task_with_repo(optimized_task)
                 conversation.add_message("assistant", result)
                 print_repomaster_title()
                 print("\n📋 Task execution result:")
@@ -476,7 +482,7 @@ def show_available_modes():
      🏗️ Repository exploration, task execution, and system orchestration
 
 🔧 Advanced Options:
-   --api-type: Specify API type (basic, openai, claude, deepseek, etc.)
+   --api-type: Specify API type (basic, openai, claude, deepseek, local_stub, etc.)
    --temperature: Set model temperature (0.0-2.0)
    --work-dir: Specify working directory
    --log-level: Set log level (DEBUG, INFO, WARNING, ERROR)
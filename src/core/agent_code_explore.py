@@ -16,6 +16,10 @@ from src.core.code_utils import filter_pip_output, get_code_abs_token
 from src.core.prompt import USER_EXPLORER_PROMPT, CODE_ASSISTANT_PROMPT, SYSTEM_EXPLORER_PROMPT, TRAIN_PROMPT
 from src.core.tool_code_explorer import CodeExplorerTools
 from src.core.tool_response_summarizer import ToolResponseSummarizer
+from src.core.token_ledger import TokenLedger
+from src.core.message_store import MessageStore
+from src.core.history_summarizer import BackgroundHistorySummarizer
+from src.utils.usage_accounting import record_usage
 from src.services.autogen_upgrade.base_agent import ExtendedUserProxyAgent, ExtendedAssistantAgent, check_code_block
 from src.core.base_code_explorer import BaseCodeExplorer
 from src.services.agents.deep_search_agent import AutogenDeepSearchAgent
@@ -57,6 +61,41 @@ class CodeExplorer(BaseCodeExplorer):
         self.limit_restart_tokens = 80000  # Set restart token count limit
         self.context_summary_token_threshold = 20000
         self.context_summary_keep_last = 5
+        # Incremental token counts per agent message list, keyed by agent name
+        self.token_ledgers: Dict[str, TokenLedger] = {}
+        # Start summarizing older turns in the background once history reaches this fraction of the threshold
+        self.background_history_summary = args.get('background_history_summary', True) if isinstance(args, dict) else True
+        self.context_summary_prefetch_ratio = 0.7
+        self.context_summary_wait_timeout = 0  # Seconds to wait for a running background summary (0 = poll)
+        # While it runs the history is kept as is, up to this multiple of the threshold
+        self.context_summary_hard_ratio = 1.5
+        self._background_summarizer = BackgroundHistorySummarizer(self._summarize_history_head)
+        
+        # Blocking tools run in the shared worker pool during async chats, with per-tool timeouts (seconds, 0 = no limit)
+        self.offload_tools = args.get('offload_tools', True) if isinstance(args, dict) else True
+        self.tool_timeouts = {
+            'list_repository_structure': 60,
+            'search_keyword_include_code': 120,
+            'view_class_details': 60,
+            'view_function_details': 60,
+            'find_references': 120,
+            'find_dependencies': 120,
+            'view_file_content': 60,
+            'view_code_entities': 120,
+            'bash': 0,  # RunShellTool enforces its own timeout
+        }
+        # Read-only tools run concurrently when one message calls several; write, edit and bash stay in order
+        self.side_effect_free_tools = [
+            'list_repository_structure',
+            'search_keyword_include_code',
+            'view_class_details',
+            'view_function_details',
+            'find_references',
+            'find_dependencies',
+            'view_file_content',
+            'view_code_entities',
+            'issue_solution_search',
+        ]
         
         # self.is_cleanup_venv = False
         
@@ -130,13 +169,9 @@ class CodeExplorer(BaseCodeExplorer):
             self.is_restart = False
             return True
         
-        # Get current conversation history
+        # Get current conversation history and its running token total
         messages = self.executor.chat_messages.get(self.explore, [])
-        # Calculate total token count
-        total_tokens = 0
-        for m in messages:
-            if m.get("content"):
-                total_tokens += get_code_abs_token(str(m.get("content", "")))
+        total_tokens = self._conversation_tokens()
         
         # If over the limit, terminate
         if total_tokens > self.limit_restart_tokens:
@@ -252,6 +287,7 @@ If no relevant solutions are found, please indicate that.
                 self.code_library.find_references,
                 self.code_library.find_dependencies,
                 self.code_library.view_file_content,
+                self.code_library.view_code_entities,
                 self.issue_solution_search,
                 WriteFileTool.write,
                 FileEditTool.edit,
@@ -261,6 +297,9 @@ If no relevant solutions are found, please indicate that.
             ],
             self.explore,
             self.executor,
+            offload_sync=self.offload_tools,
+            tool_timeouts=self.tool_timeouts,
+            side_effect_free_tools=self.side_effect_free_tools,
         )
     
     def _attach_tool_response_summarizer(self):
@@ -288,6 +327,7 @@ If no relevant solutions are found, please indicate that.
                 return
             def wrapped(message, sender, silent):
                 result = original(message, sender, silent)
+                self._sync_tool_result_cache_turn()
                 try:
                     self._auto_summarize_history()
                 except Exception as exc:
@@ -305,41 +345,107 @@ If no relevant solutions are found, please indicate that.
         messages = self.executor.chat_messages.get(self.explore, [])
         if not messages:
             return
-        total_tokens = self._count_message_tokens(messages)
+        total_tokens = self._conversation_tokens()
+        summarizer = self._background_summarizer if self.background_history_summary else None
         if total_tokens <= self.context_summary_token_threshold:
+            # Condense older turns ahead of time so the summary is ready when the threshold is crossed
+            if summarizer and total_tokens >= self.context_summary_prefetch_ratio * self.context_summary_token_threshold:
+                cut = self._history_summary_cut(messages)
+                if cut:
+                    summarizer.start(messages, cut)
             return
-        keep = min(self.context_summary_keep_last, len(messages))
-        if len(messages) - keep <= 2:
-            return
-        head_messages = messages[:-keep] if keep else messages[:]
-        tail_messages = deepcopy(messages[-keep:]) if keep else []
-        summary_payload = self.summary_chat_history(getattr(self, "task", ""), deepcopy(head_messages))
-        summarized_head = json.loads(summary_payload)
-        new_history = summarized_head + tail_messages
+        ledger = self._token_ledger(self.executor)
+        self._last_compression_breakdown = {
+            "by_category": dict(ledger.by_category),
+            "by_tool": dict(ledger.by_tool),
+        }
+        
+        new_history, mode = None, "sync"
+        if summarizer and summarizer.pending:
+            new_history = summarizer.take(messages, wait=self.context_summary_wait_timeout)
+            mode = "background"
+            if new_history is None and summarizer.running:
+                if total_tokens < self.context_summary_hard_ratio * self.context_summary_token_threshold:
+                    # Keep the current history, the summary is applied on a later turn once it is ready
+                    return
+                summarizer.discard()
+        if new_history is None:
+            # Synchronous fallback: no background result, it no longer matches the history, or
+            # the history outgrew the running job (discarded above so it cannot apply later)
+            mode = "sync"
+            cut = self._history_summary_cut(messages)
+            if not cut:
+                return
+            # Messages are shared, not copied: the tail is reused as is and the summarizer gets
+            # shallow dicts so it cannot edit live history entries
+            new_history = self._summarize_history_head([dict(m) for m in messages[:cut]]) + messages[cut:]
+        
         after_tokens = self._count_message_tokens(new_history)
         if after_tokens >= total_tokens:
             return
         self._set_conversation_history(new_history)
-        self._log_history_compression(total_tokens, after_tokens)
+        self._log_history_compression(total_tokens, after_tokens, mode=mode)
+        # Earlier tool outputs are gone from the context, cached results must be shown in full again
+        self._forget_shown_tool_results()
+    
+    def _history_summary_cut(self, messages) -> int:
+        """Number of leading messages to summarize, 0 when there is not enough history"""
+        keep = min(self.context_summary_keep_last, len(messages))
+        if len(messages) - keep <= 2:
+            return 0
+        return len(messages) - keep
+    
+    def _summarize_history_head(self, head_messages):
+        return json.loads(self.summary_chat_history(getattr(self, "task", ""), head_messages))
+    
+    def _tool_result_cache(self):
+        return getattr(self.code_library, "result_cache", None) if getattr(self, "code_library", None) else None
+    
+    def _sync_tool_result_cache_turn(self):
+        cache = self._tool_result_cache()
+        if cache is not None and hasattr(self, "executor"):
+            cache.turn = len(self.executor.chat_messages.get(self.explore, []))
+    
+    def _forget_shown_tool_results(self):
+        cache = self._tool_result_cache()
+        if cache is not None:
+            cache.forget_shown()
+    
+    def _token_ledger(self, agent) -> TokenLedger:
+        ledger = self.token_ledgers.get(agent.name)
+        if ledger is None:
+            ledger = self.token_ledgers[agent.name] = TokenLedger()
+        return ledger
+    
+    def _conversation_tokens(self) -> int:
+        """Running token total of the executor's history with the explorer, counting only new messages"""
+        if not hasattr(self, "executor") or not hasattr(self, "explore"):
+            return 0
+        ledger = self._token_ledger(self.executor)
+        return ledger.sync(self.executor.chat_messages.get(self.explore, []))
+    
+    def token_usage_breakdown(self) -> Dict[str, Any]:
+        """Current context token totals by role, message category and tool, per agent"""
+        self._conversation_tokens()
+        if hasattr(self, "explore"):
+            self._token_ledger(self.explore).sync(self.explore.chat_messages.get(self.executor, []))
+        return {name: ledger.breakdown() for name, ledger in self.token_ledgers.items()}
     
     def _count_message_tokens(self, messages):
-        total = 0
-        for msg in messages:
-            content = msg.get("content")
-            if content:
-                total += get_code_abs_token(str(content))
-        return total
+        return self._token_ledger(self.executor).measure(messages)
     
     def _set_conversation_history(self, messages):
-        self.executor.chat_messages[self.explore] = deepcopy(messages)
-        self.explore.chat_messages[self.executor] = deepcopy(messages)
-        self.executor._oai_messages[self.explore] = deepcopy(messages)
-        self.explore._oai_messages[self.executor] = deepcopy(messages)
+        """Install a rewritten history for both agents over one shared, immutable message store"""
+        start = time.perf_counter()
+        store = MessageStore(messages)
+        store.install([(self.executor, self.explore), (self.explore, self.executor)])
+        self._last_history_install_ms = round((time.perf_counter() - start) * 1000, 3)
+        
+        # Message bodies are shared with the previous history, so surviving messages are not tokenized again
+        self._token_ledger(self.executor).sync(self.executor.chat_messages[self.explore])
     
-    def _log_history_compression(self, before_tokens, after_tokens):
+    def _log_history_compression(self, before_tokens, after_tokens, mode="sync"):
         log_dir = self.work_dir or os.path.join(os.getcwd(), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        log_path = os.path.join(log_dir, "token_usage.log")
         entry = {
             "ts": datetime.now().isoformat(),
             "agent": getattr(self.explore, "name", "Code_Explorer"),
@@ -350,10 +456,13 @@ If no relevant solutions are found, please indicate that.
                 "after_tokens": after_tokens,
                 "keep_last": self.context_summary_keep_last,
                 "threshold": self.context_summary_token_threshold,
+                "breakdown_before": getattr(self, "_last_compression_breakdown", None),
+                "install_ms": getattr(self, "_last_history_install_ms", None),
+                "mode": mode,
+                "background": self._background_summarizer.stats(),
             },
         }
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        record_usage(log_dir, entry)
     
     async def analyze_code(self, task: str, max_turns: int = 40) -> str:
         """
@@ -390,6 +499,8 @@ If no relevant solutions are found, please indicate that.
             self.restart_count += 1
             self.is_restart = False
             history_message_list = json.loads(initial_message)
+            self._forget_shown_tool_results()
+            self._background_summarizer.discard()
 
         # Start conversation
         chat_result = await self.executor.a_initiate_chat(
@@ -11,6 +11,9 @@ from autogen.cache import Cache
 from src.services.autogen_upgrade.base_agent import ExtendedUserProxyAgent, ExtendedAssistantAgent, check_code_block
 from src.utils.toolkits import register_toolkits
 from src.utils.audit_logger import log_event, Stopwatch
+from src.utils.usage_accounting import usage_accountant
+from src.utils.llm_tiers import model_tiers
+from src.utils.llm_stream import stream_run
 
 from src.services.agents.deep_search_agent import AutogenDeepSearchAgent
 
@@ -410,87 +413,52 @@ Please provide comprehensive help including code examples, explanations, and pra
         except Exception:
             pass
         sw = Stopwatch()
-        chat_result = self.user_proxy.initiate_chat(
-            self.scheduler,
-            message=initial_message,
-            max_turns=12,
-            summary_method="reflection_with_llm", # Supported strings are "last_msg" and "reflection_with_llm":
-            summary_args= {
-                'summary_prompt': "Summarize takeaway from the conversation and generate a complete and detailed report at last. Do not add any introductory phrases. The final answer should correspond to the user's question."
-            }
-        )
+        # Stream events of this run carry its run id (the caller's when it already opened a run)
+        with stream_run():
+            chat_result = self.user_proxy.initiate_chat(
+                self.scheduler,
+                message=initial_message,
+                max_turns=12,
+                summary_method="reflection_with_llm", # Supported strings are "last_msg" and "reflection_with_llm":
+                summary_args= {
+                    'summary_prompt': "Summarize takeaway from the conversation and generate a complete and detailed report at last. Do not add any introductory phrases. The final answer should correspond to the user's question."
+                }
+            )
         final_answer = self._extract_final_answer(chat_result)
         
-        # Aggregate token usage from log and append a brief summary
+        # Append a brief usage summary from the running per-session counters
         try:
-            import os, json
-            log_path = os.path.join(self.work_dir, "token_usage.log")
-            usage_totals = {}
-            if os.path.exists(log_path):
-                totals = {}
-                with open(log_path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        try:
-                            rec = json.loads(line.strip())
-                            model = rec.get("model") or "unknown"
-                            u = rec.get("usage") or {}
-                            pt = int((u.get("prompt_tokens") or 0) or 0)
-                            ct = int((u.get("completion_tokens") or 0) or 0)
-                            tt = int((u.get("total_tokens") or (pt + ct)) or 0)
-                            if model not in totals:
-                                totals[model] = {"prompt": 0, "completion": 0, "total": 0}
-                            totals[model]["prompt"] += pt
-                            totals[model]["completion"] += ct
-                            totals[model]["total"] += tt
-                            usage_totals = totals
-                        except Exception:
-                            continue
-
-                lines = []
-                # Load per-model prices if available in oai_config
-                price_map = {}
-                try:
-                    from configs.oai_config import get_api_config
-                    api = get_api_config()
-                    for provider in api.values():
-                        for cfg in provider.get("config_list", []):
-                            m = cfg.get("model")
-                            price = cfg.get("price")
-                            if m and isinstance(price, list) and len(price) == 2:
-                                price_map[m] = (float(price[0]), float(price[1]))
-                except Exception:
-                    pass
-
-                total_cost = 0.0
-                any_cost = False
-                for m, d in totals.items():
-                    cost = None
-                    if m in price_map:
-                        pp1k, cp1k = price_map[m]
-                        cost = (d["prompt"]/1000.0)*pp1k + (d["completion"]/1000.0)*cp1k
-                        total_cost += cost
-                        any_cost = True
-                    cost_part = f", cost≈{cost:.4f}" if cost is not None else ""
-                    lines.append(f"- {m}: prompt={d['prompt']}, completion={d['completion']}, total={d['total']}{cost_part}")
-
-                if lines:
-                    if any_cost:
-                        lines.append(f"Estimated total cost≈{total_cost:.4f}")
-                    footer = "\n\n---\nUsage summary:\n" + "\n".join(lines)
-                    final_answer = f"{final_answer}{footer}"
-                # Emit usage summary to audit log
-                try:
-                    log_event(
-                        "agent_usage_summary",
-                        payload={
-                            "agent": "RepoMasterAgent",
-                            "usage_totals": usage_totals,
-                            "estimated_total_cost": round(total_cost, 6) if any_cost else None,
-                        },
-                        work_dir=self.work_dir,
-                    )
-                except Exception:
-                    pass
+            report = usage_accountant.session_cost(self.work_dir)
+            usage_totals = {
+                m: {"prompt": d["prompt_tokens"], "completion": d["completion_tokens"], "total": d["total_tokens"]}
+                for m, d in report["models"].items()
+            }
+            lines = []
+            for m, d in report["models"].items():
+                cost_part = f", cost≈{d['cost']:.4f}" if d["cost"] is not None else ""
+                saved_part = f", response cache hits={d['cache_hits']} (saved {d['saved_tokens']} tokens)" if d["cache_hits"] else ""
+                lines.append(f"- {m}: prompt={d['prompt_tokens']}, completion={d['completion_tokens']}, total={d['total_tokens']}{cost_part}{saved_part}")
+
+            if lines:
+                if report["total_cost"] is not None:
+                    lines.append(f"Estimated total cost≈{report['total_cost']:.4f}")
+                footer = "\n\n---\nUsage summary:\n" + "\n".join(lines)
+                final_answer = f"{final_answer}{footer}"
+            # Emit usage summary to audit log
+            try:
+                log_event(
+                    "agent_usage_summary",
+                    payload={
+                        "agent": "RepoMasterAgent",
+                        "usage_totals": usage_totals,
+                        "estimated_total_cost": round(report["total_cost"], 6) if report["total_cost"] is not None else None,
+                        # Auxiliary calls by model tier (process wide): calls, latency, tokens, cost
+                        "model_tiers": model_tiers.stats(),
+                    },
+                    work_dir=self.work_dir,
+                )
+            except Exception:
+                pass
         except Exception:
             pass
         
@@ -10,7 +10,7 @@ import autogen
 from autogen.code_utils import create_virtual_env
 
 from configs.oai_config import get_llm_config
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.llm_tiers import get_tier_chat_client
 
 class BaseCodeExplorer:
     """Base agent class that provides basic functionality for virtual environment management and agent setup"""
@@ -283,7 +283,7 @@ class BaseCodeExplorer:
             {"role": "user", "content": user_prompt}
         ]
         try:
-            parsed_summary = AzureGPT4Chat().chat_with_message(messages, json_format=True)
+            parsed_summary = get_tier_chat_client("history_compression").chat_with_message(messages, json_format=True)
             summary = json.dumps(parsed_summary, ensure_ascii=False)
         except Exception as e:
             print(f"ERR summary_chat_history: {e}")
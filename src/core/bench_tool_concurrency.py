@@ -0,0 +1,81 @@
+"""Benchmark several code explorer sessions sharing one event loop
+
+Compares running explorer tools inline on the event loop with running them in the shared
+worker pool. Reports total wall time and the worst event loop stall (how long a 10ms heartbeat
+task was kept waiting), which is what concurrent sessions and streaming output experience.
+
+Usage:
+    python -m src.core.bench_tool_concurrency --repo /path/to/repo --sessions 4
+"""
+import time
+import asyncio
+import argparse
+from typing import Callable, Dict, List, Tuple
+
+from src.core.tool_code_explorer import CodeExplorerTools
+from src.utils.tool_executor import make_async_tool, tool_execution_stats
+
+
+def _session_calls(tools: CodeExplorerTools, keywords: List[str]) -> List[Tuple[Callable, dict]]:
+    calls = [(tools.list_repository_structure, {})]
+    for keyword in keywords:
+        calls.append((tools.search_keyword_include_code, {"keyword_or_code": keyword}))
+    for class_id in list(tools.classes)[:3]:
+        calls.append((tools.view_class_details, {"class_id": class_id}))
+    for module_id in list(tools.modules)[:3]:
+        calls.append((tools.view_file_content, {"file_path": module_id}))
+    return calls
+
+
+async def _run_session(calls: List[Tuple[Callable, dict]], offload: bool) -> None:
+    for func, kwargs in calls:
+        if offload:
+            await make_async_tool(func)(**kwargs)
+        else:
+            func(**kwargs)
+            await asyncio.sleep(0)
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    max_stall = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_stall = max(max_stall, time.perf_counter() - start - interval)
+    return max_stall
+
+
+async def _run(sessions: List[List[Tuple[Callable, dict]]], offload: bool) -> Dict[str, float]:
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[_run_session(calls, offload) for calls in sessions])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    max_stall = await heartbeat
+    return {"wall_s": round(elapsed, 3), "max_loop_stall_ms": round(max_stall * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent code explorer sessions")
+    parser.add_argument("--repo", required=True, help="Repository to explore")
+    parser.add_argument("--sessions", type=int, default=4, help="Number of concurrent sessions")
+    parser.add_argument("--keywords", nargs="*", default=["def __init__", "import", "return"], help="Keywords to search in each session")
+    args = parser.parse_args()
+
+    print(f"Building {args.sessions} explorer sessions for {args.repo}")
+    explorers = [CodeExplorerTools(args.repo, enable_result_cache=False) for _ in range(args.sessions)]
+    sessions = [_session_calls(tools, args.keywords) for tools in explorers]
+
+    results = {}
+    for mode, offload in (("inline", False), ("offload", True)):
+        results[mode] = asyncio.run(_run(sessions, offload))
+        print(f"{mode:8s} {results[mode]}")
+
+    print("Per tool stats (offload):")
+    for name, stats in tool_execution_stats.snapshot().items():
+        print(f"  {name}: {stats['count']} calls, avg {stats['total_s'] / stats['count']:.3f}s, max {stats['max_s']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import os
+import re
+import math
+import sqlite3
+import hashlib
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.utils.hybrid_search import BM25Index, reciprocal_rank_fusion
+
+
+DEFAULT_CACHE_PATH = os.getenv("REPOMASTER_EMBEDDING_CACHE", "db/embedding_cache/embeddings.sqlite")
+
+
+class HashingEmbeddings:
+    """Local deterministic embedding backend
+
+    Tokens (identifiers split on camelCase/snake_case plus character trigrams) are hashed into a
+    fixed number of buckets and the resulting vector is L2 normalized. No model download or network
+    access is needed, so results are reproducible and usable in offline tests.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.model_name = f"local-hashing-v1-{dim}"
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        words = re.findall(r"[A-Za-z_][A-Za-z0-9_]*|\d+", text)
+        tokens = []
+        for word in words:
+            parts = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", word).lower().split('_')
+            tokens.extend(p for p in parts if p)
+            if len(parts) > 1:
+                tokens.append(word.lower())
+        grams = [f"#{t[i:i + 3]}" for t in tokens if len(t) > 3 for i in range(len(t) - 2)]
+        return tokens + grams
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in self._tokenize(text):
+            digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], 'little') % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def get_code_embeddings(backend: Optional[str] = None):
+    """Get the embedding backend used for code search
+
+    Args:
+        backend: "local", "remote" or "auto" (default from CODE_EMBEDDING_BACKEND). "auto" uses the
+            remote OpenAI/Azure embeddings when an API key is configured, otherwise the local backend.
+
+    Returns:
+        Tuple of (embeddings instance, model name used as cache namespace)
+    """
+    backend = (backend or os.getenv("CODE_EMBEDDING_BACKEND", "auto")).lower()
+    has_remote_key = bool(os.getenv("OPENAI_API_KEY") or os.getenv("AZURE_PAY_OPENAI_API_KEY"))
+    if backend == "local" or (backend == "auto" and not has_remote_key):
+        embeddings = HashingEmbeddings()
+        return embeddings, embeddings.model_name
+
+    from src.utils.tool_retriever_embed import get_embeddings
+    model_name = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME", "text-embedding-ada-002")
+    return get_embeddings(model_name=model_name), model_name
+
+
+class EmbeddingStore:
+    """Content addressed on-disk embedding cache keyed by (embedding model, chunk hash)"""
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, chunk_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, chunk_hash))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def chunk_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        hashes = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for chunk_hash, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[chunk_hash] = vector.tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector) VALUES (?, ?, ?)",
+                [(model, h, array('f', v).tobytes()) for h, v in items.items()],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CodeEmbeddingIndex:
+    """Hybrid BM25 and vector index over code chunks that only embeds chunks it has never seen before
+
+    Chunk vectors are looked up in the EmbeddingStore by content hash, so re-indexing the same
+    repository (or another repository sharing files) only embeds new or changed chunks.
+    """
+
+    def __init__(
+        self,
+        embeddings=None,
+        model_name: Optional[str] = None,
+        store: Optional[EmbeddingStore] = None,
+        batch_size: int = 100,
+        embedding_weight: float = 0.6,
+    ):
+        if embeddings is None:
+            embeddings, default_model_name = get_code_embeddings()
+            model_name = model_name or default_model_name
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, 'model_name', None) or getattr(embeddings, 'model', 'unknown')
+        self.store = store or EmbeddingStore()
+        self.batch_size = batch_size
+        self.embedding_weight = embedding_weight
+
+        self.chunks: List[Tuple[str, str]] = []
+        self.vectors: List[List[float]] = []
+        self.bm25_index: Optional[BM25Index] = None
+        self.last_build_stats: Dict[str, float] = {}
+
+    def build(self, chunks: List[Tuple[str, str]]) -> Dict[str, float]:
+        """Index (chunk_id, text) pairs, embedding only chunks missing from the store"""
+        start_time = time.perf_counter()
+        hashes = [self.store.chunk_hash(text) for _, text in chunks]
+        cached = self.store.get_many(self.model_name, hashes)
+
+        missing = {}
+        for chunk_hash, (_, text) in zip(hashes, chunks):
+            if chunk_hash not in cached:
+                missing[chunk_hash] = text
+
+        missing_items = list(missing.items())
+        for start in range(0, len(missing_items), self.batch_size):
+            batch = missing_items[start:start + self.batch_size]
+            vectors = self.embeddings.embed_documents([text for _, text in batch])
+            new_vectors = {chunk_hash: list(vector) for (chunk_hash, _), vector in zip(batch, vectors)}
+            self.store.put_many(self.model_name, new_vectors)
+            cached.update(new_vectors)
+
+        self.chunks = list(chunks)
+        self.vectors = [self._normalize(cached[h]) for h in hashes]
+        self.bm25_index = BM25Index([text for _, text in self.chunks])
+        self.last_build_stats = {
+            "chunks": len(chunks),
+            "reused": len(set(hashes)) - len(missing),
+            "embedded": len(missing),
+            "build_time": round(time.perf_counter() - start_time, 4),
+        }
+        print(f"[CodeEmbeddingIndex] {self.last_build_stats['chunks']} chunks, "
+              f"{self.last_build_stats['reused']} reused, {self.last_build_stats['embedded']} embedded "
+              f"in {self.last_build_stats['build_time']:.2f}s ({self.model_name})")
+        return self.last_build_stats
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> List[float]:
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def vector_search(self, query: str, topk: int = 4) -> List[Tuple[int, float]]:
+        """Return the topk (chunk index, cosine similarity) for a query"""
+        query_vector = self._normalize(list(self.embeddings.embed_query(query)))
+        scores = [sum(q * v for q, v in zip(query_vector, vector)) for vector in self.vectors]
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:topk]
+        return [(i, scores[i]) for i in ranked]
+
+    def search(self, query: str, topk: int = 4) -> List[Tuple[str, str, float]]:
+        """Hybrid BM25 and vector search fused by reciprocal rank, returns (chunk_id, text, score)"""
+        if not self.chunks:
+            return []
+        candidates = max(topk * 10, 100)
+        vector_ranking = [i for i, _ in self.vector_search(query, candidates)]
+        bm25_ranking = [i for i, _ in self.bm25_index.search(query, candidates)]
+        fused = reciprocal_rank_fusion(
+            [vector_ranking, bm25_ranking],
+            weights=[self.embedding_weight, 1 - self.embedding_weight],
+        )
+        return [(self.chunks[i][0], self.chunks[i][1], score) for i, score in fused[:topk]]
+
+
+def split_code_chunks(text: str, chunk_size: int = 5000) -> List[str]:
+    """Split text on line boundaries into chunks of at most chunk_size characters"""
+    if len(text) <= chunk_size:
+        return [text]
+    chunks, current, current_len = [], [], 0
+    for line in text.splitlines(keepends=True):
+        if current and current_len + len(line) > chunk_size:
+            chunks.append("".join(current))
+            current, current_len = [], 0
+        while len(line) > chunk_size:
+            chunks.append(line[:chunk_size])
+            line = line[chunk_size:]
+        current.append(line)
+        current_len += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
@@ -3,7 +3,7 @@ import os
 import tiktoken
 import subprocess
 from grep_ast import TreeContext
-from autogen.oai import OpenAIWrapper
+from src.utils.llm_client_registry import get_llm_wrapper
 from autogen.code_utils import create_virtual_env
 
 from typing import Annotated
@@ -234,7 +234,7 @@ def get_pip_install_command(execute_result):
     Please return a list containing installation commands, one command per line.
     """ 
     
-    client = OpenAIWrapper(**get_llm_config())
+    client = get_llm_wrapper(get_llm_config())
     response = client.create(
         messages=[
             {"role": "system", "content": "You are a professional Python developer, skilled at extracting installation commands from pip install output results."},
@@ -0,0 +1,106 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class _SummaryJob:
+    future: Any
+    cut: int
+    anchor: Dict[str, Any]
+    started_at: float
+
+
+class BackgroundHistorySummarizer:
+    """Summarize older conversation turns in a background thread
+
+    A job condenses messages[:cut] while the conversation continues. When the result is taken, it
+    is only applied if messages[cut - 1] is still the same message object, i.e. the summarized
+    prefix has not been rewritten meanwhile; everything appended after the cut is kept verbatim.
+    """
+
+    def __init__(self, summarize_fn: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]):
+        self.summarize_fn = summarize_fn
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        self._lock = threading.Lock()
+        self._job: Optional[_SummaryJob] = None
+
+        self.started = 0
+        self.applied = 0
+        self.discarded = 0
+        self.last_duration: Optional[float] = None
+
+    @property
+    def pending(self) -> bool:
+        return self._job is not None
+
+    @property
+    def running(self) -> bool:
+        job = self._job
+        return job is not None and not job.future.done()
+
+    def start(self, messages: List[Dict[str, Any]], cut: int) -> bool:
+        """Start summarizing messages[:cut] unless a job is already running"""
+        with self._lock:
+            if self._job is not None or cut <= 0:
+                return False
+            # Shallow dicts: the summarizer must not touch live history entries
+            snapshot = [dict(m) for m in messages[:cut]]
+            self._job = _SummaryJob(
+                future=self._pool.submit(self.summarize_fn, snapshot),
+                cut=cut,
+                anchor=messages[cut - 1],
+                started_at=time.perf_counter(),
+            )
+            self.started += 1
+            print(f"[HistorySummarizer] Background summary of {cut} messages started", flush=True)
+            return True
+
+    def take(self, messages: List[Dict[str, Any]], wait: Optional[float] = 0) -> Optional[List[Dict[str, Any]]]:
+        """Return the rewritten history if a finished job still applies, otherwise None
+
+        Args:
+            wait: Seconds to wait for a running job (0 = do not wait, None = wait until done)
+        """
+        with self._lock:
+            job = self._job
+            if job is None:
+                return None
+            if wait == 0 and not job.future.done():
+                return None
+            try:
+                summarized_head = job.future.result(timeout=wait)
+            except FutureTimeoutError:
+                return None
+            except Exception as exc:
+                print(f"[HistorySummarizer] Background summary failed: {exc}", flush=True)
+                self._job = None
+                self.discarded += 1
+                return None
+            self._job = None
+            self.last_duration = time.perf_counter() - job.started_at
+
+            if len(messages) < job.cut or messages[job.cut - 1] is not job.anchor:
+                self.discarded += 1
+                return None
+            self.applied += 1
+            return list(summarized_head) + list(messages[job.cut:])
+
+    def discard(self) -> None:
+        """Drop the running job, e.g. when the conversation restarts"""
+        with self._lock:
+            if self._job is not None:
+                self._job.future.cancel()
+                self._job = None
+                self.discarded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "applied": self.applied,
+            "discarded": self.discarded,
+            "pending": self.pending,
+            "last_duration_s": round(self.last_duration, 3) if self.last_duration is not None else None,
+        }
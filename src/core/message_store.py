@@ -0,0 +1,74 @@
+from copy import deepcopy
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+
+_MISSING = object()
+
+
+class FrozenMessage(dict):
+    """Chat message that cannot be modified in place
+
+    Rewritten histories share message objects between agents instead of deep-copying them, so an
+    in-place edit would leak into every history holding the message. Reads behave like a dict and
+    the message serializes like one. pop() of an absent key with a default is allowed, because
+    AutoGen uses that pattern to read optional keys.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Chat history messages are immutable, build a new message instead")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = popitem = setdefault = update = __ior__ = _readonly
+
+    def pop(self, key, default=_MISSING):
+        if key not in self and default is not _MISSING:
+            return default
+        self._readonly()
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> Dict[str, Any]:
+        return {key: deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def freeze_message(message: Dict[str, Any]) -> FrozenMessage:
+    """Wrap a message without copying its body (content strings and tool call lists are shared)"""
+    if isinstance(message, FrozenMessage):
+        return message
+    return FrozenMessage(message)
+
+
+class MessageStore:
+    """Immutable message sequence shared by every agent of a conversation
+
+    A compressed history is frozen once and every agent receives its own list over the same message
+    objects. Only list slots are allocated per agent; message bodies are never copied.
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = ()):
+        self.messages: Tuple[FrozenMessage, ...] = tuple(freeze_message(m) for m in messages)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def view(self) -> List[FrozenMessage]:
+        """A new appendable list over the shared messages"""
+        return list(self.messages)
+
+    def install(self, slots: Sequence[Tuple[Any, Any]]) -> None:
+        """Install a view as the history of each (agent, peer) pair
+
+        chat_messages and _oai_messages are the same mapping in AutoGen, both are set to the same
+        list so the agent keeps a single history per peer.
+        """
+        for agent, peer in slots:
+            view = self.view()
+            agent._oai_messages[peer] = view
+            if agent.chat_messages is not agent._oai_messages:
+                agent.chat_messages[peer] = view
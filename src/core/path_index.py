@@ -0,0 +1,141 @@
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class PathEntry:
+    rel_path: str
+    abs_path: str
+    module_id: str
+    is_python_module: bool
+    importance: float = 0.0
+
+
+class PathIndex:
+    """Lookup table from user supplied file references to repository files
+
+    Built once with the code tree. Every file is registered under its normalized relative path,
+    its dotted module id, and every trailing path / module suffix (so "utils.py", "core/utils.py"
+    and "core.utils" all resolve). Multiple candidates are ranked by module importance, then by
+    path depth, so ambiguous references resolve with a single dictionary lookup.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        modules: Dict[str, Dict],
+        other_files: Dict[str, Dict],
+        importance: Optional[Dict[str, float]] = None,
+    ):
+        self.repo_path = os.path.abspath(repo_path)
+        importance = importance or {}
+
+        self.by_rel_path: Dict[str, PathEntry] = {}
+        self.by_module_id: Dict[str, PathEntry] = {}
+        self.by_path_suffix: Dict[str, List[PathEntry]] = defaultdict(list)
+        self.by_module_suffix: Dict[str, List[PathEntry]] = defaultdict(list)
+
+        for is_python_module, files in ((True, modules), (False, other_files)):
+            for module_id, file_info in files.items():
+                rel_path = self._clean(file_info.get('path', ''))
+                if not rel_path:
+                    continue
+                entry = PathEntry(
+                    rel_path=rel_path,
+                    abs_path=os.path.join(self.repo_path, rel_path),
+                    module_id=module_id,
+                    is_python_module=is_python_module,
+                    importance=importance.get(module_id, 0.0),
+                )
+                self._add(entry)
+
+        for table in (self.by_path_suffix, self.by_module_suffix):
+            for candidates in table.values():
+                candidates.sort(key=self._rank)
+
+    @staticmethod
+    def _clean(path: str) -> str:
+        path = path.strip().replace('\\', '/')
+        while path.startswith('./'):
+            path = path[2:]
+        return path.strip('/')
+
+    @staticmethod
+    def _rank(entry: PathEntry) -> Tuple[float, int, str]:
+        return -entry.importance, entry.rel_path.count('/'), entry.rel_path
+
+    def _add(self, entry: PathEntry) -> None:
+        self.by_rel_path[entry.rel_path] = entry
+        # Python modules win over other files sharing the same dotted id
+        if entry.is_python_module or entry.module_id not in self.by_module_id:
+            self.by_module_id[entry.module_id] = entry
+
+        parts = entry.rel_path.split('/')
+        for i in range(len(parts)):
+            self.by_path_suffix['/'.join(parts[i:])].append(entry)
+        if entry.rel_path.endswith('.py'):
+            # Allow extension-less references like "core/utils"
+            stem_parts = entry.rel_path[:-3].split('/')
+            for i in range(len(stem_parts)):
+                self.by_path_suffix['/'.join(stem_parts[i:])].append(entry)
+
+        module_parts = entry.module_id.split('.')
+        for i in range(1, len(module_parts)):
+            self.by_module_suffix['.'.join(module_parts[i:])].append(entry)
+
+    def _to_rel_path(self, reference: str) -> Optional[str]:
+        """Relative path of a reference, None for absolute paths outside the repository"""
+        reference = reference.strip()
+        if os.path.isabs(reference):
+            abs_reference = os.path.abspath(reference)
+            if abs_reference == self.repo_path or abs_reference.startswith(self.repo_path + os.sep):
+                return self._clean(os.path.relpath(abs_reference, self.repo_path))
+            return None
+        return self._clean(reference)
+
+    def lookup(self, reference: str) -> List[PathEntry]:
+        """Return candidate files for a path, filename or dotted module reference, best first"""
+        if not reference or not reference.strip():
+            return []
+        rel_path = self._to_rel_path(reference)
+        if not rel_path:
+            return []
+
+        entry = self.by_rel_path.get(rel_path) or self.by_module_id.get(rel_path)
+        if entry is not None:
+            return [entry]
+
+        candidates = self.by_path_suffix.get(rel_path)
+        if candidates:
+            return list(candidates)
+
+        module_id = rel_path[:-3] if rel_path.endswith('.py') else rel_path
+        module_id = module_id.replace('/', '.')
+        entry = self.by_module_id.get(module_id)
+        if entry is not None:
+            return [entry]
+        return list(self.by_module_suffix.get(module_id, []))
+
+    def resolve(self, reference: str, python_only: bool = False) -> Tuple[Optional[PathEntry], List[PathEntry]]:
+        """Resolve a reference to a single file
+
+        Returns:
+            (entry, candidates): entry is set when the reference is unambiguous, candidates holds
+            every match ranked by importance.
+        """
+        candidates = self.lookup(reference)
+        if python_only:
+            candidates = [c for c in candidates if c.is_python_module]
+        if len(candidates) == 1:
+            return candidates[0], candidates
+        return None, candidates
+
+    def format_ambiguous(self, reference: str, candidates: Iterable[PathEntry], limit: int = 5) -> str:
+        candidates = list(candidates)
+        lines = [f"Found {len(candidates)} files matching '{reference}', most important first. Please use one of these paths:"]
+        lines.extend(f"- {c.rel_path}" for c in candidates[:limit])
+        if len(candidates) > limit:
+            lines.append("...")
+        return "\n".join(lines)
@@ -0,0 +1,94 @@
+import json
+import hashlib
+from typing import Any, Dict, List, Optional
+
+
+def extract_cached_tokens(usage: Any) -> Optional[int]:
+    """Prompt tokens served from the provider's prompt cache, None when the usage does not say
+
+    Handles OpenAI style usage (prompt_tokens_details.cached_tokens) and Anthropic style usage
+    (cache_read_input_tokens), given as objects or dicts.
+    """
+    def _get(val, key):
+        return getattr(val, key, None) if not isinstance(val, dict) else val.get(key)
+
+    if usage is None:
+        return None
+    details = _get(usage, "prompt_tokens_details")
+    if details is not None and _get(details, "cached_tokens") is not None:
+        return _get(details, "cached_tokens")
+    return _get(usage, "cache_read_input_tokens")
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class PromptLayout:
+    """Track how much of each request repeats the previous one, the part a provider prompt cache can serve
+
+    Providers cache the longest previously seen prompt prefix, so a request is cheap and fast when
+    the system message, tool definitions and earlier history are unchanged. observe() compares a
+    request with the previous one by message hashes and records where their common prefix ends; it
+    does not change what is sent. A history rewrite (compression installs new messages) or an edit
+    in place (update_system_message edits the system message dict) is a prefix break, in-place
+    edits are also counted in in_place_edits. record_usage() adds the cached prompt tokens the
+    provider reports, so the effect of prefix breaks shows in cache_hit_ratio.
+    """
+
+    def __init__(self):
+        # (message object, hash of its serialization) of the previous request
+        self._sent: List[tuple] = []
+        self._tools_hash: Optional[str] = None
+
+        self.requests = 0
+        self.prefix_breaks = 0
+        self.in_place_edits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.last_request: Dict[str, Any] = {}
+
+    def observe(self, messages: List[Dict[str, Any]], tools: Optional[List[Any]] = None) -> None:
+        """Record the request about to be sent and how much of the previous one it repeats"""
+        tools_hash = _digest(tools or [])
+        tools_changed = self._tools_hash is not None and tools_hash != self._tools_hash
+        self._tools_hash = tools_hash
+
+        stable = 0 if tools_changed else None
+        edited = 0
+        sent = []
+        for i, message in enumerate(messages):
+            digest = _digest(message)
+            if stable is None and i < len(self._sent) and digest != self._sent[i][1]:
+                edited = int(self._sent[i][0] is message)
+                stable = i
+            sent.append((message, digest))
+
+        if stable is None:
+            stable = min(len(messages), len(self._sent))
+        prefix_break = stable < len(self._sent)
+        self.requests += 1
+        self.in_place_edits += edited
+        self.prefix_breaks += int(prefix_break)
+        self._sent = sent
+        self.last_request = {
+            "messages": len(messages),
+            "stable_prefix_messages": stable,
+            "prefix_break": prefix_break,
+            "tools_changed": tools_changed,
+            "in_place_edit": bool(edited),
+        }
+
+    def record_usage(self, prompt_tokens: Optional[int], cached_tokens: Optional[int]) -> None:
+        self.prompt_tokens += prompt_tokens or 0
+        self.cached_tokens += cached_tokens or 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prefix_breaks": self.prefix_breaks,
+            "in_place_edits": self.in_place_edits,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_hit_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None,
+        }
@@ -1,13 +1,22 @@
 from typing import Annotated
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from src.core.code_utils import get_code_abs_token
 
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.llm_client_registry import get_chat_client
+from src.utils.llm_batch import run_chat_batch
+from src.core.summary_store import cached_summary, content_hash
+
+
+# Bump when a summary prompt changes, so stored summaries made with the old prompt are not reused
+SUMMARY_PROMPT_VERSION = "1"
 
 
 def generate_repository_summary(
     code_list: list[dict[Annotated[str, "File path"], Annotated[str, "File content"]]],
-    max_important_files_token: int = 2000
+    max_important_files_token: int = 2000,
+    max_workers: int = 4
 ):
     """
     Generate code repository summary
@@ -21,9 +30,10 @@ def generate_repository_summary(
             }
         ]
         max_important_files_token: Token count limit for important files
+        max_workers: Number of file summaries requested concurrently
     """
     
-    def judge_file_is_important(code_list: list[dict[Annotated[str, "File path"], Annotated[str, "File content"]]]):
+    def judge_messages(code_list: list[dict[Annotated[str, "File path"], Annotated[str, "File content"]]]):
         
         judge_prompt = f"""
         You are an assistant that helps developers understand code repositories. Please judge whether the current file is important for understanding the entire repository.
@@ -46,12 +56,13 @@ def generate_repository_summary(
             }}
         ]
         """
-        messages = [
+        return [
             {"role": "system", "content": judge_prompt},
             {"role": "user", "content": json.dumps(code_list, ensure_ascii=False, indent=2)}
         ]
+
+    def select_important_files(code_list, response_dict):
         try:
-            response_dict = AzureGPT4Chat().chat_with_message(messages, json_format=True)
             print('response_dict: ', response_dict)
             if not isinstance(response_dict, list):
                 return code_list
@@ -67,56 +78,122 @@ def generate_repository_summary(
             return code_list
     
     def split_code_lists(code_list: list[dict[Annotated[str, "File path"], Annotated[str, "File content"]]]):
-        # Split according to tiktoken token count
+        # Split according to tiktoken token count, counting each file once and keeping a running total
         max_token = 50000
         out_code_list = []
         split_code_list = []
+        split_tokens = 0
         for file in code_list:
-            if get_code_abs_token(str(file)) > max_token:
+            file_tokens = get_code_abs_token(json.dumps(file, ensure_ascii=False, indent=2))
+            if file_tokens > max_token:
                 continue
             split_code_list.append(file)
-            if get_code_abs_token(json.dumps(split_code_list, ensure_ascii=False, indent=2)) > max_token:
+            split_tokens += file_tokens
+            if split_tokens > max_token:
                 out_code_list.append(split_code_list)
                 split_code_list = []
+                split_tokens = 0
         if split_code_list:
             out_code_list.append(split_code_list)
         return out_code_list
 
-    # Parallel computation
+    def summarize_important_files(important_files):
+        """Summaries of the important files in order, within max_important_files_token
+
+        The first file (usually the README) is summarized on its own and is the history the other
+        files are deduplicated against, so the rest can be summarized concurrently. At most
+        max_workers summaries are in flight; results are taken in file order and nothing new is
+        requested once the token budget is used up.
+        """
+        repository_summary = {}
+        summary_tokens = 0
+
+        def accept(file_path, summary):
+            nonlocal summary_tokens
+            if '<none>' in str(summary).lower():
+                return True
+            entry_tokens = get_code_abs_token(json.dumps({file_path: summary}, ensure_ascii=False))
+            if summary_tokens + entry_tokens > max_important_files_token:
+                return False
+            repository_summary[file_path] = summary
+            summary_tokens += entry_tokens
+            return True
+
+        if not important_files:
+            return repository_summary
+        first, rest = important_files[0], iter(important_files[1:])
+        try:
+            if not accept(first['file_path'], get_readme_summary(first['file_content'], {}, first['file_path'])):
+                return repository_summary
+        except Exception as e:
+            print(f"Error processing file {first['file_path']}: {e}")
+        history_summary = dict(repository_summary)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = deque()
+
+            def submit_next():
+                file = next(rest, None)
+                if file is not None:
+                    in_flight.append((file['file_path'], pool.submit(get_readme_summary, file['file_content'], history_summary, file['file_path'])))
+
+            for _ in range(max_workers):
+                submit_next()
+            while in_flight:
+                file_path, future = in_flight.popleft()
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    print(f"Error processing file {file_path}: {e}")
+                    submit_next()
+                    continue
+                if not accept(file_path, summary):
+                    for _, pending in in_flight:
+                        pending.cancel()
+                    break
+                submit_next()
+        return repository_summary
 
     all_file_content = json.dumps(code_list, ensure_ascii=False)
     if get_code_abs_token(all_file_content) < max_important_files_token:
         return code_list    
     
-    important_files = []
-    for s_code_list in split_code_lists(code_list):
-        important_files.extend(judge_file_is_important(s_code_list))
-    
-    print('important_files: ', len(code_list), len(important_files), [file['file_path'] for file in important_files])
-    
-    repository_summary = {}
-    
-    for file in important_files:
-        file_path = file['file_path']
-        file_content = file['file_content']
-        try:
-            summary = get_readme_summary(file_content, repository_summary)
-            if '<none>' not in str(summary).lower():
-                if get_code_abs_token(json.dumps(repository_summary, ensure_ascii=False)+str(summary))> max_important_files_token:
-                    break
-                repository_summary[file_path] = summary
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
-            continue
-    print('repository_summary: ', get_code_abs_token(json.dumps(repository_summary, ensure_ascii=False)))
-    return repository_summary
+    def summarize():
+        # The chunks are judged independently, as one batch job instead of one round-trip after another
+        code_chunks = split_code_lists(code_list)
+        judgements = run_chat_batch(
+            {f"chunk-{i}": judge_messages(chunk) for i, chunk in enumerate(code_chunks)},
+            prefix="repo_summary_judge",
+            json_format=True,
+        )
+        important_files = []
+        for i, s_code_list in enumerate(code_chunks):
+            important_files.extend(select_important_files(s_code_list, judgements[f"chunk-{i}"]))
+
+        print('important_files: ', len(code_list), len(important_files), [file['file_path'] for file in important_files])
 
-def get_readme_summary(code_content: str, history_summary: dict):
+        repository_summary = summarize_important_files(important_files)
+        print('repository_summary: ', get_code_abs_token(json.dumps(repository_summary, ensure_ascii=False)))
+        return repository_summary
+
+    return cached_summary(
+        summarize,
+        repo=f"content:{content_hash(code_list)}",
+        path="<repository>",
+        prompt_version=SUMMARY_PROMPT_VERSION,
+        params={"max_important_files_token": max_important_files_token},
+    )
+
+def get_readme_summary(code_content: str, history_summary: dict, file_path: str = ""):
     """
     Get summary of README.md and other important documentation files, for overall understanding of the entire repository
     
+    Summaries are reused from the summary store while the content, history and prompt are unchanged.
+    
     Args:
-        code_list: List containing code file information, each element should contain file path and content
+        code_content: Content of the file to summarize
+        history_summary: Summaries of the files already covered, not to be repeated
+        file_path: Path of the file, recorded with the stored summary
         
     Returns:
         str: Repository summary, including references to important content
@@ -148,11 +225,15 @@ def get_readme_summary(code_content: str, history_summary: dict):
     If it duplicates content in history_summary, then no need to output repeatedly.
     """
     
-    response = AzureGPT4Chat().chat_with_message(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt}
-        ],
-        json_format=True
+    return cached_summary(
+        lambda: get_chat_client().chat_with_message(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            json_format=True
+        ),
+        repo=f"content:{content_hash([code_content, history_summary])}",
+        path=file_path,
+        prompt_version=SUMMARY_PROMPT_VERSION,
     )
-    return response
@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+DEFAULT_SUMMARY_STORE_PATH = os.getenv("REPO_SUMMARY_CACHE_PATH", "db/summary_cache/summaries.sqlite")
+
+
+def content_hash(value: Any) -> str:
+    raw = value if isinstance(value, str) else json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def summary_model() -> str:
+    """Model of the default chat client, which produces the summaries"""
+    try:
+        from src.utils.llm_client_registry import llm_client_registry
+        return llm_client_registry.config_list("basic")[0].get("model") or ""
+    except Exception:
+        return ""
+
+
+def _cacheable(summary: Any) -> bool:
+    # Exhausted retries come back as an error string rather than an exception, also inside summary dicts
+    if summary is None:
+        return False
+    if isinstance(summary, dict):
+        return all(_cacheable(value) for value in summary.values())
+    return not (isinstance(summary, str) and summary.startswith("Still failed"))
+
+
+class RepoSummaryStore:
+    """Persistent store of LLM-generated repository and README summaries, in SQLite
+
+    An entry is keyed by (repo, file path, prompt version, model, params): repo is "content:<sha256>"
+    of the summarized input and params hold the generation settings (e.g. the token budget), so a
+    summary is reused for as long as the text and settings it was generated from are unchanged. Entries older than ttl_s are not served,
+    and the least recently used entries are evicted once the stored summaries exceed max_bytes.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_SUMMARY_STORE_PATH, ttl_s: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.ttl_s = ttl_s if ttl_s is not None else float(os.getenv("REPO_SUMMARY_CACHE_TTL_DAYS", "30")) * 86400
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.getenv("REPO_SUMMARY_CACHE_MAX_MB", "64")) * 1024 * 1024
+        )
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, repo TEXT NOT NULL, path TEXT NOT NULL, prompt_version TEXT NOT NULL, "
+            "model TEXT NOT NULL, summary TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_access ON summaries (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(repo: str, path: str, prompt_version: str, model: str, params: Optional[Dict[str, Any]] = None) -> str:
+        raw = json.dumps([repo, path, prompt_version, model, params or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT summary, size, created FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl_s:
+                self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self._total_bytes -= row[1]
+                self.evictions += 1
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, summary: Any, repo: str, path: str, prompt_version: str, model: str) -> None:
+        data = json.dumps(summary, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM summaries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, repo, path, prompt_version, model, summary, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, repo, path, prompt_version, model, data, size, now, now),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self.writes += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones down to 90% of max_bytes (caller holds the lock)"""
+        expired = self._conn.execute(
+            "SELECT key, size FROM summaries WHERE created < ?", (time.time() - self.ttl_s,)
+        ).fetchall()
+        evicted = [(key,) for key, _ in expired]
+        self._total_bytes -= sum(size for _, size in expired)
+        target = int(self.max_bytes * 0.9)
+        if self._total_bytes > target:
+            for key, size in self._conn.execute(
+                "SELECT key, size FROM summaries WHERE created >= ? ORDER BY last_access", (time.time() - self.ttl_s,)
+            ).fetchall():
+                if self._total_bytes <= target:
+                    break
+                evicted.append((key,))
+                self._total_bytes -= size
+        self._conn.executemany("DELETE FROM summaries WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def purge(self, expired_only: bool = True) -> int:
+        """Remove expired entries (or all entries) and return how many were removed"""
+        with self._lock:
+            if expired_only:
+                cursor = self._conn.execute("DELETE FROM summaries WHERE created < ?", (time.time() - self.ttl_s,))
+            else:
+                cursor = self._conn.execute("DELETE FROM summaries")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+            return cursor.rowcount
+
+    def get_or_create(
+        self,
+        create_fn: Callable[[], Any],
+        repo: str,
+        path: str,
+        prompt_version: str,
+        model: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """Return the stored summary, or call create_fn() and store its result unless it failed"""
+        model = summary_model() if model is None else model
+        key = self.make_key(repo, path, prompt_version, model, params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        summary = create_fn()
+        if _cacheable(summary):
+            try:
+                self.put(key, summary, repo, path, prompt_version, model)
+            except (TypeError, ValueError, sqlite3.Error) as exc:
+                print(f"[RepoSummaryStore] summary not stored: {exc}", flush=True)
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "stored_mb": round(self._total_bytes / (1024 * 1024), 3),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_summary_store: Optional[RepoSummaryStore] = None
+_summary_store_lock = threading.Lock()
+
+
+def get_summary_store() -> Optional[RepoSummaryStore]:
+    """Process wide summary store, None when disabled with REPO_SUMMARY_CACHE=off
+
+    REPO_SUMMARY_CACHE_PATH sets the SQLite file, REPO_SUMMARY_CACHE_TTL_DAYS the entry lifetime
+    and REPO_SUMMARY_CACHE_MAX_MB the size limit.
+    """
+    global _summary_store
+    if os.getenv("REPO_SUMMARY_CACHE", "on").lower() in ("off", "0", "false", "no"):
+        return None
+    with _summary_store_lock:
+        if _summary_store is None:
+            _summary_store = RepoSummaryStore()
+        return _summary_store
+
+
+def cached_summary(
+    create_fn: Callable[[], Any],
+    repo: str,
+    path: str,
+    prompt_version: str,
+    params: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """Call create_fn() through the summary store when it is enabled"""
+    store = get_summary_store()
+    if store is None:
+        return create_fn()
+    return store.get_or_create(create_fn, repo, path, prompt_version, params=params)
+
+
+def warm(repo_paths: List[str], max_tokens: int = 8000) -> None:
+    """Build and store the repository summaries the code explorer asks for at task start"""
+    from src.core.tree_code import GlobalCodeTreeBuilder
+
+    for repo_path in repo_paths:
+        start = time.time()
+        builder = GlobalCodeTreeBuilder(repo_path)
+        builder.parse_repository()
+        summary_list = builder.get_repo_summary_list(max_tokens, is_file_summary=True)
+        print(f"[RepoSummaryStore] {repo_path}: {len(summary_list)} summary entries in {time.time() - start:.1f}s", flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.core.summary_store", description="Repository summary cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm_parser = sub.add_parser("warm", help="pre-compute the summaries of repositories")
+    warm_parser.add_argument("repos", nargs="+", help="local repository paths")
+    warm_parser.add_argument("--max-tokens", type=int, default=8000, help="summary budget, as used by the code explorer")
+    sub.add_parser("stats", help="show the stored entries")
+    purge_parser = sub.add_parser("purge", help="remove expired entries")
+    purge_parser.add_argument("--all", action="store_true", help="remove every entry")
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+
+    store = get_summary_store()
+    if store is None:
+        print("[RepoSummaryStore] disabled by REPO_SUMMARY_CACHE", flush=True)
+        return
+    if args.command == "warm":
+        warm(args.repos, max_tokens=args.max_tokens)
+    elif args.command == "purge":
+        print(f"[RepoSummaryStore] removed {store.purge(expired_only=not args.all)} entries", flush=True)
+    print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import json
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core.code_utils import get_code_abs_token
+
+
+@dataclass(frozen=True)
+class MessageTokens:
+    role: str
+    content: int = 0
+    tool_calls: int = 0
+    tool_name: Optional[str] = None
+
+    @property
+    def total(self) -> int:
+        return self.content + self.tool_calls
+
+    @property
+    def category(self) -> str:
+        if self.tool_name is not None:
+            return "tool_response"
+        if self.tool_calls:
+            return "tool_call"
+        return "message"
+
+
+class TokenLedger:
+    """Running token totals for one agent's message list
+
+    Each message is tokenized once, when it is first seen. Appends are detected by comparing the
+    list identity and its last known message, so syncing after a new message only counts that
+    message. When the list is rewritten (history compression), counts of messages that survive
+    are reused by object identity and only new messages (e.g. the summary) are tokenized.
+    """
+
+    def __init__(self, count_fn: Callable[[str], int] = get_code_abs_token):
+        self.count_fn = count_fn
+        self._messages: Optional[List[Dict[str, Any]]] = None
+        self._counts: List[MessageTokens] = []
+        # id(message) -> (message, content object, counts); holding the message keeps ids stable
+        self._known: Dict[int, tuple] = {}
+        # id(content) -> (content, tool_calls, role, counts); recognizes the same message body
+        # re-wrapped in a new dict (e.g. frozen into a shared history)
+        self._by_content: Dict[int, tuple] = {}
+        self._tool_call_names: Dict[str, str] = {}
+
+        self.total_tokens = 0
+        self.by_role: Counter = Counter()
+        self.by_category: Counter = Counter()
+        self.by_tool: Counter = Counter()
+        self.tokenized_messages = 0
+
+    def _count(self, msg: Dict[str, Any]) -> MessageTokens:
+        known = self._known.get(id(msg))
+        if known is not None and known[0] is msg and known[1] is msg.get("content"):
+            return known[2]
+        content = msg.get("content")
+        same_body = self._by_content.get(id(content)) if content else None
+        if (same_body is not None and same_body[0] is content
+                and same_body[1] is msg.get("tool_calls") and same_body[2] == msg.get("role")):
+            self._known[id(msg)] = (msg, content, same_body[3])
+            return same_body[3]
+
+        raw_content = content
+        if isinstance(content, list):
+            content = json.dumps(content, ensure_ascii=False)
+        content_tokens = self.count_fn(str(content)) if content else 0
+
+        tool_call_tokens = 0
+        for call in msg.get("tool_calls") or []:
+            function = call.get("function", {}) if isinstance(call, dict) else {}
+            if call.get("id") and function.get("name"):
+                self._tool_call_names[call["id"]] = function["name"]
+            tool_call_tokens += self.count_fn(f"{function.get('name', '')}{function.get('arguments', '')}")
+
+        tool_name = None
+        responses = msg.get("tool_responses")
+        if responses:
+            names = {self._tool_call_names.get(r.get("tool_call_id"), "unknown") for r in responses}
+            tool_name = names.pop() if len(names) == 1 else "multiple"
+        elif msg.get("role") == "tool":
+            tool_name = self._tool_call_names.get(msg.get("tool_call_id"), msg.get("name") or "unknown")
+
+        counts = MessageTokens(
+            role=msg.get("role") or msg.get("name") or "unknown",
+            content=content_tokens,
+            tool_calls=tool_call_tokens,
+            tool_name=tool_name,
+        )
+        self._known[id(msg)] = (msg, raw_content, counts)
+        if raw_content:
+            self._by_content[id(raw_content)] = (raw_content, msg.get("tool_calls"), msg.get("role"), counts)
+        self.tokenized_messages += 1
+        return counts
+
+    def _add(self, counts: MessageTokens, sign: int = 1) -> None:
+        self.total_tokens += sign * counts.total
+        self.by_role[counts.role] += sign * counts.total
+        self.by_category[counts.category] += sign * counts.total
+        if counts.tool_name is not None:
+            self.by_tool[counts.tool_name] += sign * counts.total
+
+    def _reset_totals(self) -> None:
+        self.total_tokens = 0
+        self.by_role = Counter()
+        self.by_category = Counter()
+        self.by_tool = Counter()
+
+    def sync(self, messages: List[Dict[str, Any]]) -> int:
+        """Bring the ledger up to date with a message list and return the running total"""
+        synced = len(self._counts)
+        appended_only = (
+            messages is self._messages
+            and len(messages) >= synced
+            and (synced == 0 or self._known.get(id(messages[synced - 1]), (None,))[0] is messages[synced - 1])
+        )
+        if appended_only:
+            for msg in messages[synced:]:
+                counts = self._count(msg)
+                self._counts.append(counts)
+                self._add(counts)
+            return self.total_tokens
+
+        # The list was replaced or rewritten: reuse counts of surviving messages
+        self._reset_totals()
+        self._counts = [self._count(msg) for msg in messages]
+        for counts in self._counts:
+            self._add(counts)
+        self._known = {id(msg): self._known[id(msg)] for msg in messages}
+        self._by_content = {
+            id(entry[1]): (entry[1], entry[0].get("tool_calls"), entry[0].get("role"), entry[2])
+            for entry in self._known.values() if entry[1]
+        }
+        self._messages = messages
+        return self.total_tokens
+
+    def measure(self, messages: List[Dict[str, Any]]) -> int:
+        """Total tokens of a candidate message list, reusing known counts"""
+        return sum(self._count(msg).total for msg in messages)
+
+    def breakdown(self) -> Dict[str, Any]:
+        return {
+            "total_tokens": self.total_tokens,
+            "messages": len(self._counts),
+            "by_role": dict(self.by_role),
+            "by_category": dict(self.by_category),
+            "by_tool": dict(self.by_tool),
+            "tokenized_messages": self.tokenized_messages,
+        }
@@ -1,5 +1,6 @@
 import os
 import re
+import math
 import sys
 import pickle
 import json
@@ -9,21 +10,28 @@ import ast
 from grep_ast import TreeContext
 import tiktoken
 from src.core.code_utils import get_code_abs_token, should_ignore_path, ignored_dirs, ignored_file_patterns, cut_logs_by_token
+from src.core.tool_result_cache import ToolResultCache, cached_tool
+from src.core.path_index import PathIndex, PathEntry
 from src.utils.data_preview import file_tree, _parse_ipynb_file
 
 
 
 
 class CodeExplorerTools:
-    def __init__(self, repo_path: str, work_dir: Optional[str] = None, docker_work_dir: Optional[str] = None, init_embeddings: bool = False):
+    def __init__(self, repo_path: str, work_dir: Optional[str] = None, docker_work_dir: Optional[str] = None, init_embeddings: bool = False, enable_result_cache: bool = True):
         """Initialize code repository exploration tool
         
         Args:
             repo_path: Local path of code repository
             work_dir: Working directory
+            enable_result_cache: Memoize repeated tool calls until the underlying files change
         """
         self.context_lines = 0
         
+        # Tool result cache, keyed by (tool, arguments, tree version)
+        self.result_cache = ToolResultCache() if enable_result_cache else None
+        self.tree_version = 0
+        
         self.repo_path = repo_path
         self.work_dir = work_dir.rstrip('/') if work_dir else ''
         
@@ -37,10 +45,8 @@ class CodeExplorerTools:
         self._initialize_data_structures()
         
         # Initialize vector search related properties
-        self.init_embeddings = init_embeddings
-        
-        if init_embeddings:
-            self.retriever = self.init_embeddings()
+        self.use_embeddings = init_embeddings
+        self.retriever = self.init_embeddings() if init_embeddings else None
     
     def _build_new_tree(self):
         """Build new code tree"""
@@ -50,6 +56,48 @@ class CodeExplorerTools:
         )
         self.builder.parse_repository()
         self.code_tree = self.builder.code_tree
+        
+        # A new tree invalidates every cached tool result
+        self.tree_version += 1
+        self._tracked_files = None
+        if self.result_cache is not None:
+            self.result_cache.invalidate_all()
+    
+    def _tracked_file_paths(self) -> List[str]:
+        """Absolute paths of all files recorded in the code tree"""
+        if getattr(self, '_tracked_files', None) is None:
+            self._tracked_files = [
+                os.path.join(self.repo_path, file_info['path'])
+                for file_info in {**self.modules, **self.other_files}.values()
+            ]
+        return self._tracked_files
+    
+    def _entity_dependency_files(self, entity_id: str, entity_type: str) -> List[str]:
+        """Files a class/function/module lookup result was built from"""
+        found_entity_id, error = self._find_entity(entity_id, entity_type)
+        if error:
+            return []
+        if entity_type == "module":
+            module_id = found_entity_id
+        elif entity_type == "class":
+            module_id = self.classes[found_entity_id]['module']
+        else:
+            module_id = self.functions[found_entity_id]['module']
+        if module_id not in self.modules:
+            return []
+        return [os.path.join(self.repo_path, self.modules[module_id]['path'])]
+    
+    def _file_dependency_files(self, file_path: str) -> List[str]:
+        """Files a view_file_content result was built from"""
+        entry, _ = self._resolve_path(file_path)
+        if entry is not None:
+            return [entry.abs_path]
+        dependencies = self._entity_dependency_files(self._normalize_file_path(file_path), "module")
+        if dependencies:
+            return dependencies
+        if os.path.isabs(file_path):
+            return [file_path]
+        return [os.path.join(self.repo_path, file_path)]
     
     def _initialize_data_structures(self):
         """Initialize internal data structures"""
@@ -87,6 +135,40 @@ class CodeExplorerTools:
         print(f"Loaded {len(self.modules)} modules")
         print(f"Loaded {len(self.classes)} classes")
         print(f"Loaded {len(self.functions)} functions")
+        
+        # Path lookup table shared by every tool taking a file argument
+        self.path_index = PathIndex(self.repo_path, self.modules, self.other_files, self._module_importance_scores())
+    
+    def _module_importance_scores(self) -> Dict[str, float]:
+        """Module importance scores from the code tree, normalized to [0, 1]"""
+        key_modules = self.code_tree.get('key_modules', []) if isinstance(self.code_tree, dict) else []
+        max_score = max((m.get('importance_score', 0) for m in key_modules), default=0)
+        if max_score <= 0:
+            return {}
+        return {m['id']: m.get('importance_score', 0) / max_score for m in key_modules}
+    
+    def _resolve_path(self, file_path: str, python_only: bool = False) -> Tuple[Optional[PathEntry], Optional[str]]:
+        """Resolve a filename, relative path, absolute path or module path through the path index
+        
+        Returns:
+            (entry, None) for a unique match, (None, error message) when ambiguous, (None, None) when unknown
+        """
+        entry, candidates = self.path_index.resolve(file_path, python_only=python_only)
+        if entry is None and candidates:
+            # An existing path given relative to the repository root is never ambiguous
+            if os.path.isfile(os.path.join(self.repo_path, file_path)):
+                return None, None
+            return None, self.path_index.format_ambiguous(file_path, candidates)
+        return entry, None
+    
+    def _find_module(self, file_path: str) -> Tuple[Optional[str], Optional[str]]:
+        """Find a Python module id for a path-like reference, falling back to partial module id matching"""
+        entry, error = self._resolve_path(file_path, python_only=True)
+        if entry is not None:
+            return entry.module_id, None
+        if error:
+            return None, error
+        return self._find_entity(self._normalize_file_path(file_path), "module")
     
     def _find_entity(self, entity_id: str, entity_type: str) -> Tuple[Optional[str], Optional[str]]:
         """Generic entity search function
@@ -319,6 +401,7 @@ class CodeExplorerTools:
             # Return string format
             return "\n".join(format_dir_structure(path))
 
+    @cached_tool()
     def search_keyword_include_code(self, 
                                    keyword_or_code: Annotated[str, "Keywords or code snippets to search for matches"],
                                    query_intent: Annotated[Optional[str], "Search intent, describing what problem this search aims to solve or what content to find"] = None
@@ -334,7 +417,7 @@ class CodeExplorerTools:
                 output.append(f"{module_info['module_path']}:       contains {len(module_info['match_codes'])} matching code lines")
             search_result += "\n".join(output)
         
-        if self.init_embeddings:
+        if self.retriever is not None:
             # Try using vector search
             search_query = f"search intent: {query_intent}\nkeyword: {keyword_or_code}"
             vector_search_codes = self._search_with_embeddings(search_query, topk=4)
@@ -379,12 +462,8 @@ class CodeExplorerTools:
             def validate(input):
                 # Validate input data
         """
-        # Handle file path format, compatible with different input methods
-        module_id = self._normalize_file_path(file_path)
-        # import pdb;pdb.set_trace()
-        
-        # Find matching module
-        found_module_id, error = self._find_entity(module_id, "module")
+        # Find matching module, compatible with different input methods
+        found_module_id, error = self._find_module(file_path)
         if error:
             return error
         
@@ -443,6 +522,7 @@ class CodeExplorerTools:
                 return "\n".join(lines[:50]) + f"\n... [Omitted {len(lines)-50} lines]"
             return module_info['content']
     
+    @cached_tool(files=lambda self, class_id: self._entity_dependency_files(class_id, "class"))
     def view_class_details(self, class_id: Annotated[str, "Class identifier, can be complete path (like 'src.models.User') or simple name (like 'User')"]) -> Annotated[str, "Formatted detailed class information including module location, docstring, inheritance relationships, method list and source code"]:
         """View detailed class information
         
@@ -473,6 +553,10 @@ class CodeExplorerTools:
             return error
         
         # Only one match, display directly
+        return self._render_class_details(found_class_id)
+    
+    def _render_class_details(self, found_class_id: str, max_token: int = 1000) -> str:
+        """Format details of a resolved class, source code is summarized above max_token"""
         class_info = self.classes[found_class_id]
         result = [f"# Class: {class_info['name']}"]
         result.append(f"Module location: {class_info['module']}")
@@ -500,7 +584,6 @@ class CodeExplorerTools:
         # Add source code summary
         result.append("\nSource code:")
         
-        max_token = 1000
         if self.get_code_abs_token(class_info['source']) > max_token:
             class_info_summary = self._get_code_abs(f"{class_info['module']}.py", class_info['source'], max_token=max_token)
             if self.get_code_abs_token(class_info_summary) > max_token:
@@ -511,6 +594,7 @@ class CodeExplorerTools:
         
         return "\n".join(result)
     
+    @cached_tool(files=lambda self, function_id: self._entity_dependency_files(function_id, "function"))
     def view_function_details(self, function_id: Annotated[str, "Function identifier, can be complete path (like 'src.utils.format_data') or simple name (like 'format_data')"]) -> Annotated[str, "Formatted detailed function information including function type, parameters, return type, call relationships and source code"]:
         """View detailed function information
         
@@ -544,6 +628,10 @@ class CodeExplorerTools:
             return error
         
         # Only one match, display directly
+        return self._render_function_details(found_function_id)
+    
+    def _render_function_details(self, found_function_id: str, max_token: int = 1000) -> str:
+        """Format details of a resolved function, source code is summarized above max_token"""
         func_info = self.functions[found_function_id]
         result = [f"# {'Method' if func_info['class'] else 'Function'}: {func_info['name']}"]
         result.append(f"Module location: {func_info['module']}")
@@ -582,7 +670,6 @@ class CodeExplorerTools:
         
         # Add source code
         result.append("\nSource code:")
-        max_token = 1000
         if self.get_code_abs_token(func_info['source']) > max_token:
             func_info_summary = self._get_code_abs(f"{func_info['module']}.py", func_info['source'], max_token=max_token)
             if self.get_code_abs_token(func_info_summary) > max_token:
@@ -592,6 +679,177 @@ class CodeExplorerTools:
         result.append(func_info_summary)
         return "\n".join(result)
     
+    def _resolve_entity(self, entity_id: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Resolve an identifier of unknown kind to a class, function, module or plain file
+        
+        Returns:
+            Tuple of (entity type, matching id or absolute path, error message)
+        """
+        entity_id = entity_id.strip()
+        for entity_type, entities in (("class", self.classes), ("function", self.functions), ("module", self.modules)):
+            if entity_id in entities:
+                return entity_type, entity_id, None
+        
+        # Path-like identifiers are looked up as files
+        if '/' in entity_id or '\\' in entity_id or os.path.splitext(entity_id)[1] in ('.py', '.ipynb', '.md', '.txt', '.json', '.yaml', '.yml', '.sh', '.toml', '.cfg'):
+            entry, error = self._resolve_path(entity_id)
+            if error:
+                return None, None, error
+            if entry is not None:
+                if entry.is_python_module:
+                    return "module", entry.module_id, None
+                if entry.module_id in self.other_files and self.other_files[entry.module_id]['path'] == entry.rel_path:
+                    return "other_file", entry.module_id, None
+                return "file", entry.abs_path, None
+            abs_path = entity_id if os.path.isabs(entity_id) else os.path.join(self.repo_path, entity_id)
+            if os.path.isfile(abs_path):
+                return "file", abs_path, None
+            return None, None, f"Cannot find file: {entity_id}"
+        
+        errors = []
+        for entity_type in ("class", "function", "module"):
+            found_id, error = self._find_entity(entity_id, entity_type)
+            if found_id:
+                return entity_type, found_id, None
+            if error and not error.startswith("Cannot find"):
+                errors.append(error)
+        if errors:
+            return None, None, "\n".join(errors)
+        return None, None, f"Cannot find class, function, module or file: {entity_id}"
+    
+    def _entity_source(self, entity_type: str, found_id: str) -> str:
+        if entity_type == "class":
+            return self.classes[found_id].get('source', '')
+        if entity_type == "function":
+            return self.functions[found_id].get('source', '')
+        if entity_type == "module":
+            return self.modules[found_id].get('content', '')
+        if entity_type == "other_file":
+            return self.other_files[found_id].get('content', '')
+        try:
+            with open(found_id, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        except Exception:
+            return ''
+    
+    def _entity_importance(self, entity_type: str, found_id: str, module_scores: Dict[str, float]) -> float:
+        """Relative importance of an entity: usage by other code plus importance of its module"""
+        usage = 0
+        module_id = None
+        if entity_type == "class":
+            class_info = self.classes[found_id]
+            module_id = class_info.get('module')
+            usage = sum(len(self.functions[m].get('called_by', [])) for m in class_info.get('methods', []) if m in self.functions)
+        elif entity_type == "function":
+            func_info = self.functions[found_id]
+            module_id = func_info.get('module')
+            usage = len(func_info.get('called_by', []))
+        elif entity_type == "module":
+            module_id = found_id
+            usage = sum(
+                len(self.functions[f].get('called_by', []))
+                for f in self.modules[found_id].get('functions', []) if f in self.functions
+            )
+        return 1.0 + math.log1p(usage) + module_scores.get(module_id, 0.0)
+    
+    @staticmethod
+    def _split_token_budget(weights: List[float], sizes: List[int], total_budget: int, min_budget: int = 300) -> List[int]:
+        """Split a token budget proportionally to weights
+        
+        Entities that need less than their share only get what they need and the remainder is
+        redistributed among the others. Every entity gets at least min_budget tokens (capped by its size).
+        """
+        budgets = [0] * len(weights)
+        pending = list(range(len(weights)))
+        remaining = total_budget
+        while pending and remaining > 0:
+            weight_sum = sum(weights[i] for i in pending) or 1.0
+            shares = {i: max(int(remaining * weights[i] / weight_sum), min_budget) for i in pending}
+            satisfied = [i for i in pending if sizes[i] <= shares[i]]
+            if not satisfied:
+                for i in pending:
+                    budgets[i] = shares[i]
+                break
+            for i in satisfied:
+                budgets[i] = sizes[i]
+                remaining -= sizes[i]
+                pending.remove(i)
+        for i in pending:
+            if not budgets[i]:
+                budgets[i] = min(sizes[i], min_budget)
+        return budgets
+    
+    def _entities_dependency_files(self, entity_ids: List[str]) -> List[str]:
+        """Files a view_code_entities result was built from"""
+        files = []
+        for entity_id in entity_ids:
+            entity_type, found_id, error = self._resolve_entity(entity_id)
+            if error:
+                continue
+            if entity_type == "file":
+                files.append(found_id)
+            elif entity_type == "other_file":
+                files.append(os.path.join(self.repo_path, self.other_files[found_id]['path']))
+            else:
+                files.extend(self._entity_dependency_files(found_id, entity_type))
+        return list(dict.fromkeys(files))
+    
+    @cached_tool(files=lambda self, entity_ids, total_token_budget=6000: self._entities_dependency_files(entity_ids))
+    def view_code_entities(self,
+                           entity_ids: Annotated[List[str], "List of class/function/module identifiers or file paths to view together"],
+                           total_token_budget: Annotated[int, "Total token budget shared by all requested entities"] = 6000
+                           ) -> Annotated[str, "Details of every requested entity, each trimmed to its share of the token budget"]:
+        """View several classes, functions, modules or files in one call
+        
+        Prefer this over repeated view_class_details/view_function_details/view_file_content calls
+        when several related entities are needed. The token budget is split by importance
+        (how often the code is used and how central its module is); small entities are shown in
+        full and the saved budget goes to the larger ones.
+        
+        Example:
+            >>> view_code_entities(["User", "src.utils.format_data", "README.md"], 4000)
+            ## [1/3] class src.models.User (budget 1800 tokens)
+            ...
+        """
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        entity_ids = list(dict.fromkeys(e for e in entity_ids if e and e.strip()))
+        if not entity_ids:
+            return "No entity identifiers provided."
+        
+        module_scores = self._module_importance_scores()
+        
+        resolved, errors = [], []
+        for entity_id in entity_ids:
+            entity_type, found_id, error = self._resolve_entity(entity_id)
+            if error:
+                errors.append(f"## {entity_id}\n{error}")
+                continue
+            resolved.append((entity_type, found_id))
+        
+        weights = [self._entity_importance(t, i, module_scores) for t, i in resolved]
+        # Leave some room for headers and formatting around the code
+        sizes = [self.get_code_abs_token(self._entity_source(t, i)) + 150 for t, i in resolved]
+        budgets = self._split_token_budget(weights, sizes, total_token_budget)
+        
+        sections = []
+        for index, ((entity_type, found_id), budget) in enumerate(zip(resolved, budgets), 1):
+            if entity_type == "class":
+                content = self._render_class_details(found_id, max_token=budget)
+            elif entity_type == "function":
+                content = self._render_function_details(found_id, max_token=budget)
+            elif entity_type == "module":
+                content = self._format_file_content(found_id, self.modules[found_id], "python", max_tokens=budget)
+            else:
+                path = self.other_files[found_id]['path'] if entity_type == "other_file" else found_id
+                content = f"**File: {path}**\n\n```\n{self._entity_source(entity_type, found_id)}\n```"
+            label = "file" if entity_type == "other_file" else entity_type
+            name = self.other_files[found_id]['path'] if entity_type == "other_file" else found_id
+            header = f"## [{index}/{len(resolved)}] {label} {name} (budget {budget} tokens)"
+            sections.append(header + "\n" + cut_logs_by_token(content, max_token=budget))
+        
+        return "\n\n".join(sections + errors)
+    
     def find_references(self, 
                        entity_id: Annotated[str, "Entity identifier, can be complete path or simple name"], 
                        entity_type: Annotated[str, "Entity type, must be one of 'function', 'class' or 'module'"]
@@ -749,50 +1007,39 @@ class CodeExplorerTools:
         
         return f"Unsupported entity type: {entity_type}"
 
-    def _prepare_documents(self, docs):
-        """Convert docs to Langchain Documents."""
-        from langchain.schema import Document
-        if isinstance(docs[0], dict):
-            return [
-                Document(
-                    page_content=doc['source'],
-                ) for doc in docs
-            ]
     def init_embeddings(self, topk=4):
-        from src.utils.tool_retriever_embed import EmbeddingMatcher
-        import uuid
+        """Build the vector index over function sources
+        
+        Embeddings are cached on disk by (embedding model, chunk content hash), so only functions
+        that are new or changed since a previous run are embedded again.
+        """
+        from src.core.code_embedding_index import CodeEmbeddingIndex, split_code_chunks
         
-        # Prepare documents
-        documents = []
+        # Prepare chunks, the code tree records are left untouched
+        chunks = []
         for func_id, func_info in self.functions.items():
             if 'source' not in func_info:
                 continue
-            func_info['source'] = f"module: {func_info['module']}\nclass: {func_info['class']}\n{func_info['source']}"
-            content = func_info
-            documents.append(content)
-        
-        if not documents:
-            return None   
-        
-        retriever = EmbeddingMatcher(
-            topk=topk, 
-            chunk_size=5000,
-            chunk_overlap=0,
-            embedding_weight=0.6,
-            document_converter=self._prepare_documents,
-            initial_docs=documents,
-            persistent_db=True,
-            persistent_db_path=f"db/{str(uuid.uuid4())}",
-            persistent_collection_name=str(uuid.uuid4()),
-        )
+            text = f"module: {func_info['module']}\nclass: {func_info['class']}\n{func_info['source']}"
+            for i, chunk in enumerate(split_code_chunks(text, chunk_size=5000)):
+                chunks.append((f"{func_id}#{i}", chunk))
         
+        if not chunks:
+            return None
+        
+        try:
+            retriever = CodeEmbeddingIndex()
+            retriever.build(chunks)
+        except Exception as e:
+            print(f"Failed to build embedding index: {e}")
+            return None
         return retriever
 
     def _search_with_embeddings(self, query, topk=4):
         """Use vector retrieval and BM25 hybrid search to find matching code snippets"""
         try:
             # Execute search
-            results = self.retriever.match_docs_with_bm25(query)
+            results = [text for _, text, _ in self.retriever.search(query, topk=topk)]
             
             max_token = 500
             
@@ -873,16 +1120,22 @@ class CodeExplorerTools:
             src.utils.helpers
             src.config
         """
-        # If complete path is provided, convert to module path
-        if os.path.isabs(module_path):
-            rel_path = os.path.relpath(module_path, self.repo_path)
-            module_path = rel_path.replace(os.sep, '.').replace('.py', '')
+        entry, error = self._resolve_path(module_path, python_only=True)
+        if error:
+            return error
+        if entry is not None:
+            module_path, file_path = entry.module_id, entry.abs_path
         else:
-            # Try to handle as module path directly
-            module_path = module_path.replace('/', '.').replace('.py', '')
-        
-        # Find module file
-        file_path = os.path.join(self.repo_path, *module_path.split('.')) + '.py'
+            # If complete path is provided, convert to module path
+            if os.path.isabs(module_path):
+                rel_path = os.path.relpath(module_path, self.repo_path)
+                module_path = rel_path.replace(os.sep, '.').replace('.py', '')
+            else:
+                # Try to handle as module path directly
+                module_path = module_path.replace('/', '.').replace('.py', '')
+            
+            # Find module file
+            file_path = os.path.join(self.repo_path, *module_path.split('.')) + '.py'
         if not os.path.exists(file_path):
             return f"Cannot find module: {module_path}"
         
@@ -924,8 +1177,14 @@ class CodeExplorerTools:
             "relative_path": None,
         }
             
-        module_id = self._normalize_file_path(file_path)
-        found_module_id, error = self._find_entity(module_id, "module")
+        entry, _ = self._resolve_path(file_path)
+        if entry is not None:
+            output["is_python_module"] = entry.is_python_module
+            output["abs_path"] = entry.module_id if entry.is_python_module else entry.abs_path
+            output["relative_path"] = entry.rel_path
+            return output
+        
+        found_module_id, error = self._find_module(file_path)
         if not error and found_module_id:
             print(f"Python file or directory exists: {file_path}")
             output["is_python_module"] = True
@@ -951,6 +1210,7 @@ class CodeExplorerTools:
         return output
     
 
+    @cached_tool(files=lambda self, file_path, query_intent=None: self._file_dependency_files(file_path))
     def view_file_content(self, file_path: Annotated[str, "Can be file path or filename"], query_intent: Annotated[Optional[str], "View intent, describing what problem viewing this file aims to solve or what content to find"] = None) -> Annotated[str, "File content or its intelligent summary (for large files)"]:
         """View complete file content, but cannot edit file
         
@@ -992,9 +1252,17 @@ class CodeExplorerTools:
         if query_intent:
             result.append(f"# Browse intent/purpose: {query_intent}\n")
         
-        # Check if it's Python module path
-        module_id = self._normalize_file_path(file_path)
-        found_module_id, error = self._find_entity(module_id, "module")
+        # Resolve through the path index first, then fall back to partial module id matching
+        entry, error = self._resolve_path(file_path)
+        if error:
+            return "\n".join(result) + error if result else error
+        if entry is not None and entry.is_python_module:
+            found_module_id = entry.module_id
+        elif entry is not None:
+            found_module_id = None
+            file_path = entry.rel_path
+        else:
+            found_module_id, error = self._find_module(file_path)
         
         if not error and found_module_id:
             # Handle found Python module
@@ -1,11 +1,21 @@
 import json
 import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from textwrap import dedent
-from typing import Any, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 import tiktoken
-from autogen.oai import OpenAIWrapper
+from src.core.prompt_layout import extract_cached_tokens
+from src.utils.llm_response_cache import cached_llm_create
+from src.utils.llm_client_registry import get_llm_wrapper
+from src.utils.llm_tiers import tier_llm_config, tracked_create
+from src.utils.usage_accounting import record_usage
 
 
 TOOL_RESPONSE_SUMMARY_PROMPT = dedent("""
@@ -27,6 +37,68 @@ Use short paragraphs or bullet points and avoid omitting essential information.
 """)
 
 
+class SummaryCache:
+    """Two tier cache of tool response summaries
+
+    Entries live in an in-memory LRU and, when cache_dir is set, in one JSON file per key on disk so
+    summaries survive across runs.
+    """
+
+    def __init__(self, max_entries: int = 512, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(tool_name: Optional[str], content: str, intent: str, model: Optional[str]) -> str:
+        content_hash = hashlib.sha256(content.encode("utf-8", errors="ignore")).hexdigest()
+        raw = json.dumps([tool_name or "", content_hash, intent or "", model or ""], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        self._remember(key, entry)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print(f"[ToolResponseSummarizer] cache write failed: {exc}", flush=True)
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
 class ToolResponseSummarizer:
     def __init__(
         self,
@@ -34,13 +106,54 @@ class ToolResponseSummarizer:
         token_limit: int = 1000,
         work_dir: Optional[str] = None,
         agent_name: str = "tool_response_summarizer",
+        cache_dir: Optional[str] = None,
+        max_concurrency: int = 4,
     ):
+        """
+        Args:
+            cache_dir: Directory of the on-disk summary cache tier (default TOOL_SUMMARY_CACHE_DIR,
+                in-memory only when unset)
+            max_concurrency: Number of summaries generated in parallel by a_maybe_summarize
+        """
         self.llm_config = llm_config or {}
         self.token_limit = token_limit
         self.work_dir = work_dir
         self.agent_name = agent_name or "tool_response_summarizer"
         self.encoding = tiktoken.get_encoding("cl100k_base")
 
+        self.cache = SummaryCache(cache_dir=cache_dir or os.getenv("TOOL_SUMMARY_CACHE_DIR") or None)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tool-summary")
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "summaries": 0,
+            "cache_hits": 0,
+            "saved_llm_tokens": 0,
+            "saved_latency_s": 0.0,
+            "llm_latency_s": 0.0,
+        }
+
+    async def a_maybe_summarize(
+        self,
+        *,
+        tool_name: Optional[str],
+        tool_arguments: Any,
+        tool_response: str,
+    ) -> Optional[str]:
+        """Async maybe_summarize running in the summarizer pool
+
+        Tool calls of one assistant message are executed concurrently, so their oversized
+        responses are summarized in parallel instead of one after another.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool,
+            lambda: self.maybe_summarize(
+                tool_name=tool_name,
+                tool_arguments=tool_arguments,
+                tool_response=tool_response,
+            ),
+        )
+
     def maybe_summarize(
         self,
         *,
@@ -55,9 +168,37 @@ class ToolResponseSummarizer:
         if before_tokens <= self.token_limit:
             return None
 
-        summary, usage, model = self._generate_summary(tool_name, tool_arguments, tool_response)
+        cache_key = SummaryCache.make_key(
+            tool_name, tool_response, self._extract_intent(tool_arguments), self._configured_model()
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            saved_tokens = (cached.get("usage") or {}).get("total_tokens") or 0
+            saved_latency = cached.get("latency_s") or 0.0
+            with self._stats_lock:
+                self.stats["cache_hits"] += 1
+                self.stats["saved_llm_tokens"] += saved_tokens
+                self.stats["saved_latency_s"] += saved_latency
+            print(f"[ToolResponseSummarizer] cache hit for {tool_name}: saved {saved_tokens} tokens, {saved_latency:.2f}s", flush=True)
+            self._log_compression(
+                model=cached.get("model"),
+                usage=None,
+                source_tool=tool_name,
+                before_tokens=before_tokens,
+                after_tokens=self._count_tokens(cached["summary"]),
+                cache={"hit": True, "saved_tokens": saved_tokens, "saved_latency_s": saved_latency},
+            )
+            return cached["summary"]
+
+        start = time.perf_counter()
+        summary, usage, model, response_cache_hit = self._generate_summary(tool_name, tool_arguments, tool_response)
+        latency = time.perf_counter() - start
         if not summary:
             return None
+        self.cache.put(cache_key, {"summary": summary, "usage": usage, "model": model, "latency_s": round(latency, 3)})
+        with self._stats_lock:
+            self.stats["summaries"] += 1
+            self.stats["llm_latency_s"] += latency
 
         after_tokens = self._count_tokens(summary)
         self._log_compression(
@@ -66,9 +207,36 @@ class ToolResponseSummarizer:
             source_tool=tool_name,
             before_tokens=before_tokens,
             after_tokens=after_tokens,
+            cache={"hit": False, "latency_s": round(latency, 3)},
+            response_cache_hit=response_cache_hit,
         )
         return summary
 
+    def _summary_llm_config(self) -> dict[str, Any]:
+        """llm_config on the model tier of tool summaries"""
+        return tier_llm_config("tool_summary", self.llm_config)
+
+    def _configured_model(self) -> Optional[str]:
+        llm_config = self._summary_llm_config()
+        config_list = llm_config.get("config_list") or []
+        if config_list and isinstance(config_list[0], dict):
+            return config_list[0].get("model")
+        return llm_config.get("model")
+
+    def _extract_intent(self, arguments: Any) -> str:
+        """The caller's stated intent (query_intent and similar arguments), part of the cache key"""
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except Exception:
+                return ""
+        if not isinstance(arguments, dict):
+            return ""
+        for key in ("query_intent", "intent", "query"):
+            if arguments.get(key):
+                return str(arguments[key])
+        return ""
+
     def _count_tokens(self, text: str) -> int:
         if not text:
             return 0
@@ -82,7 +250,7 @@ class ToolResponseSummarizer:
         tool_name: Optional[str],
         tool_arguments: Any,
         tool_response: str,
-    ) -> Tuple[Optional[str], Optional[dict[str, Any]], Optional[str]]:
+    ) -> Tuple[Optional[str], Optional[dict[str, Any]], Optional[str], bool]:
         prompt = TOOL_RESPONSE_SUMMARY_PROMPT.format(
             tool_name=tool_name or "unknown_tool",
             tool_arguments=self._format_arguments(tool_arguments),
@@ -90,12 +258,17 @@ class ToolResponseSummarizer:
         )
         messages = [{"role": "user", "content": prompt}]
 
+        response_cache_hits = []
         try:
-            client = OpenAIWrapper(**self.llm_config)
-            response = client.create(messages=messages)
+            client = get_llm_wrapper(self._summary_llm_config())
+            model = self._configured_model()
+            response = cached_llm_create(
+                tracked_create("tool_summary", client.create, model), model=model, messages=messages,
+                on_hit=lambda cached: response_cache_hits.append(True),
+            )
         except Exception as exc:
             print(f"[ToolResponseSummarizer] summarize failed: {exc}", flush=True)
-            return None, None, None
+            return None, None, None, False
 
         summary = None
         try:
@@ -108,7 +281,7 @@ class ToolResponseSummarizer:
         if model is None and hasattr(response, "to_dict"):
             model = response.to_dict().get("model")
 
-        return summary, usage, model
+        return summary, usage, model, bool(response_cache_hits)
 
     def _format_arguments(self, arguments: Any) -> str:
         if arguments is None:
@@ -143,6 +316,7 @@ class ToolResponseSummarizer:
             "prompt_tokens": _get(usage, "prompt_tokens"),
             "completion_tokens": _get(usage, "completion_tokens"),
             "total_tokens": _get(usage, "total_tokens"),
+            "cached_tokens": extract_cached_tokens(usage),
         }
 
     def _log_compression(
@@ -153,10 +327,10 @@ class ToolResponseSummarizer:
         source_tool: Optional[str],
         before_tokens: int,
         after_tokens: int,
+        cache: Optional[dict[str, Any]] = None,
+        response_cache_hit: bool = False,
     ):
         log_dir = self.work_dir or os.path.join(os.getcwd(), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        log_path = os.path.join(log_dir, "token_usage.log")
 
         entry = {
             "ts": datetime.now().isoformat(),
@@ -171,10 +345,14 @@ class ToolResponseSummarizer:
             },
             "usage": usage,
         }
+        if cache is not None:
+            entry["cache"] = cache
+        if response_cache_hit:
+            # Served by the LLM response cache: the usage is accounted as saved, not spent
+            entry["response_cache_hit"] = True
 
         try:
-            with open(log_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            record_usage(log_dir, entry)
         except Exception as exc:
             print(f"[ToolResponseSummarizer] log failed: {exc}", flush=True)
 
@@ -0,0 +1,238 @@
+import os
+import json
+import inspect
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.core.code_utils import get_code_abs_token
+
+
+# Dependency marker for results that depend on every file of the repository (e.g. keyword search)
+REPO_SCOPE = "*"
+
+
+def _synchronized(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+@dataclass
+class _CacheEntry:
+    tool_name: str
+    call_args: Dict[str, Any]
+    result: str
+    files: Dict[str, Optional[Tuple[int, int]]] = field(default_factory=dict)
+    repo_scope: bool = False
+    shown_turn: Optional[int] = None
+    tokens: Optional[int] = None
+
+
+class ToolResultCache:
+    """Memoize code explorer tool results
+
+    Entries are keyed by (tool name, normalized arguments, tree version). Every entry records the
+    (mtime, size) fingerprint of the files its result was built from, so an entry is dropped as soon
+    as one of those files changes on disk. Repeated calls whose result is still visible in the
+    conversation can be answered with a short reference to the turn where it was shown.
+    """
+
+    def __init__(self, max_entries: int = 256, reference_on_hit: bool = True, min_reference_tokens: int = 300):
+        self.max_entries = max_entries
+        self.reference_on_hit = reference_on_hit
+        self.min_reference_tokens = min_reference_tokens
+        self.turn = 0
+        # Tools may run concurrently in worker threads
+        self._lock = threading.RLock()
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._file_index: Dict[str, set] = defaultdict(set)
+
+        self.hits = 0
+        self.misses = 0
+        self.reference_hits = 0
+        self.invalidations = 0
+        self.saved_tokens = 0
+
+    @staticmethod
+    def make_key(tool_name: str, call_args: Dict[str, Any], tree_version: int = 0) -> str:
+        """Build a stable cache key from tool name, normalized arguments and tree version"""
+        normalized = {}
+        for name, value in call_args.items():
+            if isinstance(value, str):
+                value = value.strip()
+            normalized[name] = value
+        args_str = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+        return f"{tool_name}:{tree_version}:{args_str}"
+
+    @staticmethod
+    def _fingerprint(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @_synchronized
+    def get(self, key: str) -> Optional[_CacheEntry]:
+        """Return a still valid entry or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        changed = [path for path, fp in entry.files.items() if self._fingerprint(path) != fp]
+        if changed:
+            for path in changed:
+                self.invalidate_file(path)
+            self._drop(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    @_synchronized
+    def put(
+        self,
+        key: str,
+        tool_name: str,
+        call_args: Dict[str, Any],
+        result: str,
+        files: Iterable[str],
+        repo_scope: bool = False,
+    ) -> _CacheEntry:
+        """Store a result
+
+        Args:
+            files: Absolute paths the result depends on
+            repo_scope: The result depends on every tracked file (files then lists all of them)
+        """
+        self._drop(key)
+        entry = _CacheEntry(
+            tool_name=tool_name,
+            call_args=call_args,
+            result=result,
+            files={path: self._fingerprint(path) for path in files},
+            repo_scope=repo_scope,
+            shown_turn=self.turn,
+        )
+        self._entries[key] = entry
+        if repo_scope:
+            self._file_index[REPO_SCOPE].add(key)
+        else:
+            for path in entry.files:
+                self._file_index[path].add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._drop(oldest_key)
+        return entry
+
+    @_synchronized
+    def render_hit(self, entry: _CacheEntry) -> str:
+        """Return either the full cached result or a short reference to the turn where it was shown"""
+        if self.reference_on_hit and entry.shown_turn is not None:
+            if entry.tokens is None:
+                entry.tokens = get_code_abs_token(entry.result)
+            if entry.tokens >= self.min_reference_tokens:
+                args_str = ", ".join(f"{k}={v!r}" for k, v in entry.call_args.items() if v is not None)
+                reference = (
+                    f"[Unchanged result] {entry.tool_name}({args_str}) returned the same content already "
+                    f"shown at turn {entry.shown_turn}. Refer to that output instead of requesting it again."
+                )
+                self.reference_hits += 1
+                self.saved_tokens += max(entry.tokens - get_code_abs_token(reference), 0)
+                return reference
+        entry.shown_turn = self.turn
+        return entry.result
+
+    @_synchronized
+    def invalidate_file(self, path: str) -> int:
+        """Drop every entry built from the given file (and every repository-scoped entry)"""
+        path = os.path.abspath(path)
+        keys = set(self._file_index.pop(path, set())) | set(self._file_index.pop(REPO_SCOPE, set()))
+        for key in keys:
+            self._drop(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    @_synchronized
+    def invalidate_all(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._file_index.clear()
+
+    @_synchronized
+    def forget_shown(self) -> None:
+        """Forget where results were shown, e.g. after the conversation history was summarized"""
+        for entry in self._entries.values():
+            entry.shown_turn = None
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if entry.repo_scope:
+            self._file_index.get(REPO_SCOPE, set()).discard(key)
+        else:
+            for path in entry.files:
+                self._file_index.get(path, set()).discard(key)
+
+    @_synchronized
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "reference_hits": self.reference_hits,
+            "invalidations": self.invalidations,
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+def cached_tool(files: Optional[Callable[..., Optional[List[str]]]] = None):
+    """Decorator memoizing a CodeExplorerTools method through its `result_cache`
+
+    Args:
+        files: Called with the instance and the bound tool arguments, returns the absolute paths the
+            result depends on. When omitted the result depends on the whole repository.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        instance_arg = next(iter(signature.parameters))
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "result_cache", None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            call_args = dict(bound.arguments)
+            call_args.pop(instance_arg, None)
+
+            key = cache.make_key(func.__name__, call_args, getattr(self, "tree_version", 0))
+            entry = cache.get(key)
+            if entry is not None:
+                return cache.render_hit(entry)
+
+            result = func(self, *args, **kwargs)
+            if isinstance(result, str):
+                if files is None:
+                    cache.put(key, func.__name__, call_args, result, self._tracked_file_paths(), repo_scope=True)
+                else:
+                    cache.put(key, func.__name__, call_args, result, files(self, **call_args) or [])
+            return result
+
+        return wrapper
+    return decorator
@@ -1532,7 +1532,7 @@ class GlobalCodeTreeBuilder:
 
         # Process other important files
         if is_file_summary:
-            # Generate summary for other files
+            # Generate summary for other files (stored by their content and the budget, see generate_repository_summary)
             other_summary = generate_repository_summary(other_important_files, max_important_files_token=max_tokens-current_token)
             # If returned is a dictionary, convert to list format
             if isinstance(other_summary, dict):
@@ -1,5 +1,9 @@
 import json
+import queue
+import threading
+import uuid
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 from configs.oai_config import get_llm_config
 import os
 from configs.oai_config import get_llm_config
@@ -9,6 +13,7 @@ from src.utils.tool_optimizer_dialog import optimize_dialogue, optimize_executio
 from src.utils.tool_streamlit import random_string
 from streamlit_extras.colored_header import colored_header
 from src.utils.audit_logger import log_event
+from src.utils.llm_stream import stream_hub, stream_run
 
 from src.core.agent_scheduler import RepoMasterAgent
 
@@ -93,6 +98,55 @@ class AgentCaller:
             check_duplicate=True,
         )          
 
+    def _render_stream_event(self, event, view):
+        if event["type"] == "delta":
+            if event.get("agent") != view["agent"]:
+                view["agent"], view["text"] = event.get("agent"), ""
+            view["text"] += event["content"]
+        elif event["type"] == "tool_start":
+            # Tools of one turn can run concurrently, so a line is found again by its call id
+            key = event.get("call_id") or f"tool-{len(view['tools'])}"
+            view["tools"][key] = f"🔧 `{event['tool']}` running..."
+        elif event["type"] == "tool_end":
+            status = "✅" if event.get("ok", True) else "❌"
+            key = event.get("call_id") or next(reversed(view["tools"]), "tool-0")
+            view["tools"][key] = f"{status} `{event['tool']}` ({event.get('duration_s', 0):.1f}s)"
+        else:
+            return
+        lines = list(view["tools"].values())[-5:]
+        if view["text"]:
+            lines.append(f"**{view['agent'] or 'Assistant'}:** {view['text']}▌")
+        view["placeholder"].markdown("\n\n".join(lines))
+
+    def _solve_with_streaming(self, messages):
+        """Run the task in a worker thread and show partial text and tool progress while it runs"""
+        events = queue.Queue()
+        outcome = {}
+        # Only this session's run is shown, other Streamlit sessions publish into the same hub
+        run_id = uuid.uuid4().hex
+
+        def _run():
+            try:
+                with stream_run(run_id):
+                    outcome["response"] = self.repo_master.solve_task_with_repo(messages)
+            except Exception as e:
+                outcome["error"] = e
+
+        worker = threading.Thread(target=_run, daemon=True)
+        add_script_run_ctx(worker)
+        view = {"placeholder": st.empty(), "agent": None, "text": "", "tools": {}}
+        with stream_hub.subscribe(events.put, run_id=run_id):
+            worker.start()
+            while worker.is_alive() or not events.empty():
+                try:
+                    self._render_stream_event(events.get(timeout=0.1), view)
+                except queue.Empty:
+                    pass
+        view["placeholder"].empty()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["response"]
+
     def create_chat_completion(self, messages, user_id, chat_id, file_paths=None, active_user_memory=False):
         try:
             log_event(
@@ -124,7 +178,7 @@ class AgentCaller:
             
             messages = self.retrieve_user_memory(user_id, messages)
 
-        ai_response = self.repo_master.solve_task_with_repo(messages)
+        ai_response = self._solve_with_streaming(messages)
         
         if isinstance(ai_response, tuple):
             ai_response, chat_history = ai_response
@@ -4,7 +4,7 @@ import os
 import json
 from autogen.cache import Cache
 from datetime import datetime
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.llm_client_registry import get_chat_client
 
 from src.utils.tools_util import remove_work_dir_prefix
 from src.utils.toolkits import register_toolkits
@@ -50,7 +50,7 @@ class GeneralCoder():
     def initiate_agents(self, **kwargs):    
         self.general_coder = ExtendedAssistantAgent(
             name="General_Coder",
-            system_message=Coder_Prompt.format(current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), additional_info=""),
+            system_message=Coder_Prompt.format(current_time=datetime.now().strftime("%Y-%m-%d"), additional_info=""),
             llm_config=self.llm_config,
         )
 
@@ -91,7 +91,7 @@ class GeneralCoder():
                 data = json.load(f)
                 additional_info += f"\n>> You should consider the following local saved files if is your task related: {json.dumps(data, ensure_ascii=False)}\n"
         
-        self.general_coder.update_system_message(Coder_Prompt.format(current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), additional_info=additional_info))
+        self.general_coder.update_system_message(Coder_Prompt.format(current_time=datetime.now().strftime("%Y-%m-%d"), additional_info=additional_info))
 
     async def create_code_tool(
         self,
@@ -212,7 +212,7 @@ class GeneralCoder():
         {chat_history_text}
         """
         
-        file_summary = AzureGPT4Chat().chat(prompt, json_format=True)
+        file_summary = get_chat_client().chat(prompt, json_format=True)
         print("file_summary", file_summary)
         
         output = {}
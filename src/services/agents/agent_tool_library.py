@@ -1,7 +1,9 @@
 import json
+import asyncio
 import requests
-from typing import Annotated, Optional, Union, Callable
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from typing import Annotated, List, Optional, Union, Callable
+from urllib.parse import urlsplit, urlunsplit
+from src.utils.llm_client_registry import get_chat_client
 import tiktoken
 
 class AgentToolLibrary:
@@ -42,6 +44,8 @@ class AgentToolLibrary:
         
         # Lazy initialization of deep_search_agent
         self.deep_search_agent = None
+        # Concurrent page fetches/summaries of one search_and_browse call
+        self.max_parallel_browsing = 5
 
     def get_tool_list(self):
         tools = []
@@ -174,14 +178,18 @@ Please analyze the provided webpage browsing results based on the above principl
         token_count = len(tiktoken.encoding_for_model("gpt-4o").encode(browsing_result))
         if token_count < 2000:
             return browsing_result
-        
+
+        response = await self._reason_over_page(query, browsing_result)
+        print(f"Browsing Result: {response}")
+        return f"\n\n<Task>\n{query}\n\n<Browsing URL>\n{url}\n\n<Browsing Result>\n\n{response}\n\nPlease check the information, if not enough, please search more information."
+
+    async def _reason_over_page(self, query: str, browsing_result: str) -> str:
         prompt = (
             f"<browsing_target>\n{query}\n</browsing_target>\n"
             f"<browsing_result>\n{browsing_result}\n</browsing_result>\n"
         )
-
         try:
-            response = AzureGPT4Chat().chat_with_message(
+            return await get_chat_client().a_chat_with_message(
                 [
                     {"role": "system", "content": self.get_browsing_reasoning_system_prompt()},
                     {"role": "user", "content": prompt}
@@ -190,10 +198,77 @@ Please analyze the provided webpage browsing results based on the above principl
         except Exception as e:
             import traceback
             print(f"Error: {e}, {traceback.format_exc()}")
-            import pdb; pdb.set_trace()
             return f"Error: {e}, {traceback.format_exc()}"
-        print(f"Browsing Result: {response}")
-        return f"\n\n<Task>\n{query}\n\n<Browsing URL>\n{url}\n\n<Browsing Result>\n\n{response}\n\nPlease check the information, if not enough, please search more information."
+
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        """Canonical form of a result link used to deduplicate results across queries"""
+        parts = urlsplit((url or "").strip())
+        path = parts.path.rstrip("/")
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower().removeprefix("www."), path, parts.query, ""))
+
+    async def _browse_and_reason(self, query: str, url: str, semaphore: asyncio.Semaphore) -> dict:
+        async with semaphore:
+            try:
+                content = await self.web_browser.browsing_url(url)
+            except Exception as e:
+                return {"url": url, "result": f"Error browsing URL: {e}"}
+            token_count = len(tiktoken.encoding_for_model("gpt-4o").encode(content))
+            if token_count >= 2000:
+                content = await self._reason_over_page(query, content)
+            return {"url": url, "result": content}
+
+    async def search_and_browse(
+        self,
+        queries: Annotated[List[str], "Several different search queries for the same research question (at most 5)"],
+        browsing_target: Annotated[str, "The purpose of browsing the result pages, what information to obtain"],
+        top_k: Annotated[int, "Number of new result pages to browse for each query"] = 2,
+    ) -> str:
+        """
+        Search several queries at once and browse the top results of each query.
+
+        Searches run concurrently; pages are fetched as soon as their search returns and analyzed
+        in parallel. Results repeated across queries are listed and browsed only once.
+        """
+        queries = [q for q in dict.fromkeys(q.strip() for q in queries or []) if q][:5]
+        if not queries:
+            return "Error: no search query given"
+
+        semaphore = asyncio.Semaphore(self.max_parallel_browsing)
+        seen_urls = set()
+        search_results = {}
+        browse_tasks = []
+
+        async def _search(query):
+            return query, await asyncio.to_thread(self.web_browser.search_engine.google_search, query, 10)
+
+        for finished in asyncio.as_completed([_search(q) for q in queries]):
+            try:
+                query, results = await finished
+            except Exception as e:
+                print(f"Error searching: {e}")
+                continue
+            new_results = []
+            for result in results:
+                key = self._normalize_url(result.get("link"))
+                if not key or key in seen_urls:
+                    continue
+                seen_urls.add(key)
+                new_results.append(result)
+            search_results[query] = new_results
+            for result in new_results[:top_k]:
+                browse_tasks.append(asyncio.ensure_future(
+                    self._browse_and_reason(browsing_target, result["link"], semaphore)
+                ))
+
+        browsed = list(await asyncio.gather(*browse_tasks)) if browse_tasks else []
+        return json.dumps(
+            {
+                "search_results": {q: search_results.get(q, []) for q in queries},
+                "browsed_pages": browsed,
+            },
+            ensure_ascii=False,
+        )
 
     async def create_code_tool(
         self,
@@ -3,6 +3,7 @@ from typing import List, Dict, Annotated, Optional, Any, Tuple, Union
 
 import sys
 from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.usage_accounting import record_usage
 from src.utils.web_search_agent.tool_web_engine import SerperSearchEngine, WebBrowser
 from streamlit_extras.colored_header import colored_header
 
@@ -22,6 +23,7 @@ from src.utils.tools_util import get_autogen_message_history
 import traceback
 import tiktoken  # Add this import for calculating token count
 from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 
 from src.utils.tool_summary import generate_summary
 
@@ -32,6 +34,9 @@ from src.utils.tool_optimizer_dialog import optimize_execution, optimize_dialogu
 
 from configs.oai_config import get_llm_config
 from src.core.code_utils import get_code_abs_token
+from src.utils.llm_response_cache import cached_llm_create
+from src.utils.llm_client_registry import get_llm_wrapper
+from src.utils.llm_tiers import tier_llm_config, tracked_create
 
 
 def _safe_token_len(text: Optional[str]) -> int:
@@ -46,6 +51,17 @@ def _safe_token_len(text: Optional[str]) -> int:
 class DeepSearchExecutor(ExtendedUserProxyAgent):
     def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
+            # Callable(history, tool_reply) rewriting oversized tool responses before they are sent
+            self.tool_responses_summarizer = None
+
+    async def a_generate_scheduled_tool_calls_reply(self, messages=None, sender=None, config=None):
+        final, reply = await super().a_generate_scheduled_tool_calls_reply(messages, sender, config)
+        if final and isinstance(reply, dict) and self.tool_responses_summarizer is not None:
+            # Summarize before the researcher sees the responses: rewriting them later would change
+            # an already-sent part of the prompt and invalidate the provider's prefix cache
+            history = messages if messages is not None else self._oai_messages[sender]
+            await asyncio.to_thread(self.tool_responses_summarizer, history, reply)
+        return final, reply
     
     async def a_execute_function(
         self, func_call: dict[str, Any], call_id: Optional[str] = None, verbose: bool = False
@@ -106,7 +122,8 @@ class DeepSearchExecutor(ExtendedUserProxyAgent):
         return None
 
 def get_researcher_system_message():
-    return DEEP_SEARCH_SYSTEM_PROMPT.format(current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")) #+ thinking_prompt
+    # Date precision keeps the system prompt, and the provider's cached prefix behind it, stable for the day
+    return DEEP_SEARCH_SYSTEM_PROMPT.format(current_time=datetime.now().strftime("%Y-%m-%d")) #+ thinking_prompt
 
 
 # New Autogen deep search implementation
@@ -157,6 +174,7 @@ class AutogenDeepSearchAgent:
         
         # Register tool functions
         self._register_tools()
+        self.executor.tool_responses_summarizer = self._summarize_tool_response
         
         # Modify agent message handling methods to support dynamic summarization
         self._patch_agent_message_handlers()
@@ -166,12 +184,14 @@ class AutogenDeepSearchAgent:
         register_toolkits(
             [
                 self.agent_tool_library.searching,
+                self.agent_tool_library.search_and_browse,
                 self.agent_tool_library.browsing,
                 {"function": self.agent_tool_library.browsing, "name": "browsering"},
                 # self.agent_tool_library.create_code_tool,
             ],
             self.researcher,
             self.executor,
+            side_effect_free_tools=["searching", "search_and_browse", "browsing", "browsering"],
         )
     
     def _patch_agent_message_handlers(self):
@@ -183,11 +203,10 @@ class AutogenDeepSearchAgent:
         # Add message handling interception for executor
         def executor_receive_with_summary(message, sender, silent):
             # Check if it's a function call from the researcher
-            message_history = deepcopy(self.executor.chat_messages[self.researcher])
+            message_history = self.executor.chat_messages[self.researcher]
             if sender == self.researcher and len(message_history)>1:
                 if 'tool_responses' in message_history[-1] and 'tool_calls' in message_history[-2]:
-                    # Increase tool call count
-                    self._summarize_tool_response(message_history, message)
+                    # Increase tool call count (oversized responses were summarized before sending)
                     self.current_tool_call_count += 1
             
             # Process message normally
@@ -208,54 +227,45 @@ class AutogenDeepSearchAgent:
         self.executor._process_received_message = executor_receive_with_summary
         self.researcher._process_received_message = researcher_receive_with_summary
     
-    def _summarize_tool_response(self, chat_history, current_message):
-        """Summarize message history"""
-        # Get current conversation history
-        
-        tool_calls = chat_history[-2]['tool_calls']
-        tool_responses_list = chat_history[-1]['tool_responses']
-        
-        del self.executor.chat_messages[self.researcher][-1]['content']
-        del self.researcher.chat_messages[self.executor][-2]['content']
+    def _summarize_tool_response(self, chat_history, tool_reply):
+        """Replace oversized tool responses of a reply with summaries, generated in parallel
 
-        if not isinstance(tool_responses_list, list):
-            tool_responses_list = [tool_responses_list]
-        
-        summary_list = []
-            
-        for tool_responses in tool_responses_list:
-        
-            if isinstance(tool_responses, list) or isinstance(tool_responses, dict):
-                tool_responses = json.dumps(tool_responses)
-            elif not isinstance(tool_responses, str):
-                tool_responses = str(tool_responses)
-            
-            if isinstance(tool_calls, list) or isinstance(tool_calls, dict):
-                tool_calls = json.dumps(tool_calls)
-            elif not isinstance(tool_calls, str):
-                tool_calls = str(tool_calls)
-            
+        Args:
+            chat_history: Executor history ending with the researcher's tool call message
+            tool_reply: Tool reply about to be sent, rewritten in place
+        """
+        responses = tool_reply.get('tool_responses')
+        if not isinstance(responses, list):
+            return
+
+        oversized = {}
+        for idx, tool_response in enumerate(responses):
+            content = tool_response.get('content') if isinstance(tool_response, dict) else tool_response
+            if not isinstance(content, str):
+                content = json.dumps(content, ensure_ascii=False) if isinstance(content, (list, dict)) else str(content)
             # Calculate token count instead of character count
-            token_count = len(self.encoding.encode(tool_responses))
-            if token_count < self.token_limit:
-                continue
-            
-            # chat_history.append(current_message)
-            chat_history = json.dumps(chat_history[:-2], ensure_ascii=False)
-            
-            # Generate summary
-            response_summary = self._generate_summary_for_search_result(chat_history, tool_responses)
-            # print(response_summary)
-            summary_list.append(response_summary)
-        
-        try:
-            for idx, sumary in enumerate(summary_list):
-                self.executor.chat_messages[self.researcher][-1]['tool_responses'][idx]['content'] = sumary
-                self.researcher.chat_messages[self.executor][-2]['tool_responses'][idx]['content'] = sumary
-        except Exception as e:
-            print(e)
-            import pdb;pdb.set_trace()
-            
+            if len(self.encoding.encode(content)) >= self.token_limit:
+                oversized[idx] = content
+        if not oversized:
+            return
+
+        # The context is serialized once and shared by all summaries of this turn
+        context = json.dumps(chat_history[:-1], ensure_ascii=False)
+        with ThreadPoolExecutor(max_workers=min(len(oversized), 4)) as pool:
+            futures = {
+                idx: pool.submit(self._generate_summary_for_search_result, context, content)
+                for idx, content in oversized.items()
+            }
+            for idx, future in futures.items():
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    print(f"Error summarizing tool response {idx}: {e}")
+                    continue
+                if isinstance(responses[idx], dict):
+                    responses[idx]['content'] = summary
+
+        tool_reply['content'] = "\n\n".join(str(r.get('content', '')) for r in responses if isinstance(r, dict))
 
     def _generate_summary_for_search_result(self, messages, tool_responses):
         """Generate summary for a set of messages"""
@@ -263,15 +273,20 @@ class AutogenDeepSearchAgent:
         # Use LLM to generate summary
         summary_prompt = DEEP_SEARCH_CONTEXT_SUMMARY_PROMPT.format(tool_responses=tool_responses, messages=messages)
         
-        # Use researcher's LLM config to create a temporary client for summary generation
-        from autogen.oai import OpenAIWrapper
-        client = OpenAIWrapper(**self.llm_config)
+        # Use researcher's LLM config, on the model tier of tool summaries, for summary generation
+        llm_config = tier_llm_config("tool_summary", self.llm_config)
+        client = get_llm_wrapper(llm_config)
         
         # Create message list
         messages_list = [{"role": "user", "content": summary_prompt}]
         
         # Directly use client's create method without passing additional API parameters
-        response = client.create(messages=messages_list)
+        model = (llm_config.get("config_list") or [{}])[0].get("model")
+        response_cache_hits = []
+        response = cached_llm_create(
+            tracked_create("tool_summary", client.create, model), model=model, messages=messages_list,
+            on_hit=lambda cached: response_cache_hits.append(True),
+        )
         summary = response.choices[0].message.content
         summary_tokens = _safe_token_len(summary)
         # Persist token usage for this summarization call
@@ -289,8 +304,6 @@ class AutogenDeepSearchAgent:
                 if isinstance(self.code_execution_config, dict):
                     work_dir = self.code_execution_config.get("work_dir")
                 log_dir = work_dir or os.path.join(os.getcwd(), "logs")
-                os.makedirs(log_dir, exist_ok=True)
-                log_path = os.path.join(log_dir, "token_usage.log")
 
                 def _get(val, key):
                     return getattr(val, key, None) if not isinstance(val, dict) else val.get(key)
@@ -305,9 +318,10 @@ class AutogenDeepSearchAgent:
                         "completion_tokens": _get(usage, "completion_tokens"),
                         "total_tokens": _get(usage, "total_tokens"),
                     },
+                    # Served by the LLM response cache: accounted as saved, not spent
+                    "response_cache_hit": bool(response_cache_hits),
                 }
-                with open(log_path, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                record_usage(log_dir, entry)
         except Exception:
             pass
             
@@ -8,6 +8,7 @@ import asyncio
 import warnings
 import traceback
 import json
+import contextlib
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Union, Any, Tuple, Annotated, Literal
@@ -24,6 +25,11 @@ from src.services.autogen_upgrade.file_monitor import get_directory_files, compa
 from autogen import Agent
 from autogen.agentchat.conversable_agent import logger
 from src.utils.audit_logger import log_event, Stopwatch
+from src.utils.tool_scheduler import ToolCallScheduler
+from src.core.prompt_layout import PromptLayout, extract_cached_tokens
+from src.utils.llm_response_cache import cached_llm_create
+from src.utils.llm_stream import DeltaIOStream, stream_hub, streaming_enabled
+from src.utils.usage_accounting import record_usage
 
 
 from autogen.formatting_utils import colored
@@ -110,8 +116,29 @@ def _safe_token_len(content):
 class BasicConversableAgent(ConversableAgent):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.prompt_layout = PromptLayout()
+
+    def _publish_completion(self, extracted_response, delta_stream: DeltaIOStream) -> None:
+        """Tell stream subscribers that a turn is complete, with its tool calls"""
+        content = extracted_response if isinstance(extracted_response, str) else None
+        tool_calls = []
+        if extracted_response is not None and not isinstance(extracted_response, str):
+            message = extracted_response.model_dump() if hasattr(extracted_response, "model_dump") else extracted_response
+            content = message.get("content")
+            tool_calls = [(tc.get("function") or {}).get("name") for tc in message.get("tool_calls") or []]
+        if content and not delta_stream.chunks:
+            # Served from the response cache: nothing was streamed, deliver the text in one piece
+            stream_hub.publish("delta", run_id=delta_stream.stream_run_id, agent=self.name, content=content)
+        stream_hub.publish(
+            "message", run_id=delta_stream.stream_run_id, agent=self.name, content=content, tool_calls=tool_calls
+        )
 
     def _generate_oai_reply_from_client(self, llm_client, messages, cache) -> Optional[Union[str, dict[str, Any]]]:
+        context = messages[-1].pop("context", None)
+        # Note where this request stops repeating the previous one (prompt prefix cache metrics)
+        tools = self.llm_config.get("tools") if isinstance(self.llm_config, dict) else None
+        self.prompt_layout.observe(messages, tools=tools)
+
         # unroll tool_responses
         all_messages = []
         for message in messages:
@@ -126,14 +153,40 @@ class BasicConversableAgent(ConversableAgent):
 
         # TODO: #1143 handle token limit exceeded error
         sw = Stopwatch()
-        response = llm_client.create(
-            context=messages[-1].pop("context", None),
-            messages=all_messages,
-            cache=cache,
-            agent=self,
-        )
+        config = (self.llm_config.get("config_list") or [{}])[0] if isinstance(self.llm_config, dict) else {}
+
+        response_cache_hits = []
+
+        def _attach_message_retrieval(cached_response):
+            # Cached responses come back without the client callback AutoGen uses to extract messages
+            response_cache_hits.append(True)
+            clients = getattr(llm_client, "_clients", None)
+            if clients:
+                cached_response.message_retrieval_function = clients[0].message_retrieval
+
+        create_kwargs = {}
+        # Stream only while a CLI/UI subscriber listens; the assembled completion is the same either way
+        streamed = streaming_enabled()
+        if streamed:
+            create_kwargs["stream"] = True
+            delta_stream = DeltaIOStream(IOStream.get_default(), agent_name=self.name)
+        with (IOStream.set_default(delta_stream) if streamed else contextlib.nullcontext()):
+            response = cached_llm_create(
+                llm_client.create,
+                model=config.get("model"),
+                tools=tools,
+                temperature=self.llm_config.get("temperature", config.get("temperature")) if isinstance(self.llm_config, dict) else None,
+                on_hit=_attach_message_retrieval,
+                context=context,
+                messages=all_messages,
+                cache=cache,
+                agent=self,
+                **create_kwargs,
+            )
         extracted_response = llm_client.extract_text_or_completion_object(response)[0]
         duration_s = sw.elapsed()
+        if streamed:
+            self._publish_completion(extracted_response, delta_stream)
 
         if extracted_response is None:
             warnings.warn(f"Extracted_response from {response} is None.", UserWarning)
@@ -225,12 +278,14 @@ class BasicConversableAgent(ConversableAgent):
                     log_dir = self.work_dir
                 else:
                     log_dir = os.path.join(os.getcwd(), "logs")
-                os.makedirs(log_dir, exist_ok=True)
-                log_path = os.path.join(log_dir, "token_usage.log")
 
                 def _get(val, key):
                     return getattr(val, key, None) if not isinstance(val, dict) else val.get(key)
 
+                cached_tokens = extract_cached_tokens(usage)
+                if not response_cache_hits:
+                    # A cached response sent nothing, it says nothing about the provider's prompt cache
+                    self.prompt_layout.record_usage(_get(usage, "prompt_tokens"), cached_tokens)
                 entry = {
                     "ts": datetime.now().isoformat(),
                     "agent": getattr(self, "name", ""),
@@ -241,12 +296,18 @@ class BasicConversableAgent(ConversableAgent):
                         "prompt_tokens": _get(usage, "prompt_tokens"),
                         "completion_tokens": _get(usage, "completion_tokens"),
                         "total_tokens": _get(usage, "total_tokens"),
+                        "cached_tokens": cached_tokens,
                     },
+                    "prompt_layout": self.prompt_layout.last_request,
+                    # Usage stored with a cached response; the accounting counts it as saved, not spent
+                    "response_cache_hit": bool(response_cache_hits),
+                    # Streamed completions carry the usage AutoGen assembles from the streamed chunks
+                    "streamed": streamed,
+                    "prompt_cache_session": self.prompt_layout.stats(),
                 }
                 if tool_file_path and tool_name in file_logging_tools:
                     entry["file_path"] = tool_file_path
-                with open(log_path, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                record_usage(log_dir, entry)
             
             # Emit structured audit record for this LLM interaction
             try:
@@ -296,9 +357,11 @@ class ExtendedUserProxyAgent(BasicConversableAgent, TrackableUserProxyAgent):
         self.remote_repo_path = remote_repo_path
         self.local_repo_path = local_repo_path
         self.work_dir = work_dir
+        self.tool_call_scheduler = ToolCallScheduler()
         
         # self.replace_function_call_func()
         self.replace_code_execution_func()
+        self.replace_tool_calls_scheduler()
 
     async def a_initiate_chat(
         self,
@@ -364,6 +427,39 @@ class ExtendedUserProxyAgent(BasicConversableAgent, TrackableUserProxyAgent):
                 del self._reply_func_list[i]
                 self.register_reply([Agent, None], wrapped_tool_calls_reply, position=i)                
 
+    def declare_tool(self, name: str, side_effect_free: bool = False):
+        """Declare whether a registered tool may run concurrently with other tool calls"""
+        self.tool_call_scheduler.declare(name, side_effect_free=side_effect_free)
+
+    def replace_tool_calls_scheduler(self):
+        """Run the tool calls of one message through the tool call scheduler"""
+
+        async def scheduled_a_tool_calls_reply(agent, messages=None, sender=None, config=None):
+            return await self.a_generate_scheduled_tool_calls_reply(messages, sender, config)
+
+        for i, func in enumerate(self._reply_func_list):
+            if getattr(func['reply_func'], '__name__', '') == 'a_generate_tool_calls_reply':
+                del self._reply_func_list[i]
+                self.register_reply([Agent, None], scheduled_a_tool_calls_reply, ignore_async_in_sync_chat=True, position=i)
+                break
+
+    async def a_generate_scheduled_tool_calls_reply(self, messages=None, sender=None, config=None):
+        if config is None:
+            config = self
+        if messages is None:
+            messages = self._oai_messages[sender]
+        message = messages[-1]
+        tool_calls = message.get("tool_calls") or []
+        if not tool_calls:
+            return False, None
+
+        tool_returns = await self.tool_call_scheduler.run(tool_calls, self._a_execute_tool_call)
+        return True, {
+            "role": "tool",
+            "tool_responses": tool_returns,
+            "content": "\n\n".join(str(tool_return.get("content", "")) for tool_return in tool_returns),
+        }
+
     async def a_execute_function(
         self, func_call: dict[str, Any], call_id: Optional[str] = None, verbose: bool = False
     ) -> tuple[bool, dict[str, Any]]:
@@ -388,15 +484,23 @@ class ExtendedUserProxyAgent(BasicConversableAgent, TrackableUserProxyAgent):
         See https://platform.openai.com/docs/api-reference/chat/create#chat-create-function_call
         """
         sw = Stopwatch()
-        execute_result = await super().a_execute_function(func_call, call_id, verbose)
-        is_exec_success, result_dict = execute_result
+        stream_hub.publish("tool_start", agent=self.name, tool=(func_call or {}).get("name"), call_id=call_id)
+        is_exec_success = False
+        try:
+            execute_result = await super().a_execute_function(func_call, call_id, verbose)
+            is_exec_success, result_dict = execute_result
+        finally:
+            stream_hub.publish(
+                "tool_end", agent=self.name, tool=(func_call or {}).get("name"), call_id=call_id,
+                ok=bool(is_exec_success), duration_s=sw.elapsed(),
+            )
 
         if isinstance(result_dict, dict):
             content = result_dict.get('content')
             if isinstance(content, str):
                 summarizer = getattr(self, "tool_response_summarizer", None)
                 if summarizer:
-                    summarized = summarizer.maybe_summarize(
+                    summarized = await summarizer.a_maybe_summarize(
                         tool_name=(func_call or {}).get("name"),
                         tool_arguments=(func_call or {}).get("arguments"),
                         tool_response=content,
@@ -634,7 +738,7 @@ class ExtendedUserProxyAgent(BasicConversableAgent, TrackableUserProxyAgent):
             if len(code_blocks) == 0:
                 continue
             # Use LLM to judge, deduplicate and sort code blocks
-            code_blocks = process_and_filter_code_blocks(code_blocks)
+            code_blocks = process_and_filter_code_blocks(code_blocks, work_dir=getattr(self, "work_dir", None))
             if len(code_blocks) == 0:
                 continue
             
@@ -675,8 +779,6 @@ class ExtendedUserProxyAgent(BasicConversableAgent, TrackableUserProxyAgent):
                     log_dir = self.work_dir
                 else:
                     log_dir = os.path.join(os.getcwd(), "logs")
-                os.makedirs(log_dir, exist_ok=True)
-                log_path = os.path.join(log_dir, "token_usage.log")
                 languages = [getattr(cb, "language", None) for cb in code_blocks]
                 entry = {
                     "ts": datetime.now().isoformat(),
@@ -692,8 +794,7 @@ class ExtendedUserProxyAgent(BasicConversableAgent, TrackableUserProxyAgent):
                         "total_tokens": 0,
                     },
                 }
-                with open(log_path, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                record_usage(log_dir, entry)
             except Exception:
                 pass
             
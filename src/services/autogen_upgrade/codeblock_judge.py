@@ -1,7 +1,24 @@
+import re
 import json
+import time
+import hashlib
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.llm_tiers import get_tier_chat_client
+from src.utils.audit_logger import log_event
+
+
+_SHELL_LANGUAGES = {"sh", "bash", "shell", "console", "zsh"}
+_PYTHON_LANGUAGES = {"python", "python3", "py"}
+
+_INSTALL_COMMAND = re.compile(
+    r"^(sudo\s+)?("
+    r"(pip3?|python3?\s+-m\s+pip|uv\s+pip|conda|mamba|npm|yum|brew)\s+(install|uninstall)\b"
+    r"|apt(-get)?\s+(-y\s+)?(update|install|upgrade)\b"
+    r")"
+)
+_SCRIPT_RUN_COMMAND = re.compile(r"^python3?\s+(-u\s+)?([\w./-]+\.py)\b")
 
 
 def _build_system_prompt() -> str:
@@ -95,7 +112,7 @@ def llm_judge_code_blocks(
         message_list.insert(0, {"role": "system", "content": system_prompt})
         message_list.append({"role": "user", "content": _build_user_prompt(raw_blocks)})
 
-    agent = AzureGPT4Chat()
+    agent = get_tier_chat_client("code_block_judge")
 
     try:
         content = agent.chat_with_message(
@@ -123,16 +140,216 @@ def llm_judge_code_blocks(
                 {"index": i, "keep": True, "intent": "other", "target_file": None}
                 for i in range(n)
             ],
-            "order": list(range(n))
+            "order": list(range(n)),
+            "_fallback": True,
         }
 
 
-def process_and_filter_code_blocks(code_blocks) -> List:
+def _normalize_language(language: Optional[str]) -> str:
+    language = (language or "").strip().lower()
+    if language in _SHELL_LANGUAGES:
+        return "sh"
+    if language in _PYTHON_LANGUAGES:
+        return "python"
+    return language
+
+
+def _normalize_code(code: Optional[str]) -> str:
+    lines = [line.rstrip() for line in (code or "").strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def _shell_commands(code: str) -> List[str]:
+    commands = []
+    for line in code.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        commands.extend(part.strip() for part in re.split(r"&&|;", line) if part.strip())
+    return commands
+
+
+def _classify_block(language: str, code: str) -> Dict[str, Any]:
+    """Intent of a block when it is obvious from its text, otherwise the intent is "other"."""
+    if language == "python":
+        return {"intent": "direct_exec", "target_file": None}
+    if language == "sh":
+        commands = _shell_commands(code)
+        if commands and all(_INSTALL_COMMAND.match(cmd) for cmd in commands):
+            return {"intent": "env_setup", "target_file": None}
+        if len(commands) == 1:
+            match = _SCRIPT_RUN_COMMAND.match(commands[0])
+            if match:
+                return {"intent": "script_run", "target_file": match.group(2)}
+    return {"intent": "other", "target_file": None}
+
+
+def rule_based_judge(raw_blocks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Settle easy code block sets without an LLM call.
+
+    Exact duplicates and blocks that are a line prefix of another block of the same language,
+    earlier or later, are dropped: the longer block already runs them. The rest is decided locally when it is a single block, install commands already
+    followed by one other block (the other block may prepare the install, e.g. clone the repo or
+    create a venv, so it is never moved after it), or install commands + one Python block + one
+    'python xxx.py' run, ordered install, Python block, run.
+
+    Returns:
+        Dict containing blocks/order like llm_judge_code_blocks, or None when the LLM is needed.
+    """
+    normalized = [
+        (_normalize_language(block.get("language")), _normalize_code(block.get("code")))
+        for block in raw_blocks
+    ]
+    dropped = set()
+    for i, (language, code) in enumerate(normalized):
+        for j, (other_language, other_code) in enumerate(normalized):
+            if i == j or j in dropped or language != other_language:
+                continue
+            duplicate = code == other_code and j < i
+            prefix = code != other_code and other_code.startswith(code + "\n")
+            if not code or duplicate or prefix:
+                dropped.add(i)
+                break
+
+    remaining = [i for i in range(len(raw_blocks)) if i not in dropped]
+    verdicts = {i: _classify_block(*normalized[i]) for i in remaining}
+    env_blocks = [i for i in remaining if verdicts[i]["intent"] == "env_setup"]
+    python_blocks = [i for i in remaining if verdicts[i]["intent"] == "direct_exec"]
+    run_blocks = [i for i in remaining if verdicts[i]["intent"] == "script_run"]
+    other_blocks = [i for i in remaining if verdicts[i]["intent"] == "other"]
+
+    if len(remaining) <= 1:
+        order = remaining
+    elif not python_blocks and not run_blocks and len(other_blocks) == 1:
+        if any(i > other_blocks[0] for i in env_blocks):
+            return None
+        order = env_blocks + other_blocks
+    elif not other_blocks and len(python_blocks) <= 1 and len(run_blocks) <= 1:
+        order = env_blocks + python_blocks + run_blocks
+        if python_blocks and run_blocks:
+            verdicts[python_blocks[0]]["target_file"] = verdicts[run_blocks[0]]["target_file"]
+    else:
+        return None
+
+    blocks = [{"index": i, "keep": i not in dropped, **verdicts.get(i, {"intent": "other", "target_file": None})}
+              for i in range(len(raw_blocks))]
+    return {"blocks": blocks, "order": order}
+
+
+class JudgeVerdictCache:
+    """LRU cache of LLM verdicts keyed by the normalized language and code hash of every block"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(raw_blocks: List[Dict[str, Any]]) -> str:
+        parts = [
+            [_normalize_language(block.get("language")),
+             hashlib.sha256(_normalize_code(block.get("code")).encode("utf-8")).hexdigest()]
+            for block in raw_blocks
+        ]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, verdict: Dict[str, Any], latency: float) -> None:
+        self._entries[key] = {"verdict": verdict, "latency_s": latency}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class JudgeStats:
+    def __init__(self):
+        self.llm_calls = 0
+        self.llm_latency_s = 0.0
+        self.rule_decisions = 0
+        self.cache_hits = 0
+        self.saved_latency_s = 0.0
+
+    @property
+    def skipped_calls(self) -> int:
+        return self.rule_decisions + self.cache_hits
+
+    @property
+    def avg_llm_latency_s(self) -> float:
+        return self.llm_latency_s / self.llm_calls if self.llm_calls else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.llm_calls,
+            "rule_decisions": self.rule_decisions,
+            "cache_hits": self.cache_hits,
+            "skipped_calls": self.skipped_calls,
+            "avg_llm_latency_s": round(self.avg_llm_latency_s, 3),
+            "saved_latency_s": round(self.saved_latency_s, 3),
+        }
+
+
+judge_verdict_cache = JudgeVerdictCache()
+judge_stats = JudgeStats()
+
+
+def judge_code_blocks(raw_blocks: List[Dict[str, Any]], work_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Judge code blocks with the rule-based fast path, then the verdict cache, then the LLM.
+
+    Every judgement is logged as a "code_block_judge" event with the decision source and the
+    latency saved (the cached call's latency, or the average LLM judge latency for rule decisions).
+    """
+    start = time.perf_counter()
+    saved_latency = 0.0
+    verdict = rule_based_judge(raw_blocks)
+    if verdict is not None:
+        source = "rules"
+        saved_latency = judge_stats.avg_llm_latency_s
+        judge_stats.rule_decisions += 1
+    else:
+        key = JudgeVerdictCache.make_key(raw_blocks)
+        cached = judge_verdict_cache.get(key)
+        if cached is not None:
+            source = "cache"
+            verdict = json.loads(json.dumps(cached["verdict"]))
+            saved_latency = cached["latency_s"]
+            judge_stats.cache_hits += 1
+        else:
+            source = "llm"
+            verdict = llm_judge_code_blocks(raw_blocks)
+            latency = time.perf_counter() - start
+            judge_stats.llm_calls += 1
+            judge_stats.llm_latency_s += latency
+            if not verdict.pop("_fallback", False):
+                judge_verdict_cache.put(key, json.loads(json.dumps(verdict)), latency)
+    judge_stats.saved_latency_s += saved_latency
+
+    log_event(
+        "code_block_judge",
+        payload={
+            "blocks": len(raw_blocks),
+            "source": source,
+            "duration_s": round(time.perf_counter() - start, 6),
+            "saved_latency_s": round(saved_latency, 3),
+            "stats": judge_stats.snapshot(),
+        },
+        work_dir=work_dir,
+    )
+    return verdict
+
+
+def process_and_filter_code_blocks(code_blocks, work_dir: Optional[str] = None) -> List:
     """
     Process code blocks: use LLM for judgment, deduplication and sorting, return processed code block list.
     
     Args:
         code_blocks: Code block list extracted from autogen code_extractor
+        work_dir: Directory of the audit log receiving the judge decision
         
     Returns:
         List: Processed code block list (deduplicated, sorted)
@@ -141,12 +358,12 @@ def process_and_filter_code_blocks(code_blocks) -> List:
         return []
     
     try:
-        # Use LLM for code block judgment, deduplication and sorting
+        # Rules, cached verdicts or the LLM judge, deduplicate and sort the blocks
         raw_blocks = [
             {"index": i, "language": getattr(cb, "language", None), "code": getattr(cb, "code", None)}
             for i, cb in enumerate(code_blocks)
         ]
-        judge = llm_judge_code_blocks(raw_blocks)
+        judge = judge_code_blocks(raw_blocks, work_dir=work_dir)
         
         # Parse judgment results
         blocks_info = {item.get("index"): item for item in judge.get("blocks", [])}
@@ -172,4 +389,4 @@ def process_and_filter_code_blocks(code_blocks) -> List:
     except Exception as e:
         print(f"Code block processing failed: {e}")
         # Fallback: return original code block list
-        return code_blocks 
\ No newline at end of file
+        return code_blocks 
@@ -56,6 +56,7 @@ Think like a human researcher: first search broadly, then read valuable content
 After searching, use the web browsing tool to browse several relevant webpages to obtain detailed information. After finishing a page, reflect on other already-identified URLs that may contain useful information and browse them before starting a new search query.
 
 * When you browse the relevant URLs, you should use the web browsing tool to browse the URLs in parallel, suggest multiple URLs to browse at a time(no more than 5 URLs).
+* To cover a question from several angles in one step, use search_and_browse with multiple queries: it searches all of them, skips duplicate results and browses the top pages of each query in parallel.
 
 Recommend conducting multiple rounds of searches and browsing to expand information collection range and search space, ensuring accurate understanding of user intent while guaranteeing comprehensive and accurate information.
 
@@ -4,10 +4,15 @@ import json
 import ast
 import time
 import random
+import asyncio
 from openai import AzureOpenAI, OpenAI
 from typing import Annotated, Optional, Union, Dict, Any, List, Callable
 from openai._types import NOT_GIVEN
 from configs.oai_config import get_llm_config
+from src.utils.llm_response_cache import cached_llm_create
+from src.utils.llm_rate_limiter import provider_key, rate_limiters
+from src.utils.llm_router import endpoint_key, llm_router
+from src.utils.llm_tiers import model_tiers
 
 try:
     from autogen.oai import OpenAIWrapper
@@ -85,6 +90,23 @@ class RetryHandler:
         
         return f"Still failed after {self.max_retries} retries. Error: {str(last_exception)}"
 
+    async def a_execute_with_retry(self, func: Callable, *args, **kwargs) -> Any:
+        """Await func with retry, backing off with asyncio.sleep"""
+        last_exception = None
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                last_exception = e
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.calculate_delay(attempt))
+                    continue
+                else:
+                    break
+        
+        return f"Still failed after {self.max_retries} retries. Error: {str(last_exception)}"
+
 class AzureGPT4Chat:
     def __init__(
         self, 
@@ -94,8 +116,13 @@ class AzureGPT4Chat:
         max_retries: int = 2,
         base_delay: float = 1.0,
         max_delay: float = 10.0,
+        client: Optional["OpenAIWrapper"] = None,
         **wrapper_kwargs
     ):
+        """
+        Args:
+            client: Existing OpenAIWrapper to use instead of building one (see llm_client_registry)
+        """
         if not AUTOGEN_AVAILABLE:
             raise ImportError("autogen package is not available. Please install it with: pip install pyautogen")
         
@@ -111,8 +138,13 @@ class AzureGPT4Chat:
         elif model_name is None:
             model_name = "gpt-4o"
         
-        self.client = OpenAIWrapper(config_list=config_list, **wrapper_kwargs)
+        self.client = client if client is not None else OpenAIWrapper(config_list=config_list, **wrapper_kwargs)
         self.deployment_name = model_name
+        self.temperature = wrapper_kwargs.get("temperature", config_list[0].get("temperature"))
+        self.provider = provider_key(config_list[0].get("base_url"))
+        self.endpoint = endpoint_key(config_list[0].get("base_url"), model_name)
+        # (call type, tier) for auxiliary-call clients from llm_tiers.get_tier_chat_client
+        self.model_tier = None
         self.system_prompt = system_prompt
         
         # Initialize retry handler
@@ -125,40 +157,86 @@ class AzureGPT4Chat:
     def set_system_prompt(self, prompt):
         self.system_prompt = prompt
 
+    def _limited_create(self, **create_params):
+        """client.create within the provider's concurrency and rate limits (see llm_rate_limiter)"""
+        try:
+            return self._rate_limited_create(**create_params)
+        except Exception as exc:
+            # A tier model missing on this endpoint: continue on the configured model
+            configured = model_tiers.fallback(create_params.get("model"), exc) if self.model_tier else None
+            if configured is None:
+                raise
+            self.deployment_name = configured
+            create_params["model"] = configured
+            return self._rate_limited_create(**create_params)
+
+    def _rate_limited_create(self, **create_params):
+        messages = create_params.get("messages") or []
+        # Rough prompt size for the token budget: ~4 characters per token
+        estimated_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+        limiter = rate_limiters.get(self.provider)
+        limiter.acquire(estimated_tokens)
+        start = time.perf_counter()
+        try:
+            response = self.client.create(**create_params)
+        except Exception:
+            self._record_latency(time.perf_counter() - start, False, create_params.get("model"))
+            raise
+        finally:
+            limiter.release()
+        self._record_latency(time.perf_counter() - start, True, create_params.get("model"), getattr(response, "usage", None))
+        return response
+
+    def _record_latency(self, latency_s: float, ok: bool, model: Optional[str], usage=None):
+        llm_router.record(self.endpoint, latency_s, ok)
+        if self.model_tier is not None:
+            task, tier = self.model_tier
+            model_tiers.record(task, tier, model or self.deployment_name, latency_s, ok, usage)
+
+    def _create(self, **create_params):
+        """Rate limited client.create through the LLM response cache (opt-in, see LLM_RESPONSE_CACHE)"""
+        return cached_llm_create(self._limited_create, temperature=self.temperature, **create_params)
+
+    def _chat_call(self, messages: List[Dict], model: str, json_format=None, **create_params):
+        response = self._create(model=model, messages=messages, **create_params)
+        if json_format:
+            return self.parse_llm_response(response.choices[0].message.content)
+        return response.choices[0].message.content
+
+    def _chat_messages(self, question: str, system_prompt: Optional[str]) -> List[Dict]:
+        _system_prompt = system_prompt if system_prompt is not None else self.system_prompt
+        return [
+            {"role": "system", "content": _system_prompt},
+            {"role": "user", "content": question}
+        ]
+
+    def _format_params(self, response_format, create_kwargs) -> Dict:
+        params = dict(create_kwargs)
+        if response_format:
+            params["response_format"] = response_format
+        return params
+
     def chat(self, question: str, system_prompt: Optional[str] = None, json_format = None) -> str:
         """Chat method using RetryHandler"""
-        _system_prompt = system_prompt if system_prompt is not None else self.system_prompt
-        
-        def _chat_call():
-            messages = [
-                {"role": "system", "content": _system_prompt},
-                {"role": "user", "content": question}
-            ]
-            response = self.client.create(
-                model=self.deployment_name,
-                messages=messages
-            )
-            if json_format:
-                return self.parse_llm_response(response.choices[0].message.content)
-            return response.choices[0].message.content
-        
-        return self.retry_handler.execute_with_retry(_chat_call)
+        messages = self._chat_messages(question, system_prompt)
+        return self.retry_handler.execute_with_retry(self._chat_call, messages, self.deployment_name, json_format)
+
+    async def a_chat(self, question: str, system_prompt: Optional[str] = None, json_format = None) -> str:
+        """Async chat: the request runs in a worker thread and retries back off without blocking the event loop"""
+        messages = self._chat_messages(question, system_prompt)
+        return await self.retry_handler.a_execute_with_retry(
+            asyncio.to_thread, self._chat_call, messages, self.deployment_name, json_format
+        )
     
     def chat_with_message(self, message: List[Dict], model_name: Optional[str] = None, json_format = False) -> str:
         """Chat method using RetryHandler"""
         _model = model_name if model_name is not None else self.deployment_name
-        
-        def _chat_call():
-            # Directly use original parameters to avoid decorator parameter passing issues
-            response = self.client.create(
-                model=_model,
-                messages=message
-            )
-            if json_format:
-                return self.parse_llm_response(response.choices[0].message.content)
-            return response.choices[0].message.content
-        
-        return self.retry_handler.execute_with_retry(_chat_call)
+        return self.retry_handler.execute_with_retry(self._chat_call, message, _model, json_format)
+
+    async def a_chat_with_message(self, message: List[Dict], model_name: Optional[str] = None, json_format = False) -> str:
+        """Async chat_with_message"""
+        _model = model_name if model_name is not None else self.deployment_name
+        return await self.retry_handler.a_execute_with_retry(asyncio.to_thread, self._chat_call, message, _model, json_format)
 
     def chat_with_message_format(
         self, 
@@ -177,30 +255,25 @@ class AzureGPT4Chat:
             system_prompt (str, optional): Optional system prompt
             **create_kwargs: Additional parameters passed to the create method
         """
-        _system_prompt = system_prompt if system_prompt is not None else self.system_prompt
-        
-        def _chat_with_message_format():
-            if message_list is None:
-                messages = [
-                    {"role": "system", "content": _system_prompt},
-                    {"role": "user", "content": question}
-                ]
-            else:
-                messages = message_list
-            
-            create_params = {
-                "model": self.deployment_name,
-                "messages": messages,
-                **create_kwargs
-            }
-            
-            if response_format:
-                create_params["response_format"] = response_format
-            
-            response = self.client.create(**create_params)
-            return response.choices[0].message.content
-        
-        return self.retry_handler.execute_with_retry(_chat_with_message_format)
+        messages = message_list if message_list is not None else self._chat_messages(question, system_prompt)
+        return self.retry_handler.execute_with_retry(
+            self._chat_call, messages, self.deployment_name, None, **self._format_params(response_format, create_kwargs)
+        )
+
+    async def a_chat_with_message_format(
+        self,
+        question=None,
+        system_prompt=None,
+        message_list=None,
+        response_format=None,
+        **create_kwargs
+    ):
+        """Async chat_with_message_format"""
+        messages = message_list if message_list is not None else self._chat_messages(question, system_prompt)
+        return await self.retry_handler.a_execute_with_retry(
+            asyncio.to_thread, self._chat_call, messages, self.deployment_name, None,
+            **self._format_params(response_format, create_kwargs)
+        )
 
     def parse_llm_response(self, response_text: str) -> Dict:
         """
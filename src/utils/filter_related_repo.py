@@ -2,7 +2,8 @@ import json
 import os
 from src.core.code_explorer_tools import GlobalCodeTreeBuilder
 from src.core.code_utils import get_code_abs_token
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.llm_client_registry import get_chat_client
+from src.utils.llm_batch import run_chat_batch
 import concurrent.futures
 import threading
 from tqdm import tqdm
@@ -60,8 +61,8 @@ def fisrt_step_filter_related_repo(filter_related_path):
                 filter_related_repo_list[task_id]['results'].append(repo)
     json.dump(filter_related_repo_list, open(filter_related_path, 'w'), ensure_ascii=False, indent=2)
     
-def rate_repos_by_dimensions(task, repos_group, try_times=3):
-    """Multi-dimensional scoring of repositories"""
+def rating_messages(task, repos_group):
+    """Prompt for the multi-dimensional scoring of a group of repositories"""
     
     system_prompt = """You are a professional code review expert who is good at analyzing the relevance of code repositories to specific tasks.
 Your task is: Carefully read the Kaggle task description and core file information of the code repository provided by the user.
@@ -100,44 +101,44 @@ Only return JSON format:
 [{{"repo_index": 1 or 0, "Algorithm Match": 1 or 0, "Domain Applicability": 1 or 0, "Data Processing Capability": 1 or 0, "Model Implementation Quality": 1 or 0, "Code Readability": 1 or 0, "Structure Organization": 1 or 0, "Experimental Results": 1 or 0, "Scalability": 1 or 0, "Overall Score": 1-10}}, ...]
 """
     
-    # print(prompt)
-    # import pdb; pdb.set_trace()
-    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+def apply_repo_scores(repos_group, scores):
+    """Store the LLM scores on the repositories of the group"""
+    for score_info in scores:
+        idx = score_info["repo_index"] - 1
+        if 0 <= idx < len(repos_group):
+            # Save dimension scores
+            repos_group[idx]["dimensions"] = {k: v for k, v in score_info.items() if k != "repo_index"}
+            
+            # Calculate weighted total score directly in code
+            dimensions_score = (
+                score_info["Experimental Results"] * 0.2 + 
+                score_info["Algorithm Match"] * 0.2 + 
+                score_info["Domain Applicability"] * 0.15 + 
+                score_info["Data Processing Capability"] * 0.15 + 
+                score_info["Model Implementation Quality"] * 0.15 + 
+                score_info["Code Readability"] * 0.1 + 
+                score_info["Structure Organization"] * 0.1 + 
+                score_info["Scalability"] * 0.05
+            )
+            
+            # Overall score (1-10 points) converted to 0-1 range
+            overall_score = score_info.get("Overall Score", 0) / 10
+            
+            # Combine dimension score and overall score in 6:4 ratio
+            total_score = dimensions_score * 0.6 + overall_score * 0.4
+            
+            repos_group[idx]["llm_score"] = total_score
+
+def rate_repos_by_dimensions(task, repos_group, try_times=3):
+    """Multi-dimensional scoring of repositories"""
     try:
-        scores = AzureGPT4Chat().chat_with_message(
-            [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ], 
-            json_format=True
-        )
-        
-        for score_info in scores:
-            idx = score_info["repo_index"] - 1
-            if 0 <= idx < len(repos_group):
-                # Save dimension scores
-                repos_group[idx]["dimensions"] = {k: v for k, v in score_info.items() if k != "repo_index"}
-                
-                # Calculate weighted total score directly in code
-                dimensions_score = (
-                    score_info["Experimental Results"] * 0.2 + 
-                    score_info["Algorithm Match"] * 0.2 + 
-                    score_info["Domain Applicability"] * 0.15 + 
-                    score_info["Data Processing Capability"] * 0.15 + 
-                    score_info["Model Implementation Quality"] * 0.15 + 
-                    score_info["Code Readability"] * 0.1 + 
-                    score_info["Structure Organization"] * 0.1 + 
-                    score_info["Scalability"] * 0.05
-                )
-                
-                # Overall score (1-10 points) converted to 0-1 range
-                overall_score = score_info.get("Overall Score", 0) / 10
-                
-                # Combine dimension score and overall score in 6:4 ratio
-                total_score = dimensions_score * 0.6 + overall_score * 0.4
-                
-                repos_group[idx]["llm_score"] = total_score
-                
+        scores = get_chat_client().chat_with_message(rating_messages(task, repos_group), json_format=True)
+        apply_repo_scores(repos_group, scores)
     except Exception as e:
         print(f"LLM evaluation error: {e}")
         if try_times > 0:
@@ -233,6 +234,7 @@ def filter_and_rank_repos(git_search_path, out_path, top_k=5, filtered_repos_pat
         filter_related_repo_list = filter_repos_and_save(git_search_path, temp_filtered_path)
 
     idx = 0
+    task_groups = {}
     for task_id, task_info in filter_related_repo_list.items():
         # if idx > 1:
         #     break
@@ -263,11 +265,28 @@ def filter_and_rank_repos(git_search_path, out_path, top_k=5, filtered_repos_pat
         if current_group:
             repo_groups.append(current_group)
         
-        # Step 3: Multi-dimensional scoring for each group
+        task_groups[task_id] = repo_groups
+    
+    # Step 3: Multi-dimensional scoring, all groups of all tasks as one resumable batch job
+    batch_scores = run_chat_batch(
+        {
+            f"{task_id}::{i}": rating_messages(filter_related_repo_list[task_id]['task'], group)
+            for task_id, repo_groups in task_groups.items()
+            for i, group in enumerate(repo_groups)
+        },
+        prefix="rate_repos",
+        json_format=True,
+    )
+    for task_id, repo_groups in task_groups.items():
         ranked_repos = []
-        for group in repo_groups:
-            rated_repos = rate_repos_by_dimensions(task, group)
-            ranked_repos.extend(rated_repos)
+        for i, group in enumerate(repo_groups):
+            try:
+                apply_repo_scores(group, batch_scores[f"{task_id}::{i}"])
+            except Exception as e:
+                # Missing or malformed batch result: score the group directly, with retries
+                print(f"Batch scoring failed for task {task_id} group {i}: {e}")
+                group = rate_repos_by_dimensions(filter_related_repo_list[task_id]['task'], group)
+            ranked_repos.extend(group)
         
         # Sort and select top_k
         ranked_repos = sorted(ranked_repos, key=lambda x: x.get('llm_score', 0), reverse=True)
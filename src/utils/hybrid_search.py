@@ -0,0 +1,68 @@
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def default_tokenizer(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 index built once over a corpus
+
+    Postings are kept per term, so a query only touches documents containing one of its terms
+    instead of rescoring the whole corpus.
+    """
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75,
+                 tokenizer: Optional[Callable[[str], List[str]]] = None):
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer or default_tokenizer
+
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        for doc_idx, text in enumerate(texts):
+            term_counts = Counter(self.tokenizer(text))
+            self.doc_lengths.append(sum(term_counts.values()))
+            for term, tf in term_counts.items():
+                self.postings[term].append((doc_idx, tf))
+
+        self.num_docs = len(self.doc_lengths)
+        self.avg_doc_length = (sum(self.doc_lengths) / self.num_docs) if self.num_docs else 0.0
+        self.idf = {
+            term: math.log((self.num_docs - len(docs) + 0.5) / (len(docs) + 0.5) + 1.0)
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, topk: int = 10) -> List[Tuple[int, float]]:
+        """Return up to topk (document index, score) pairs with a positive score"""
+        scores: Dict[int, float] = defaultdict(float)
+        avg_len = self.avg_doc_length or 1.0
+        for term in set(self.tokenizer(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_idx] / avg_len
+                scores[doc_idx] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return heapq.nlargest(topk, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    weights: Optional[Sequence[float]] = None,
+    k: int = 60,
+) -> List[Tuple[int, float]]:
+    """Fuse several ranked lists of document indices
+
+    Each document scores sum(weight / (k + rank)) over the lists it appears in.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_idx in enumerate(ranking, 1):
+            fused[doc_idx] += weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from src.utils.llm_client_registry import get_chat_client, llm_client_registry
+
+
+DEFAULT_BATCH_DIR = os.getenv("LLM_BATCH_DIR", "db/llm_batches")
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def _read_jsonl(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run; the request is simply run again
+                continue
+    return records
+
+
+def _completion_body(response: Any) -> Any:
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json", exclude={"message_retrieval_function"})
+    return response
+
+
+def _message_content(record: Dict[str, Any]) -> Optional[str]:
+    try:
+        return record["response"]["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+class BatchJob:
+    """Bulk chat completions in the OpenAI batch JSONL format, resumable
+
+    Requests are written to <name>.input.jsonl as {"custom_id", "method", "url", "body"} lines and
+    results are appended to <name>.output.jsonl as {"custom_id", "response": {"status_code",
+    "body"}, "error"} lines as they complete. Re-running a job only runs the requests that have
+    no successful result yet, so an interrupted or partially failed batch picks up where it stopped.
+
+    Backends:
+        local: a concurrent worker pool over the shared chat client (rate limited per provider)
+        provider: the provider's /v1/batches API; the submitted batch id is kept in
+                  <name>.state.json so a resumed job polls it instead of submitting again
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_dir: str = DEFAULT_BATCH_DIR,
+        model: Optional[str] = None,
+        api_type: str = "basic",
+    ):
+        self.name = name
+        self.batch_dir = batch_dir
+        self.api_type = api_type
+        self.model = model
+        self._requests: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(batch_dir, exist_ok=True)
+
+    @property
+    def input_path(self) -> str:
+        return os.path.join(self.batch_dir, f"{self.name}.input.jsonl")
+
+    @property
+    def output_path(self) -> str:
+        return os.path.join(self.batch_dir, f"{self.name}.output.jsonl")
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.batch_dir, f"{self.name}.state.json")
+
+    def add(self, custom_id: str, messages: List[Dict[str, Any]], **body: Any) -> None:
+        """Queue one chat completion request; body holds extra request parameters (response_format, ...)"""
+        if self.model is None:
+            self.model = llm_client_registry.config_list(self.api_type)[0].get("model")
+        self._requests[custom_id] = {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": CHAT_COMPLETIONS_URL,
+            "body": {"model": self.model, "messages": messages, **body},
+        }
+
+    def write(self) -> str:
+        with open(self.input_path, "w", encoding="utf-8") as f:
+            for request in self._requests.values():
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        return self.input_path
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """Successful result records by custom_id, later lines winning"""
+        done = {}
+        for record in _read_jsonl(self.output_path):
+            if not record.get("error") and (record.get("response") or {}).get("status_code") == 200:
+                done[record["custom_id"]] = record
+        return done
+
+    def pending(self) -> List[Dict[str, Any]]:
+        done = self.completed()
+        return [request for custom_id, request in self._requests.items() if custom_id not in done]
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+
+    def _run_local_request(self, chat, request: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = chat._create(**request["body"])
+            return {
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": _completion_body(response)},
+                "error": None,
+            }
+        except Exception as e:
+            return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+
+    def run_local(self, max_workers: Optional[int] = None, max_attempts: int = 2) -> None:
+        max_workers = max_workers or int(os.getenv("LLM_BATCH_CONCURRENCY", "8"))
+        chat = get_chat_client(api_type=self.api_type)
+        for attempt in range(max_attempts):
+            requests = self.pending()
+            if not requests:
+                return
+            print(f"[BatchJob] {self.name}: running {len(requests)} requests locally (attempt {attempt + 1})", flush=True)
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(self._run_local_request, chat, request) for request in requests]
+                for future in as_completed(futures):
+                    # Written as soon as it completes, so an interrupted run keeps its finished requests
+                    self._append([future.result()])
+
+    def _provider_client(self):
+        config = llm_client_registry.config_list(self.api_type)[0]
+        if config.get("api_type") == "azure":
+            return None
+        from openai import OpenAI
+        return OpenAI(api_key=config.get("api_key"), base_url=config.get("base_url"))
+
+    def run_provider(self, poll_interval_s: float = 30.0, timeout_s: Optional[float] = None) -> None:
+        client = self._provider_client()
+        if client is None:
+            print(f"[BatchJob] {self.name}: provider batch API not available for this config, running locally", flush=True)
+            return self.run_local()
+
+        state = json.load(open(self.state_path, "r", encoding="utf-8")) if os.path.exists(self.state_path) else {}
+        if not state.get("batch_id"):
+            requests = self.pending()
+            if not requests:
+                return
+            pending_path = os.path.join(self.batch_dir, f"{self.name}.pending.jsonl")
+            with open(pending_path, "w", encoding="utf-8") as f:
+                for request in requests:
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            with open(pending_path, "rb") as f:
+                input_file = client.files.create(file=f, purpose="batch")
+            batch = client.batches.create(
+                input_file_id=input_file.id, endpoint=CHAT_COMPLETIONS_URL, completion_window="24h"
+            )
+            state = {"batch_id": batch.id, "submitted": len(requests), "created": time.time()}
+            json.dump(state, open(self.state_path, "w", encoding="utf-8"))
+            print(f"[BatchJob] {self.name}: submitted {len(requests)} requests as batch {batch.id}", flush=True)
+
+        start = time.time()
+        while True:
+            batch = client.batches.retrieve(state["batch_id"])
+            if batch.status in _TERMINAL_STATUSES:
+                break
+            if timeout_s is not None and time.time() - start > timeout_s:
+                print(f"[BatchJob] {self.name}: batch {batch.id} still {batch.status}, resume later", flush=True)
+                return
+            time.sleep(poll_interval_s)
+
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines = client.files.content(file_id).text.splitlines()
+                self._append([json.loads(line) for line in lines if line.strip()])
+        os.remove(self.state_path)
+        print(f"[BatchJob] {self.name}: batch {batch.id} {batch.status}", flush=True)
+
+    def run(self, backend: Optional[str] = None, **kwargs: Any) -> Dict[str, Optional[str]]:
+        """Run the pending requests and return message content by custom_id (None for failed requests)"""
+        backend = backend or os.getenv("LLM_BATCH_BACKEND", "local")
+        self.write()
+        if backend == "provider":
+            self.run_provider(**kwargs)
+        else:
+            self.run_local(**kwargs)
+        return self.results()
+
+    def results(self) -> Dict[str, Optional[str]]:
+        done = self.completed()
+        return {custom_id: _message_content(done[custom_id]) if custom_id in done else None for custom_id in self._requests}
+
+    def cleanup(self) -> None:
+        for path in (self.input_path, self.output_path, self.state_path,
+                     os.path.join(self.batch_dir, f"{self.name}.pending.jsonl")):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def job_name(prefix: str, requests: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Stable name for a set of requests, so running the same work again resumes the same job"""
+    digest = hashlib.sha256(json.dumps(requests, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{prefix}_{digest[:16]}"
+
+
+def run_chat_batch(
+    requests: Dict[str, List[Dict[str, Any]]],
+    prefix: str = "batch",
+    json_format: bool = False,
+    backend: Optional[str] = None,
+    keep: bool = False,
+    **body: Any,
+) -> Dict[str, Any]:
+    """Run {custom_id: messages} as one batch job and return {custom_id: content}
+
+    Content is parsed like AzureGPT4Chat(json_format=True) when json_format is set; failed
+    requests map to None. The job files are removed once every request succeeded unless keep.
+    """
+    job = BatchJob(job_name(prefix, requests))
+    for custom_id, messages in requests.items():
+        job.add(custom_id, messages, **body)
+    results = job.run(backend=backend)
+    if json_format:
+        parser = get_chat_client()
+        results = {k: parser.parse_llm_response(v) if v is not None else None for k, v in results.items()}
+    if not keep and all(v is not None for v in results.values()):
+        job.cleanup()
+    return results
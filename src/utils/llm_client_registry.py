@@ -0,0 +1,155 @@
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from configs.oai_config import get_llm_config
+from src.utils.agent_gpt4 import AzureGPT4Chat, OpenAIWrapper
+from src.utils.llm_rate_limiter import rate_limiters
+
+
+def _config_key(config_list: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+    """Registry key: provider, endpoint, model and a hash of the credentials per entry, plus client params"""
+    entries = [
+        (
+            config.get("api_type", "openai"),
+            config.get("base_url"),
+            config.get("model"),
+            hashlib.sha256(str(config.get("api_key") or "").encode("utf-8")).hexdigest()[:16],
+        )
+        for config in config_list
+    ]
+    return json.dumps([entries, sorted(params.items())], default=str)
+
+
+class LLMClientRegistry:
+    """Process wide OpenAIWrapper instances shared by all helper LLM calls
+
+    A wrapper is built once per (provider, model, params) and every client it creates uses one
+    pooled httpx transport, so keep-alive connections are reused across call sites instead of
+    each call resolving the config and opening new connections.
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._lock = threading.Lock()
+        self._configs: Dict[str, List[Dict[str, Any]]] = {}
+        self._wrappers: Dict[str, Any] = {}
+        self._http = None
+        self._connection_ids = set()
+
+        self.wrappers_created = 0
+        self.client_requests = 0
+        self.setup_s = 0.0
+        self.http_requests = 0
+        self.http_connections = 0
+
+    def _on_response(self, response) -> None:
+        rate_limiters.observe_response(response)
+        self.http_requests += 1
+        stream = response.extensions.get("network_stream")
+        if stream is not None and id(stream) not in self._connection_ids:
+            self._connection_ids.add(id(stream))
+            self.http_connections += 1
+
+    def _http_client(self):
+        """Shared pooled transport, None when httpx is unavailable"""
+        if self._http is None:
+            try:
+                import httpx
+            except ImportError:
+                return None
+            self._http = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+                timeout=httpx.Timeout(600.0, connect=10.0),
+                event_hooks={"response": [self._on_response]},
+            )
+        return self._http
+
+    def config_list(self, api_type: str = "basic") -> List[Dict[str, Any]]:
+        with self._lock:
+            if api_type not in self._configs:
+                self._configs[api_type] = get_llm_config(api_type=api_type)["config_list"]
+            return self._configs[api_type]
+
+    def get_wrapper(self, config_list: List[Dict[str, Any]], **params: Any):
+        """Shared OpenAIWrapper for a config list and wrapper params (timeout, temperature, ...)"""
+        start = time.perf_counter()
+        key = _config_key(config_list, params)
+        with self._lock:
+            wrapper = self._wrappers.get(key)
+            if wrapper is None:
+                http_client = self._http_client()
+                if http_client is not None:
+                    config_list = [{**config, "http_client": http_client} for config in config_list]
+                wrapper = self._wrappers[key] = OpenAIWrapper(config_list=config_list, **params)
+                self.wrappers_created += 1
+            self.client_requests += 1
+            self.setup_s += time.perf_counter() - start
+        return wrapper
+
+    def get_llm_wrapper(self, llm_config: Dict[str, Any]):
+        """Shared OpenAIWrapper for an AutoGen style llm_config ({"config_list": [...], ...})"""
+        params = {k: v for k, v in llm_config.items() if k != "config_list"}
+        return self.get_wrapper(llm_config["config_list"], **params)
+
+    def get_chat(
+        self,
+        system_prompt: str = "You are a helpfule assistant.",
+        model_name: Optional[str] = None,
+        config_list: Optional[List[Dict]] = None,
+        api_type: str = "basic",
+        **kwargs: Any,
+    ) -> AzureGPT4Chat:
+        """AzureGPT4Chat over a shared wrapper; the instance itself is cheap and not shared"""
+        retry_kwargs = {k: kwargs.pop(k) for k in ("max_retries", "base_delay", "max_delay") if k in kwargs}
+        if config_list is None:
+            config_list = self.config_list(api_type)
+        elif "config_list" in config_list:
+            config_list = config_list["config_list"]
+        return AzureGPT4Chat(
+            system_prompt=system_prompt,
+            model_name=model_name,
+            config_list=config_list,
+            client=self.get_wrapper(config_list, **kwargs),
+            **retry_kwargs,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "wrappers": self.wrappers_created,
+            "client_requests": self.client_requests,
+            "client_reuse": self.client_requests - self.wrappers_created,
+            "avg_setup_ms": round(self.setup_s / self.client_requests * 1000, 3) if self.client_requests else None,
+            "http_requests": self.http_requests,
+            "http_connections": self.http_connections,
+            "connection_reuse": self.http_requests - self.http_connections,
+        }
+
+    def reset(self) -> None:
+        """Drop cached configs and clients, e.g. after the environment changed"""
+        with self._lock:
+            self._configs.clear()
+            self._wrappers.clear()
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+            self._connection_ids.clear()
+
+
+llm_client_registry = LLMClientRegistry()
+
+
+def get_chat_client(system_prompt: str = "You are a helpfule assistant.", **kwargs: Any) -> AzureGPT4Chat:
+    """Drop-in replacement for AzureGPT4Chat(...) backed by the shared client registry"""
+    return llm_client_registry.get_chat(system_prompt=system_prompt, **kwargs)
+
+
+def get_llm_wrapper(llm_config: Dict[str, Any]):
+    """Drop-in replacement for OpenAIWrapper(**llm_config) backed by the shared client registry"""
+    return llm_client_registry.get_llm_wrapper(llm_config)
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+
+DEFAULT_PROVIDER = "api.openai.com"
+
+
+def provider_key(base_url: Optional[str]) -> str:
+    """Rate limits are tracked per API host"""
+    if not base_url:
+        return DEFAULT_PROVIDER
+    return urlsplit(base_url).hostname or DEFAULT_PROVIDER
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a limit resets, from values like "1s", "250ms", "6m0s" or "2" """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ProviderLimiter:
+    """Concurrency, request-per-minute and token-per-minute limits of one provider
+
+    The remaining request/token budget and its reset time come from the x-ratelimit-* response
+    headers. Each admitted call reserves its share locally until fresh headers arrive, so a burst
+    of concurrent calls cannot overrun a budget the provider has not reported yet. A 429 pauses
+    the provider until its retry-after time. Waiting happens in the calling (worker) thread.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.paused_until = 0.0
+
+        self.calls = 0
+        self.waits = 0
+        self.wait_s = 0.0
+        self.throttled = 0
+
+    def _delay(self, tokens: int) -> float:
+        now = time.monotonic()
+        # A budget past its reset time is unknown again until the next response reports it
+        if self.remaining_requests is not None and self.requests_reset_at <= now:
+            self.remaining_requests = None
+        if self.remaining_tokens is not None and self.tokens_reset_at <= now:
+            self.remaining_tokens = None
+        delay = max(0.0, self.paused_until - now)
+        if self.remaining_requests is not None and self.remaining_requests <= 0 and self.requests_reset_at > now:
+            delay = max(delay, self.requests_reset_at - now)
+        if self.remaining_tokens is not None and self.remaining_tokens < tokens and self.tokens_reset_at > now:
+            delay = max(delay, self.tokens_reset_at - now)
+        return delay
+
+    def acquire(self, tokens: int = 0) -> None:
+        start = time.monotonic()
+        self._slots.acquire()
+        while True:
+            with self._lock:
+                delay = self._delay(tokens)
+                if delay <= 0:
+                    if self.remaining_requests is not None:
+                        self.remaining_requests -= 1
+                    if self.remaining_tokens is not None:
+                        self.remaining_tokens -= tokens
+                    break
+            self.waits += 1
+            time.sleep(min(delay, 5.0))
+        self.calls += 1
+        self.wait_s += time.monotonic() - start
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def observe_headers(self, status_code: int, headers: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            remaining_requests = _to_int(headers.get("x-ratelimit-remaining-requests"))
+            remaining_tokens = _to_int(headers.get("x-ratelimit-remaining-tokens"))
+            if remaining_requests is not None:
+                self.remaining_requests = remaining_requests
+                self.requests_reset_at = now + (_parse_reset(headers.get("x-ratelimit-reset-requests")) or 1.0)
+            if remaining_tokens is not None:
+                self.remaining_tokens = remaining_tokens
+                self.tokens_reset_at = now + (_parse_reset(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+            if status_code == 429:
+                self.throttled += 1
+                retry_after = _parse_reset(headers.get("retry-after")) or 1.0
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "waits": self.waits,
+            "wait_s": round(self.wait_s, 3),
+            "throttled": self.throttled,
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+        }
+
+
+class RateLimiterRegistry:
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ProviderLimiter:
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+                limiter = self._limiters[name] = ProviderLimiter(name, max_concurrency)
+            return limiter
+
+    def observe_response(self, response) -> None:
+        """httpx response hook feeding rate limit headers to the provider's limiter"""
+        self.get(response.request.url.host or DEFAULT_PROVIDER).observe_headers(response.status_code, response.headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+rate_limiters = RateLimiterRegistry()
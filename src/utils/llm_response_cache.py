@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import importlib
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_RESPONSE_CACHE_PATH", "db/llm_cache/responses.sqlite")
+
+# Message keys that reach the provider; anything else (context, tool_responses, ...) is not part of the key
+_MESSAGE_KEYS = ("role", "content", "name", "tool_calls", "tool_call_id", "function_call")
+# Request parameters that change the completion besides model, messages, tools and temperature
+_PARAM_KEYS = ("top_p", "max_tokens", "response_format", "tool_choice", "stop", "seed", "n")
+
+
+def _normalize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: message[key] for key in _MESSAGE_KEYS if message.get(key) is not None}
+
+
+def make_request_key(
+    model: Optional[str],
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Any]] = None,
+    temperature: Optional[float] = None,
+    **params: Any,
+) -> str:
+    payload = {
+        "model": model or "",
+        "messages": [_normalize_message(m) for m in messages],
+        "tools": tools or [],
+        "temperature": temperature,
+        "params": {k: params[k] for k in _PARAM_KEYS if params.get(k) is not None},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _usage_tokens(response: Any) -> int:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0
+    total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+    return total or 0
+
+
+def _dump_response(response: Any) -> bytes:
+    """Serialize a completion as JSON with its class, so it is restored as the same type
+
+    Callables attached by the client (AutoGen's message_retrieval_function) are not stored.
+    """
+    if hasattr(response, "model_dump"):
+        cls = type(response)
+        data = response.model_dump(mode="json", exclude={"message_retrieval_function"})
+        record = {"cls": f"{cls.__module__}:{cls.__qualname__}", "data": data}
+    else:
+        record = {"cls": None, "data": response}
+    return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+def _load_response(blob: bytes) -> Any:
+    record = json.loads(blob)
+    if not record["cls"]:
+        return record["data"]
+    module, _, name = record["cls"].partition(":")
+    return getattr(importlib.import_module(module), name).model_validate(record["data"])
+
+
+class LLMResponseCache:
+    """Request level response cache in SQLite, keyed by the normalized request
+
+    Modes:
+        readwrite: serve hits, store responses of misses
+        replay: read-only, serve hits, misses go to the provider and are not stored
+        off: bypass the cache
+
+    Entries are evicted least recently used first once the stored responses exceed max_bytes.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, mode: str = "readwrite", max_bytes: int = 512 * 1024 * 1024):
+        self.db_path = db_path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response BLOB NOT NULL, size INTEGER NOT NULL, "
+            "tokens INTEGER NOT NULL, latency_s REAL NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.saved_tokens = 0
+        self.saved_latency_s = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("readwrite", "replay")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, tokens, latency_s FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.mode != "replay":
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            self.hits += 1
+            self.saved_tokens += row[1]
+            self.saved_latency_s += row[2]
+        try:
+            return _load_response(row[0])
+        except Exception as exc:
+            print(f"[LLMResponseCache] unreadable entry ignored: {exc}", flush=True)
+            return None
+
+    def put(self, key: str, model: Optional[str], response: Any, latency_s: float) -> None:
+        if self.mode != "readwrite":
+            return
+        try:
+            blob = _dump_response(response)
+        except Exception as exc:
+            print(f"[LLMResponseCache] response not cacheable: {exc}", flush=True)
+            return
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, tokens, latency_s, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), _usage_tokens(response), latency_s, now, now),
+            )
+            self._total_bytes += len(blob) - (previous[0] if previous else 0)
+            self.writes += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries down to 90% of max_bytes (caller holds the lock)"""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def create(
+        self,
+        create_fn: Callable[..., Any],
+        key: str,
+        model: Optional[str],
+        on_hit: Optional[Callable[[Any], None]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Return the cached response for key, or call create_fn(**kwargs) and store its response
+
+        Args:
+            on_hit: Called with a cached response before it is returned, to re-attach client state
+        """
+        if not self.enabled:
+            return create_fn(**kwargs)
+        cached = self.get(key)
+        if cached is not None:
+            if on_hit is not None:
+                on_hit(cached)
+            return cached
+        start = time.perf_counter()
+        response = create_fn(**kwargs)
+        self.put(key, model, response, time.perf_counter() - start)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "stored_mb": round(self._total_bytes / (1024 * 1024), 2),
+            "saved_tokens": self.saved_tokens,
+            "saved_latency_s": round(self.saved_latency_s, 3),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_response_cache: Optional[LLMResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """Process wide response cache, None unless enabled with LLM_RESPONSE_CACHE=readwrite|replay
+
+    LLM_RESPONSE_CACHE_PATH sets the SQLite file and LLM_RESPONSE_CACHE_MAX_MB the size limit.
+    """
+    global _response_cache
+    mode = os.getenv("LLM_RESPONSE_CACHE", "off").lower()
+    if mode not in ("readwrite", "replay"):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None or _response_cache.mode != mode:
+            _response_cache = LLMResponseCache(
+                db_path=DEFAULT_CACHE_PATH,
+                mode=mode,
+                max_bytes=int(float(os.getenv("LLM_RESPONSE_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            )
+        return _response_cache
+
+
+def cached_llm_create(
+    create_fn: Callable[..., Any],
+    model: Optional[str] = None,
+    tools: Optional[List[Any]] = None,
+    temperature: Optional[float] = None,
+    on_hit: Optional[Callable[[Any], None]] = None,
+    **kwargs: Any,
+) -> Any:
+    """Call create_fn(**kwargs) through the response cache when it is enabled
+
+    kwargs are passed to create_fn unchanged; messages and the parameters affecting the completion
+    are taken from them for the cache key. model, tools and temperature describe the request when
+    they are configured on the client rather than passed per call.
+    """
+    cache = get_llm_response_cache()
+    if cache is None:
+        return create_fn(**kwargs)
+    params = {k: v for k, v in kwargs.items() if k in _PARAM_KEYS}
+    key = make_request_key(
+        kwargs.get("model", model),
+        kwargs.get("messages") or [],
+        tools=kwargs.get("tools", tools),
+        temperature=kwargs.get("temperature", temperature),
+        **params,
+    )
+    return cache.create(create_fn, key, kwargs.get("model", model), on_hit=on_hit, **kwargs)
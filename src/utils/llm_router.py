@@ -0,0 +1,369 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.utils.llm_rate_limiter import provider_key
+
+
+def endpoint_key(base_url: Optional[str], model: Optional[str]) -> str:
+    """Latency is tracked per API host and model"""
+    return f"{provider_key(base_url)}/{model or ''}"
+
+
+def routing_enabled() -> bool:
+    return os.getenv("LLM_ROUTING", "priority").lower() == "latency"
+
+
+def hedging_enabled() -> bool:
+    return os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+
+
+class EndpointStats:
+    """Rolling latency and error window of one endpoint"""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class LLMRouter:
+    """Latency-aware ordering and hedging of LLM requests across endpoints
+
+    Every completed request records its latency and outcome. Endpoints are ranked by their
+    median latency over the rolling window; an endpoint with fewer than min_samples requests
+    is ranked first so it gets measured. An endpoint failing failure_threshold times in a row,
+    or erring on more than max_error_rate of its window, is unhealthy for cooldown_s and only
+    used when nothing else is left.
+
+    call()/a_call() run one request with failover: when an attempt fails the next endpoint is
+    tried. With hedge=True a duplicate goes to the next endpoint once the first has been running
+    longer than its p95 latency; the first response wins. The other request cannot be stopped
+    once sent, it runs to completion and its result is discarded: stats() counts these requests
+    ("discarded_requests") and those that completed and were paid for ("discarded_completions").
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 3,
+        failure_threshold: int = 3,
+        max_error_rate: float = 0.5,
+        cooldown_s: float = 30.0,
+        hedge_quantile: float = 0.95,
+        default_hedge_delay_s: Optional[float] = None,
+        max_workers: int = 16,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.cooldown_s = cooldown_s
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay_s = (
+            default_hedge_delay_s if default_hedge_delay_s is not None
+            else float(os.getenv("LLM_HEDGE_DELAY_S", "8"))
+        )
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.discarded_requests = 0
+        self.discarded_completions = 0
+
+    def _stats(self, endpoint: str) -> EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = EndpointStats(self.window)
+        return stats
+
+    def record(self, endpoint: str, latency_s: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.requests += 1
+            stats.outcomes.append(ok)
+            if ok:
+                stats.latencies.append(latency_s)
+                stats.consecutive_failures = 0
+                return
+            stats.errors += 1
+            stats.consecutive_failures += 1
+            degraded = len(stats.outcomes) >= self.min_samples and stats.error_rate > self.max_error_rate
+            if stats.consecutive_failures >= self.failure_threshold or degraded:
+                stats.down_until = time.monotonic() + self.cooldown_s
+
+    def healthy(self, endpoint: str) -> bool:
+        with self._lock:
+            return self._stats(endpoint).down_until <= time.monotonic()
+
+    def rank(self, endpoints: List[str]) -> List[str]:
+        """Endpoints ordered fastest healthy first; ties keep the given (priority) order"""
+        now = time.monotonic()
+
+        def _score(item):
+            index, endpoint = item
+            stats = self._stats(endpoint)
+            unhealthy = stats.down_until > now
+            measured = len(stats.latencies) >= self.min_samples
+            return (unhealthy, measured, stats.quantile(0.5) if measured else 0.0, index)
+
+        with self._lock:
+            ordered = sorted(enumerate(endpoints), key=_score)
+        return [endpoint for _, endpoint in ordered]
+
+    def hedge_delay(self, endpoint: str) -> float:
+        """Seconds to wait for an endpoint before hedging: its p95 latency once it is measured"""
+        with self._lock:
+            stats = self._stats(endpoint)
+            if len(stats.latencies) < self.min_samples:
+                return self.default_hedge_delay_s
+            return stats.quantile(self.hedge_quantile)
+
+    def _discard(self, future: Any) -> None:
+        """Count a losing attempt that is left to finish, and whether it completes"""
+        with self._lock:
+            self.discarded_requests += 1
+        future.add_done_callback(self._discarded_done)
+
+    def _discarded_done(self, future: Any) -> None:
+        if not future.cancelled() and future.exception() is None:
+            with self._lock:
+                self.discarded_completions += 1
+
+    def _timed(self, endpoint: str, fn: Callable[[], Any], record: bool) -> Any:
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            if record:
+                self.record(endpoint, time.perf_counter() - start, False)
+            raise
+        if record:
+            self.record(endpoint, time.perf_counter() - start, True)
+        return result
+
+    async def _a_timed(self, endpoint: str, fn: Callable[[], Awaitable[Any]], record: bool) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if record:
+                self.record(endpoint, time.perf_counter() - start, False)
+            raise
+        if record:
+            self.record(endpoint, time.perf_counter() - start, True)
+        return result
+
+    def call(self, attempts: List[Tuple[str, Callable[[], Any]]], hedge: bool = False, record: bool = True) -> Any:
+        """Run (endpoint, fn) attempts in order with failover and optional hedging, return the first result
+
+        Args:
+            record: Record latencies here; False when fn records them itself
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-router")
+        remaining = list(attempts)
+        pending: Dict[Any, str] = {}
+        first_endpoint = remaining[0][0] if remaining else None
+        hedged = False
+        last_exception: Optional[BaseException] = None
+
+        def _launch() -> None:
+            endpoint, fn = remaining.pop(0)
+            pending[self._pool.submit(self._timed, endpoint, fn, record)] = endpoint
+
+        _launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(first_endpoint) if hedge and not hedged and remaining else None
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedged_requests += 1
+                    _launch()
+                    continue
+                for future in done:
+                    endpoint = pending.pop(future)
+                    if future.exception() is None:
+                        self.hedge_wins += int(hedged and endpoint != first_endpoint)
+                        return future.result()
+                    last_exception = future.exception()
+                if not pending and remaining:
+                    self.failovers += 1
+                    _launch()
+        finally:
+            # A request already running in a worker thread finishes there; its result is discarded
+            for future in pending:
+                if not future.cancel():
+                    self._discard(future)
+        raise last_exception
+
+    async def a_call(
+        self,
+        attempts: List[Tuple[str, Callable[[], Awaitable[Any]]]],
+        hedge: bool = False,
+        record: bool = True,
+    ) -> Any:
+        """Async call(): attempts are coroutine factories, the losing attempt's result is discarded"""
+        remaining = list(attempts)
+        pending: Dict[asyncio.Task, str] = {}
+        first_endpoint = remaining[0][0] if remaining else None
+        hedged = False
+        last_exception: Optional[BaseException] = None
+
+        def _launch() -> None:
+            endpoint, fn = remaining.pop(0)
+            pending[asyncio.ensure_future(self._a_timed(endpoint, fn, record))] = endpoint
+
+        _launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(first_endpoint) if hedge and not hedged and remaining else None
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedged_requests += 1
+                    _launch()
+                    continue
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.exception() is None:
+                        self.hedge_wins += int(hedged and endpoint != first_endpoint)
+                        return task.result()
+                    last_exception = task.exception()
+                if not pending and remaining:
+                    self.failovers += 1
+                    _launch()
+        finally:
+            # Cancelling would not stop a request running in a thread (asyncio.to_thread attempts),
+            # the losing attempt is left to finish so its spend is counted
+            for task in pending:
+                self._discard(task)
+        raise last_exception
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "error_rate": round(stats.error_rate, 3),
+                    "p50_s": round(stats.quantile(0.5), 3) if stats.latencies else None,
+                    "p95_s": round(stats.quantile(0.95), 3) if stats.latencies else None,
+                    "healthy": stats.down_until <= now,
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+        return {
+            "endpoints": endpoints,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "discarded_requests": self.discarded_requests,
+            "discarded_completions": self.discarded_completions,
+        }
+
+
+llm_router = LLMRouter()
+
+
+class RoutedChat:
+    """chat_with_message over every configured provider, sent to the fastest healthy one
+
+    Latencies are recorded by AzureGPT4Chat itself for all LLM traffic, so the router also learns
+    from calls that do not go through here. With task, an auxiliary call type (see llm_tiers),
+    every provider runs the model of the task's tier.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str = "You are a helpfule assistant.",
+        providers: Optional[Dict[str, Dict[str, Any]]] = None,
+        hedge: bool = False,
+        router: LLMRouter = llm_router,
+        task: Optional[str] = None,
+    ):
+        from configs.oai_config import get_available_providers
+        from src.utils.llm_client_registry import llm_client_registry
+        from src.utils.llm_tiers import model_tiers
+
+        providers = providers if providers is not None else get_available_providers()
+        if not providers:
+            raise ValueError("No valid API provider found. Please configure at least one API key.")
+        self.router = router
+        self.hedge = hedge
+        self.chats = {}
+        tier = model_tiers.resolve(task) if task else None
+        for config in providers.values():
+            config_list = model_tiers.config_list(tier, config["config_list"]) if tier else config["config_list"]
+            chat = llm_client_registry.get_chat(system_prompt=system_prompt, config_list=config_list)
+            chat.model_tier = (task, tier) if tier else None
+            # Providers sharing an endpoint (e.g. 'openai' and 'basic') are one routing target
+            self.chats.setdefault(chat.endpoint, chat)
+
+    def _attempts(self, messages: List[Dict], json_format: bool, asynchronous: bool) -> List[Tuple[str, Callable]]:
+        attempts = []
+        for endpoint in self.router.rank(list(self.chats)):
+            chat = self.chats[endpoint]
+            if asynchronous:
+                fn = lambda chat=chat: asyncio.to_thread(chat._chat_call, messages, chat.deployment_name, json_format)
+            else:
+                fn = lambda chat=chat: chat._chat_call(messages, chat.deployment_name, json_format)
+            attempts.append((endpoint, fn))
+        return attempts
+
+    def chat_with_message(self, message: List[Dict], json_format: bool = False) -> Any:
+        try:
+            return self.router.call(self._attempts(message, json_format, False), hedge=self.hedge, record=False)
+        except Exception as e:
+            return f"Still failed on all providers. Error: {str(e)}"
+
+    async def a_chat_with_message(self, message: List[Dict], json_format: bool = False) -> Any:
+        try:
+            return await self.router.a_call(self._attempts(message, json_format, True), hedge=self.hedge, record=False)
+        except Exception as e:
+            return f"Still failed on all providers. Error: {str(e)}"
+
+
+def get_routed_chat_client(
+    system_prompt: str = "You are a helpfule assistant.",
+    latency_critical: bool = False,
+    task: Optional[str] = None,
+):
+    """Chat client for helper calls: routed across providers when LLM_ROUTING=latency
+
+    Latency-critical calls are hedged when LLM_HEDGE=1. Without routing this is the usual
+    single-provider client from the registry. task selects the model tier of an auxiliary call.
+    """
+    if not routing_enabled():
+        if task:
+            from src.utils.llm_tiers import get_tier_chat_client
+            return get_tier_chat_client(task, system_prompt=system_prompt)
+        from src.utils.llm_client_registry import get_chat_client
+        return get_chat_client(system_prompt=system_prompt)
+    return RoutedChat(system_prompt=system_prompt, hedge=latency_critical and hedging_enabled(), task=task)
@@ -0,0 +1,196 @@
+import os
+import uuid
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+_run_id: ContextVar[Optional[str]] = ContextVar("llm_stream_run_id", default=None)
+
+
+def current_run_id() -> Optional[str]:
+    """Run the current code belongs to, see stream_run()
+
+    AutoGen generates replies in executor threads, where context variables are not carried over
+    but the default IOStream is; the run id is carried on the IOStream for that case.
+    """
+    run_id = _run_id.get()
+    if run_id is None:
+        try:
+            from autogen.io.base import IOStream
+            run_id = getattr(IOStream.get_default(), "stream_run_id", None)
+        except Exception:
+            pass
+    return run_id
+
+
+class RunIOStream:
+    """Pass-through IOStream tagged with the run id"""
+
+    def __init__(self, inner: Any, run_id: str):
+        self.inner = inner
+        self.stream_run_id = run_id
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        self.inner.print(*objects, sep=sep, end=end, flush=flush)
+
+    def send(self, message: Any) -> None:
+        self.inner.send(message)
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        return self.inner.input(prompt, password=password)
+
+
+@contextmanager
+def stream_run(run_id: Optional[str] = None):
+    """Scope the events published in the block to a run
+
+    Nested scopes keep the enclosing run id. Subscribers registered with this run id receive only
+    the run's events, so concurrent runs in one process (Streamlit sessions) stay apart.
+    """
+    run_id = current_run_id() or run_id or uuid.uuid4().hex
+    token = _run_id.set(run_id)
+    try:
+        from autogen.io.base import IOStream
+        iostream_scope = IOStream.set_default(RunIOStream(IOStream.get_default(), run_id))
+    except Exception:
+        iostream_scope = None
+    try:
+        if iostream_scope is None:
+            yield run_id
+        else:
+            with iostream_scope:
+                yield run_id
+    finally:
+        _run_id.reset(token)
+
+
+def streaming_enabled() -> bool:
+    """Completions are streamed only while someone listens to this run; LLM_STREAM=0 turns it off entirely"""
+    return os.getenv("LLM_STREAM", "1").lower() not in ("0", "false", "no") and stream_hub.active(current_run_id())
+
+
+class StreamHub:
+    """Fan-out of agent progress events to the CLI and UI
+
+    Events are dicts with a "type":
+        delta: partial assistant text {"agent", "content"}
+        message: a completed assistant turn {"agent", "content", "tool_calls"}
+        tool_start / tool_end: tool execution progress {"agent", "tool", ...}
+
+    Every event carries the "run_id" of the stream_run() it was published in (None outside one).
+    A subscriber given a run_id only receives that run's events; one without (the CLI console)
+    receives every event. Subscribers are called from whichever thread produced the event, so
+    they must be cheap and thread-safe (print, queue.put).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Callable[[Dict[str, Any]], None], Optional[str]]] = []
+
+    def active(self, run_id: Optional[str] = None) -> bool:
+        return any(scope is None or scope == run_id for _, scope in self._subscribers)
+
+    @contextmanager
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None], run_id: Optional[str] = None):
+        entry = (callback, run_id)
+        with self._lock:
+            self._subscribers.append(entry)
+        try:
+            yield callback
+        finally:
+            with self._lock:
+                self._subscribers.remove(entry)
+
+    def publish(self, event_type: str, run_id: Optional[str] = None, **payload: Any) -> None:
+        if not self._subscribers:
+            return
+        run_id = run_id if run_id is not None else current_run_id()
+        event = {"type": event_type, "run_id": run_id, **payload}
+        for callback, scope in list(self._subscribers):
+            if scope is not None and scope != run_id:
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[StreamHub] subscriber failed: {e}", flush=True)
+
+
+stream_hub = StreamHub()
+
+
+class DeltaIOStream:
+    """AutoGen IOStream that routes streamed completion chunks to the hub
+
+    Installed with IOStream.set_default() around a streaming create call. Content chunks go to
+    the hub instead of stdout; everything else is passed on to the previous stream.
+    """
+
+    def __init__(self, inner: Any, agent_name: Optional[str] = None, hub: StreamHub = stream_hub):
+        self.inner = inner
+        self.agent_name = agent_name
+        self.hub = hub
+        self.stream_run_id = current_run_id()
+        self.chunks: List[str] = []
+
+    def _delta(self, content: str) -> None:
+        self.chunks.append(content)
+        self.hub.publish("delta", run_id=self.stream_run_id, agent=self.agent_name, content=content)
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        # Older AutoGen versions print chunks with end=""
+        if end == "" and objects:
+            self._delta(sep.join(str(o) for o in objects))
+            return
+        self.inner.print(*objects, sep=sep, end=end, flush=flush)
+
+    def send(self, message: Any) -> None:
+        if type(message).__name__ in ("StreamMessage", "StreamEvent") and getattr(message, "content", None) is not None:
+            self._delta(message.content)
+            return
+        self.inner.send(message)
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        return self.inner.input(prompt, password=password)
+
+
+class ConsolePrinter:
+    """Hub subscriber for the CLI: partial text as it arrives, one line per tool call"""
+
+    def __init__(self):
+        self._agent = None
+        self._open_line = False
+
+    def _end_line(self) -> None:
+        if self._open_line:
+            print(flush=True)
+            self._open_line = False
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        event_type = event["type"]
+        if event_type == "delta":
+            if not self._open_line or event.get("agent") != self._agent:
+                self._end_line()
+                self._agent = event.get("agent")
+                print(f"💬 {self._agent or 'assistant'}: ", end="", flush=True)
+            print(event["content"], end="", flush=True)
+            self._open_line = True
+        elif event_type == "message":
+            self._end_line()
+        elif event_type == "tool_start":
+            self._end_line()
+            print(f"🔧 {event.get('agent') or 'agent'} → {event['tool']} ...", flush=True)
+        elif event_type == "tool_end":
+            status = "✅" if event.get("ok", True) else "❌"
+            print(f"{status} {event['tool']} ({event.get('duration_s', 0):.1f}s)", flush=True)
+
+
+@contextmanager
+def stream_to_console(enabled: bool = True):
+    """Print streamed agent progress to the terminal for the duration of the block"""
+    if not enabled:
+        yield None
+        return
+    with stream_hub.subscribe(ConsolePrinter()) as printer:
+        yield printer
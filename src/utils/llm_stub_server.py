@@ -0,0 +1,439 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import socket
+import hashlib
+import argparse
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_STUB_HOST = "127.0.0.1"
+DEFAULT_STUB_PORT = 8765
+DEFAULT_STUB_MODEL = "stub-model"
+
+
+def stub_enabled() -> bool:
+    return os.getenv("LLM_STUB", "0").lower() in ("1", "true", "yes")
+
+
+def stub_base_url() -> str:
+    return os.getenv("LLM_STUB_BASE_URL", f"http://{DEFAULT_STUB_HOST}:{DEFAULT_STUB_PORT}/v1")
+
+
+def estimate_tokens(text: str) -> int:
+    """About four characters per token; deterministic and dependency free"""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def sample(spec: Any, rng: random.Random) -> float:
+    """Draw from a distribution spec: a number, or {"dist": fixed|uniform|normal|lognormal, ...}
+
+    fixed: {"value"}; uniform: {"min", "max"}; normal: {"mean", "std"};
+    lognormal: {"median", "sigma"}. Results are never negative.
+    """
+    if spec is None:
+        return 0.0
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        value = spec.get("value", 0.0)
+    elif dist == "uniform":
+        value = rng.uniform(spec.get("min", 0.0), spec.get("max", 0.0))
+    elif dist == "normal":
+        value = rng.gauss(spec.get("mean", 0.0), spec.get("std", 0.0))
+    elif dist == "lognormal":
+        value = spec.get("median", 1.0) * math.exp(rng.gauss(0.0, spec.get("sigma", 0.0)))
+    else:
+        raise ValueError(f"Unknown distribution: {dist}")
+    return max(0.0, float(value))
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _example_value(schema: Dict[str, Any]) -> Any:
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if "default" in schema:
+        return schema["default"]
+    return {"string": "stub", "integer": 1, "number": 1, "boolean": True, "array": [], "object": {}}.get(
+        schema.get("type"), "stub"
+    )
+
+
+def example_arguments(parameters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Arguments for the required parameters of a tool schema, filled with placeholder values"""
+    parameters = parameters or {}
+    properties = parameters.get("properties", {})
+    return {name: _example_value(properties.get(name, {})) for name in parameters.get("required", [])}
+
+
+class StubScript:
+    """Rules deciding how the stub server answers a chat completion request
+
+    A script is a JSON object:
+        {
+          "seed": 0,
+          "latency_s": {"dist": "lognormal", "median": 0.4, "sigma": 0.3},
+          "completion_tokens": {"dist": "uniform", "min": 50, "max": 400},
+          "rules": [
+            {"match": "regex", "role": "user", "tools": true, "json": false, "model": "regex",
+             "responses": [{"content": "...", "tool_calls": [{"name": "tool", "arguments": {...}}]}, ...],
+             "latency_s": ...}
+          ]
+        }
+
+    The first rule whose conditions all hold answers the request. "match" is searched in the
+    content of the last message with the given role (default: the last message of any role);
+    "tools" and "json" test whether the request offers tools or asks for a JSON response.
+    "responses" are picked by the conversation turn (number of assistant messages so far) and
+    the last one is repeated, so a scripted multi-turn dialog replays the same way every run.
+
+    Requests no rule matches get the built-in behavior: call the first offered tool with
+    placeholder arguments, answer a tool result with a final message ending in TERMINATE, and
+    answer JSON requests with "{}". Latency and token counts are drawn from the distributions
+    with a generator seeded by the script seed and the request, so they are reproducible too;
+    without "completion_tokens" usage is estimated from the text.
+    """
+
+    def __init__(self, script: Optional[Dict[str, Any]] = None):
+        script = script or {}
+        self.seed = script.get("seed", 0)
+        self.latency_s = script.get("latency_s", 0.0)
+        self.prompt_tokens = script.get("prompt_tokens")
+        self.completion_tokens = script.get("completion_tokens")
+        self.terminate_word = script.get("terminate_word", "TERMINATE")
+        self.rules = script.get("rules", [])
+        for rule in self.rules:
+            if rule.get("match"):
+                rule["_pattern"] = re.compile(rule["match"], re.S)
+            if rule.get("model"):
+                rule["_model"] = re.compile(rule["model"])
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "StubScript":
+        if not path:
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def rng(self, body: Dict[str, Any]) -> random.Random:
+        digest = hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+        return random.Random(f"{self.seed}:{digest}")
+
+    @staticmethod
+    def _last_text(messages: List[Dict[str, Any]], role: Optional[str]) -> Optional[str]:
+        for message in reversed(messages):
+            if role is None or message.get("role") == role:
+                return _text(message.get("content"))
+        return None
+
+    def _matches(self, rule: Dict[str, Any], body: Dict[str, Any]) -> bool:
+        messages = body.get("messages") or []
+        if "tools" in rule and bool(body.get("tools")) != rule["tools"]:
+            return False
+        wants_json = (body.get("response_format") or {}).get("type") in ("json_object", "json_schema")
+        if "json" in rule and wants_json != rule["json"]:
+            return False
+        if "_model" in rule and not rule["_model"].search(body.get("model") or ""):
+            return False
+        if "_pattern" in rule:
+            text = self._last_text(messages, rule.get("role"))
+            if text is None or not rule["_pattern"].search(text):
+                return False
+        return True
+
+    def _default_response(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        messages = body.get("messages") or []
+        last = messages[-1] if messages else {}
+        if (body.get("response_format") or {}).get("type") in ("json_object", "json_schema"):
+            return {"content": "{}"}
+        tools = body.get("tools") or []
+        if tools and last.get("role") not in ("tool", "function"):
+            function = tools[0].get("function", {})
+            return {"tool_calls": [{"name": function.get("name"), "arguments": example_arguments(function.get("parameters"))}]}
+        if last.get("role") in ("tool", "function"):
+            return {"content": f"Stub result based on the tool output.\n\n{self.terminate_word}"}
+        prompt = " ".join((self._last_text(messages, "user") or "").split())[:80]
+        return {"content": f"Stub response to: {prompt}\n\n{self.terminate_word}"}
+
+    def respond(self, body: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int], float]:
+        """(message, usage, latency_s) for a chat completion request body"""
+        rng = self.rng(body)
+        messages = body.get("messages") or []
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+        reply, latency_spec = None, self.latency_s
+        for rule in self.rules:
+            if self._matches(rule, body):
+                responses = rule.get("responses") or [rule.get("response", {})]
+                reply = responses[min(turn, len(responses) - 1)]
+                latency_spec = rule.get("latency_s", latency_spec)
+                break
+        if reply is None:
+            reply = self._default_response(body)
+
+        message: Dict[str, Any] = {"role": "assistant", "content": reply.get("content")}
+        if reply.get("tool_calls"):
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{turn}_{i}",
+                    "type": "function",
+                    "function": {
+                        "name": call["name"],
+                        "arguments": call["arguments"] if isinstance(call.get("arguments"), str)
+                        else json.dumps(call.get("arguments") or {}, ensure_ascii=False),
+                    },
+                }
+                for i, call in enumerate(reply["tool_calls"])
+            ]
+
+        if self.prompt_tokens is not None:
+            prompt_tokens = int(sample(self.prompt_tokens, rng))
+        else:
+            prompt_tokens = sum(estimate_tokens(_text(m.get("content"))) for m in messages)
+            prompt_tokens += estimate_tokens(json.dumps(body.get("tools") or [], ensure_ascii=False)) if body.get("tools") else 0
+        if self.completion_tokens is not None:
+            completion_tokens = int(sample(self.completion_tokens, rng))
+        else:
+            completion_tokens = estimate_tokens(message.get("content") or "") + sum(
+                estimate_tokens(c["function"]["arguments"]) for c in message.get("tool_calls", [])
+            )
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return message, usage, sample(latency_spec, rng)
+
+
+class StubLLMServer:
+    """OpenAI-compatible chat completions server answering from a StubScript, for offline runs
+
+    Serves POST /v1/chat/completions (including stream=True as server-sent events),
+    GET /v1/models and GET /stub/stats. The reply is computed immediately and sent after the
+    drawn latency; the server is threaded, so concurrent requests wait in parallel like they
+    would on a real provider.
+    """
+
+    def __init__(self, script: Optional[StubScript] = None, host: str = DEFAULT_STUB_HOST, port: int = DEFAULT_STUB_PORT,
+                 model: str = DEFAULT_STUB_MODEL):
+        self.script = script or StubScript()
+        self.model = model
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": server.model, "object": "model", "owned_by": "stub"}]})
+                elif self.path.rstrip("/").endswith("/stub/stats"):
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                    message, usage, latency_s = server.script.respond(body)
+                except Exception as e:
+                    self._send_json(400, {"error": {"message": str(e), "type": "invalid_request_error"}})
+                    return
+                server._account(message, usage)
+                time.sleep(latency_s)
+                completion_id = f"chatcmpl-stub-{hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()[:16]}"
+                model = body.get("model") or server.model
+                if body.get("stream"):
+                    self._stream(completion_id, model, message, usage, body)
+                    return
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                    }],
+                    "usage": usage,
+                })
+
+            def _stream(self, completion_id: str, model: str, message: Dict[str, Any], usage: Dict[str, int],
+                        body: Dict[str, Any]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                created = int(time.time())
+
+                def write(choices: List[Dict[str, Any]], **extra: Any) -> None:
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                             "model": model, "choices": choices, **extra}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                def event(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> None:
+                    write([{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+                event({"role": "assistant", "content": ""})
+                content = message.get("content") or ""
+                for start in range(0, len(content), 16):
+                    event({"content": content[start:start + 16]})
+                for index, call in enumerate(message.get("tool_calls", [])):
+                    event({"tool_calls": [{"index": index, **call}]})
+                event({}, "tool_calls" if message.get("tool_calls") else "stop")
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    write([], usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+    def _account(self, message: Dict[str, Any], usage: Dict[str, int]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.completion_tokens += usage["completion_tokens"]
+            self.tool_calls += len(message.get("tool_calls", []))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "tool_calls": self.tool_calls,
+            }
+
+    def start(self) -> "StubLLMServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="llm-stub-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread = None
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+_stub_server: Optional[StubLLMServer] = None
+_stub_server_lock = threading.Lock()
+# Base URLs settled without a server of ours (an external stub answered, or starting failed),
+# so config calls do not probe them again
+_stub_resolved: Dict[str, str] = {}
+
+
+def _listening(base_url: str) -> bool:
+    try:
+        with urllib.request.urlopen(f"{base_url.rstrip('/')}/models", timeout=1) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+def ensure_stub_server() -> Optional[StubLLMServer]:
+    """Start the stub server in this process unless one already answers on LLM_STUB_BASE_URL
+
+    Called when configs resolve to the local_stub provider, so LLM_STUB=1 alone makes a run
+    offline. The script comes from LLM_STUB_SCRIPT. Returns the server started here, if any.
+    The outcome is settled once per process and base URL.
+    """
+    global _stub_server
+    with _stub_server_lock:
+        if _stub_server is not None:
+            return _stub_server
+        base_url = stub_base_url()
+        if base_url in _stub_resolved:
+            return None
+        if _listening(base_url):
+            _stub_resolved[base_url] = "external"
+            return None
+        host, _, port = base_url.split("://", 1)[-1].split("/", 1)[0].partition(":")
+        try:
+            _stub_server = StubLLMServer(
+                StubScript.load(os.getenv("LLM_STUB_SCRIPT")),
+                host=host or DEFAULT_STUB_HOST,
+                port=int(port or DEFAULT_STUB_PORT),
+                model=os.getenv("LLM_STUB_MODEL", DEFAULT_STUB_MODEL),
+            ).start()
+        except (OSError, socket.error) as e:
+            print(f"[StubLLMServer] could not start on {base_url}: {e}", flush=True)
+            _stub_resolved[base_url] = "failed"
+            return None
+        print(f"[StubLLMServer] serving {_stub_server.base_url}", flush=True)
+        return _stub_server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.utils.llm_stub_server",
+                                     description="Deterministic OpenAI-compatible stub server for offline runs")
+    parser.add_argument("--host", default=DEFAULT_STUB_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_STUB_PORT)
+    parser.add_argument("--model", default=DEFAULT_STUB_MODEL)
+    parser.add_argument("--script", default=os.getenv("LLM_STUB_SCRIPT"), help="JSON script of rules and distributions")
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+
+    server = StubLLMServer(StubScript.load(args.script), host=args.host, port=args.port, model=args.model)
+    print(f"[StubLLMServer] serving {server.base_url} (set LLM_STUB=1 and LLM_STUB_BASE_URL={server.base_url})", flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(json.dumps(server.stats(), indent=2), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+
+# Endpoints whose model names are the vendor's own; elsewhere (azure deployments, proxies) a name
+# from the tier family map may not exist
+FIRST_PARTY_HOSTS = ("api.openai.com", "api.anthropic.com")
+
+
+def first_party_endpoint(entry: Dict[str, Any]) -> bool:
+    if entry.get("api_type") == "azure":
+        return False
+    base_url = entry.get("base_url")
+    return not base_url or urlparse(base_url).hostname in FIRST_PARTY_HOSTS
+
+
+def model_not_found(exc: BaseException) -> bool:
+    text = str(exc).lower()
+    return getattr(exc, "status_code", None) == 404 or "model_not_found" in text or (
+        "model" in text and ("does not exist" in text or "not found" in text)
+    )
+
+
+def _usage_value(usage: Any, key: str) -> int:
+    if usage is None:
+        return 0
+    value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+    return int(value or 0)
+
+
+class TierStats:
+    """Calls, latency window, tokens and cost of one model tier"""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.priced = False
+        self.tasks: Dict[str, int] = {}
+        self.models: Dict[str, int] = {}
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ModelTierRouter:
+    """Model tier of each auxiliary LLM call type, with per-tier latency and cost metrics
+
+    The routing table is aux_task_tiers in configs/oai_config.py; model_tiers there says which
+    model a tier uses. Overrides, strongest first: override() blocks (innermost wins),
+    LLM_TIER_FORCE=<tier> for every call type, LLM_TIER_OVERRIDES="task=tier,..." per call type.
+    A call type missing from the table runs on the large tier, i.e. the configured model.
+
+    The family map ("models") only applies to first-party OpenAI/Anthropic endpoints. When the
+    endpoint answers "model not found" for a mapped model, fallback() names the configured model
+    to retry with, and the mapped model is not used again in this process.
+
+    Tier chats report every completed request through record(); stats() gives call counts,
+    p50/p95 latency, tokens and cost (when the model has a price) per tier.
+    """
+
+    DEFAULT_TIER = "large"
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._stats: Dict[str, TierStats] = {}
+        self._overrides: List[tuple] = []
+        # mapped model -> configured model it replaced, and the mapped models found missing
+        self._substitutes: Dict[str, str] = {}
+        self._not_found: set = set()
+
+    def _table(self):
+        from configs.oai_config import aux_task_tiers, model_tiers
+        return aux_task_tiers, model_tiers
+
+    def _env_overrides(self) -> Dict[str, str]:
+        overrides = {}
+        for item in os.getenv("LLM_TIER_OVERRIDES", "").split(","):
+            task, _, tier = item.partition("=")
+            if task.strip() and tier.strip():
+                overrides[task.strip()] = tier.strip()
+        return overrides
+
+    def resolve(self, task: str) -> str:
+        aux_task_tiers, model_tiers = self._table()
+        with self._lock:
+            for override_task, tier in reversed(self._overrides):
+                if override_task is None or override_task == task:
+                    return tier
+        tier = os.getenv("LLM_TIER_FORCE") or self._env_overrides().get(task) or aux_task_tiers.get(task, self.DEFAULT_TIER)
+        if tier not in model_tiers:
+            print(f"[ModelTierRouter] unknown tier '{tier}' for {task}, using {self.DEFAULT_TIER}", flush=True)
+            return self.DEFAULT_TIER
+        return tier
+
+    @contextmanager
+    def override(self, tier: str, task: Optional[str] = None):
+        """Run the block with one call type (or every call type when task is None) on tier"""
+        entry = (task, tier)
+        with self._lock:
+            self._overrides.append(entry)
+        try:
+            yield tier
+        finally:
+            with self._lock:
+                self._overrides.remove(entry)
+
+    def config_list(self, tier: str, base_config_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """base_config_list with the tier's provider and model swapped in"""
+        from configs.oai_config import get_api_config
+
+        spec = self._table()[1].get(tier, {})
+        if spec.get("provider"):
+            base_config_list = get_api_config()[spec["provider"]]["config_list"]
+        tiered = []
+        for entry in base_config_list:
+            entry = dict(entry)
+            model = spec.get("model")
+            if not model and first_party_endpoint(entry):
+                model = (spec.get("models") or {}).get(entry.get("model"))
+                with self._lock:
+                    if model in self._not_found:
+                        model = None
+                    elif model:
+                        self._substitutes[model] = entry["model"]
+            if model:
+                entry["model"] = model
+            if spec.get("price"):
+                entry["price"] = list(spec["price"])
+            elif model:
+                entry.pop("price", None)
+            tiered.append(entry)
+        return tiered
+
+    def fallback(self, model: Optional[str], exc: BaseException) -> Optional[str]:
+        """Configured model to retry with when exc says the mapped model does not exist, else None"""
+        with self._lock:
+            configured = self._substitutes.get(model or "")
+            if configured is None or not model_not_found(exc):
+                return None
+            self._not_found.add(model)
+        print(f"[ModelTierRouter] {model} not found, using {configured}", flush=True)
+        return configured
+
+    def _price(self, model: str, tier: str):
+        spec = self._table()[1].get(tier, {})
+        if spec.get("price"):
+            return spec["price"]
+        from src.utils.usage_accounting import usage_accountant
+        return usage_accountant.price_map().get(model)
+
+    def record(self, task: str, tier: str, model: Optional[str], latency_s: float, ok: bool, usage: Any = None) -> None:
+        prompt_tokens = _usage_value(usage, "prompt_tokens")
+        completion_tokens = _usage_value(usage, "completion_tokens")
+        price = self._price(model or "", tier) if ok else None
+        with self._lock:
+            stats = self._stats.get(tier)
+            if stats is None:
+                stats = self._stats[tier] = TierStats(self.window)
+            stats.calls += 1
+            stats.tasks[task] = stats.tasks.get(task, 0) + 1
+            stats.models[model or ""] = stats.models.get(model or "", 0) + 1
+            if not ok:
+                stats.errors += 1
+                return
+            stats.latencies.append(latency_s)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            if price:
+                stats.cost += prompt_tokens / 1000.0 * price[0] + completion_tokens / 1000.0 * price[1]
+                stats.priced = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                tier: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "p50_s": round(stats.quantile(0.5), 3) if stats.latencies else None,
+                    "p95_s": round(stats.quantile(0.95), 3) if stats.latencies else None,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                    "cost": round(stats.cost, 6) if stats.priced else None,
+                    "tasks": dict(stats.tasks),
+                    "models": dict(stats.models),
+                }
+                for tier, stats in self._stats.items()
+            }
+
+
+model_tiers = ModelTierRouter()
+
+
+def tier_llm_config(task: str, llm_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an llm_config whose config_list runs on the tier of task"""
+    tiered = dict(llm_config)
+    if llm_config.get("config_list"):
+        tiered["config_list"] = model_tiers.config_list(model_tiers.resolve(task), llm_config["config_list"])
+    return tiered
+
+
+def tracked_create(task: str, create_fn: Callable[..., Any], model: Optional[str] = None) -> Callable[..., Any]:
+    """create_fn (an OpenAIWrapper.create) reporting each request to the metrics of task's tier"""
+    tier = model_tiers.resolve(task)
+
+    def create(**kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            response = create_fn(**kwargs)
+        except Exception as exc:
+            model_tiers.record(task, tier, kwargs.get("model", model), time.perf_counter() - start, False)
+            configured = model_tiers.fallback(kwargs.get("model", model), exc)
+            if configured is None:
+                raise
+            kwargs["model"] = configured
+            start = time.perf_counter()
+            try:
+                response = create_fn(**kwargs)
+            except Exception:
+                model_tiers.record(task, tier, configured, time.perf_counter() - start, False)
+                raise
+        model_tiers.record(
+            task, tier, kwargs.get("model", model), time.perf_counter() - start, True, getattr(response, "usage", None)
+        )
+        return response
+
+    return create
+
+
+def get_tier_chat_client(task: str, system_prompt: str = "You are a helpfule assistant."):
+    """Chat client for an auxiliary call type, on the model of its tier; its requests feed the tier metrics"""
+    from src.utils.llm_client_registry import get_chat_client, llm_client_registry
+
+    tier = model_tiers.resolve(task)
+    chat = get_chat_client(
+        system_prompt=system_prompt,
+        config_list=model_tiers.config_list(tier, llm_client_registry.config_list("basic")),
+    )
+    chat.model_tier = (task, tier)
+    return chat
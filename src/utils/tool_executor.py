@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+import inspect
+import threading
+from functools import partial, wraps
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("REPOMASTER_TOOL_TIMEOUT", "300"))
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_tool_pool() -> ThreadPoolExecutor:
+    """Process wide bounded worker pool shared by every agent session
+
+    Size comes from REPOMASTER_TOOL_WORKERS (default min(8, cpu count + 4)), so several concurrent
+    explorer sessions cannot start an unbounded number of threads.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                max_workers = int(os.getenv("REPOMASTER_TOOL_WORKERS", "0")) or min(8, (os.cpu_count() or 1) + 4)
+                _pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="repomaster-tool")
+    return _pool
+
+
+class ToolExecutionStats:
+    """Per tool call counts, timeouts and wall time of off-thread executions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, Dict[str, float]] = {}
+
+    def record(self, tool_name: str, duration: float, timed_out: bool = False) -> None:
+        with self._lock:
+            stats = self.calls.setdefault(tool_name, {"count": 0, "timeouts": 0, "total_s": 0.0, "max_s": 0.0})
+            stats["count"] += 1
+            stats["timeouts"] += int(timed_out)
+            stats["total_s"] += duration
+            stats["max_s"] = max(stats["max_s"], duration)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self.calls.items()}
+
+
+tool_execution_stats = ToolExecutionStats()
+
+
+async def run_tool_off_thread(func: Callable, *args, timeout: Optional[float] = None, tool_name: Optional[str] = None, **kwargs) -> Any:
+    """Run a blocking tool function in the worker pool without blocking the event loop
+
+    On timeout an error string is returned to the agent, like other tool failures. The worker thread
+    cannot be interrupted and finishes in the background, but the conversation continues.
+    """
+    tool_name = tool_name or getattr(func, "__name__", "tool")
+    timeout = DEFAULT_TOOL_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    future = loop.run_in_executor(get_tool_pool(), partial(func, *args, **kwargs))
+    try:
+        if timeout and timeout > 0:
+            result = await asyncio.wait_for(future, timeout=timeout)
+        else:
+            result = await future
+    except asyncio.TimeoutError:
+        tool_execution_stats.record(tool_name, time.perf_counter() - start, timed_out=True)
+        print(f"[ToolExecutor] {tool_name} timed out after {timeout}s", flush=True)
+        return f"Error: tool {tool_name} timed out after {timeout} seconds. Try a narrower query or a more specific path."
+    tool_execution_stats.record(tool_name, time.perf_counter() - start)
+    return result
+
+
+def make_async_tool(func: Callable, timeout: Optional[float] = None) -> Callable:
+    """Wrap a synchronous tool so AutoGen awaits it while it runs in the worker pool
+
+    The wrapper keeps the signature and annotations of the original function, so the generated
+    tool schema is unchanged. Coroutine functions are returned as is.
+    """
+    if inspect.iscoroutinefunction(func):
+        return func
+
+    @wraps(func)
+    async def async_tool(*args, **kwargs):
+        return await run_tool_off_thread(func, *args, timeout=timeout, tool_name=func.__name__, **kwargs)
+
+    return async_tool
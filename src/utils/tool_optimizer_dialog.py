@@ -4,7 +4,8 @@ import json
 import ast
 import os
 from datetime import datetime
-from src.utils.agent_gpt4 import AzureGPT4Chat  # Assuming the previous code is in azure_gpt4_chat.py
+from src.utils.llm_tiers import get_tier_chat_client
+from src.utils.usage_accounting import record_usage
 from src.core.code_utils import get_code_abs_token
 
 # Import the prompt template
@@ -45,8 +46,6 @@ def _get_token_length(data):
 def _log_compression_stats(optimiz_type, before_length, after_length, tool_response_tokens=0):
     try:
         log_dir = os.path.join(os.getcwd(), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        log_path = os.path.join(log_dir, "token_usage.log")
         entry = {
             "ts": datetime.now().isoformat(),
             "type": "context_compression",
@@ -55,8 +54,7 @@ def _log_compression_stats(optimiz_type, before_length, after_length, tool_respo
             "compressed_chars": after_length,
             "tool_response_tokens": tool_response_tokens,
         }
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        record_usage(log_dir, entry)
     except Exception:
         pass
 
@@ -124,7 +122,7 @@ def get_optimization(original_dialogue, optimiz_type, max_retries=5):
     """
     Optimize the given dialogue using GPT-4 and return the optimized version.
     """
-    gpt4_chat = AzureGPT4Chat(system_prompt="You are a helpful AI assistant.")
+    gpt4_chat = get_tier_chat_client("dialog_optimization", system_prompt="You are a helpful AI assistant.")
     original_length = _get_text_length(original_dialogue)
     
     for attempt in range(max_retries):
@@ -1,11 +1,14 @@
 import uuid
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from dotenv import load_dotenv
 from openai import OpenAI
 from openai import AzureOpenAI
 from functools import partial
 
-from typing import List, Dict, Annotated, Callable
+from typing import List, Dict, Annotated, Callable, Tuple
 
 from langchain.schema import Document
 from langchain_community.vectorstores import Chroma
@@ -15,6 +18,8 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.retrievers import EnsembleRetriever
 from langchain_community.retrievers import BM25Retriever
 
+from src.utils.hybrid_search import BM25Index, reciprocal_rank_fusion
+
 def get_embeddings(model_name="text-embedding-ada-002", use_local_embedding=False, local_model_name=None):
     """
     Get embedding model, decide whether to use standard OpenAI, Azure OpenAI or local model based on environment variables
@@ -170,7 +175,10 @@ class EmbeddingMatcher:
         persistent_db=False,
         persistent_db_path="db/persistent_chroma",
         persistent_collection_name="persistent_collection",
-        initial_docs=None
+        initial_docs=None,
+        embedding_batch_size=100,
+        embedding_workers=4,
+        embedding_max_retries=3,
     ):
         self.topk = topk
         self.chunk_size = chunk_size
@@ -196,6 +204,18 @@ class EmbeddingMatcher:
         )
         
         self.document_converter = document_converter or partial(self._prepare_documents)
+        
+        # Embedding batching
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_workers = embedding_workers
+        self.embedding_max_retries = embedding_max_retries
+        
+        # Hybrid index: documents, normalized embedding matrix and BM25 postings built once per corpus
+        self.documents: List[Document] = []
+        self.doc_matrix = None
+        self.bm25_index = None
+        self.index_build_time = 0.0
+        self.query_latencies: List[float] = []
             
         # Persistent database settings
         self.persistent_db = persistent_db
@@ -273,11 +293,61 @@ class EmbeddingMatcher:
             metadata=document.metadata
         ) for split in splits]
 
+    def _embed_batch(self, batch: List[str]):
+        """Embed one batch, backing off only when the API reports an error"""
+        for attempt in range(self.embedding_max_retries):
+            try:
+                return self.embeddings.embed_documents(batch)
+            except Exception as e:
+                if attempt == self.embedding_max_retries - 1:
+                    print(f"Error embedding batch of {len(batch)} documents: {e}", flush=True)
+                    return None
+                delay = min(2 ** attempt, 30)
+                print(f"Embedding batch failed ({e}), retrying in {delay}s", flush=True)
+                time.sleep(delay)
+
+    def _embed_documents(self, documents: List[Document]):
+        """Embed documents in concurrent batches
+        
+        Returns:
+            Tuple of (documents that were embedded, their embedding vectors)
+        """
+        batch_size = self.embedding_batch_size
+        batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+        if not batches:
+            return [], []
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.embedding_workers, len(batches)))) as pool:
+            batch_vectors = list(pool.map(self._embed_batch, [[doc.page_content for doc in batch] for batch in batches]))
+        
+        embedded_docs, vectors = [], []
+        for batch, batch_result in zip(batches, batch_vectors):
+            if batch_result is None:
+                continue
+            embedded_docs.extend(batch)
+            vectors.extend(batch_result)
+        return embedded_docs, vectors
+
+    def _build_hybrid_index(self, documents: List[Document], vectors) -> None:
+        """Build the normalized embedding matrix and the BM25 index over the same documents"""
+        self.documents = list(documents)
+        if not self.documents:
+            self.doc_matrix = None
+            self.bm25_index = None
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.doc_matrix = matrix / norms
+        self.bm25_index = BM25Index([doc.page_content for doc in self.documents])
+
     def _prepare_vectorstore_for_search(self, docs, persistent=False):
-        """Prepare documents and create vector store
+        """Prepare documents and build the hybrid search index
             docs: Documents to process
-            persistent: Whether to create persistent storage, default False
+            persistent: Whether to also write the embeddings to the persistent Chroma store, default False
         """
+        start_time = time.perf_counter()
+        
         # First use document_converter to convert documents
         initial_documents = self.document_converter(docs)
         
@@ -285,68 +355,50 @@ class EmbeddingMatcher:
         documents = []
         for doc in initial_documents:
             documents.extend(self.split_document(doc))
-        # import pdb; pdb.set_trace()
-        
-        collection_name = self.persistent_collection_name if persistent else f"matcher_{uuid.uuid4().hex}"
-        persist_directory = self.persistent_db_path if persistent else f"db/tmp/chroma_{collection_name}"
-        
-        max_docs_iter = 100
-        if len(documents)>max_docs_iter:
-            self.vectorstore_db = Chroma.from_documents(
-                documents[:max_docs_iter], 
-                self.embeddings, 
-                collection_name=collection_name,
-                persist_directory=persist_directory
-            )
-            import time 
-            slice_size = max_docs_iter
-            # Calculate remaining document count
-            remaining_docs = len(documents) - max_docs_iter
-            # Calculate how many batches needed
-            batch_count = (remaining_docs + slice_size - 1) // slice_size  # Round up
-            print(f"Remaining {remaining_docs} documents, will be processed in {batch_count} batches, {slice_size} documents per batch")
-            
-            # Prepare batch document addition
-            for batch_idx in range(batch_count):
-                start_idx = max_docs_iter + batch_idx * slice_size
-                end_idx = min(start_idx + slice_size, len(documents))
-                batch_docs = documents[start_idx:end_idx]
-                
-                if batch_docs:
-                    try:
-                        # import pdb; pdb.set_trace()
-                        self.vectorstore_db.add_documents(batch_docs)
-                        print(f"Added batch {batch_idx+1}/{batch_count} documents, {len(batch_docs)} items", flush=True)
-                    except Exception as e:
-                        print(f"Error adding batch {batch_idx+1} documents: {e}", flush=True)
-                        
-                    # Brief pause after each batch to avoid API limits
-                    if batch_idx < batch_count - 1:
-                        time.sleep(1)
-                
-        else:
-            self.vectorstore_db = Chroma.from_documents(
-                documents, 
-                self.embeddings, 
-                collection_name=collection_name,
-                persist_directory=persist_directory
-            )
-            
+        
+        documents, vectors = self._embed_documents(documents)
+        self._build_hybrid_index(documents, vectors)
         
         if persistent:
-            self.vectorstore_db.persist()
+            self.vectorstore_db = Chroma(
+                collection_name=self.persistent_collection_name,
+                embedding_function=self.embeddings,
+                persist_directory=self.persistent_db_path
+            )
+            self._add_embeddings_to_chroma(documents, vectors)
             print(f"Created persistent database, path: {self.persistent_db_path}, collection name: {self.persistent_collection_name}", flush=True)
         
+        self.index_build_time = time.perf_counter() - start_time
         return documents
 
-    def _cleanup_vectorstore(self):
-        """Clean up Chroma resources."""
-        if self.vectorstore_db:
-            self.vectorstore_db.delete_collection()
-            if self.persistent_db and self.persist_directory:
-                import shutil
-                if os.path.exists(self.persist_directory):
-                    shutil.rmtree(self.persist_directory)
+    def _add_embeddings_to_chroma(self, documents: List[Document], vectors) -> None:
+        """Store precomputed embeddings in the Chroma collection without embedding again"""
+        for start in range(0, len(documents), self.embedding_batch_size):
+            batch_docs = documents[start:start + self.embedding_batch_size]
+            batch_vectors = vectors[start:start + self.embedding_batch_size]
+            self.vectorstore_db._collection.upsert(
+                ids=[uuid.uuid4().hex for _ in batch_docs],
+                embeddings=[list(map(float, v)) for v in batch_vectors],
+                documents=[doc.page_content for doc in batch_docs],
+                metadatas=[self._simplify_metadata(doc.metadata) or {"source": "matcher"} for doc in batch_docs],
+            )
+        if hasattr(self.vectorstore_db, "persist"):
+            try:
+                self.vectorstore_db.persist()
+            except Exception:
+                # Newer Chroma versions persist automatically
+                pass
+
+    def _index_state(self):
+        return self.documents, self.doc_matrix, self.bm25_index
+
+    def _cleanup_vectorstore(self, previous_index=None):
+        """Drop the in-memory index built for one query and restore the index it replaced
+
+        The Chroma store (self.vectorstore_db) is never touched: per-query documents are only
+        indexed in memory, and a loaded persistent index comes back after the query.
+        """
+        self.documents, self.doc_matrix, self.bm25_index = previous_index or ([], None, None)
 
     def _default_similarity_processor(self, results):
         """Default similarity search result processor"""
@@ -365,14 +417,23 @@ class EmbeddingMatcher:
         return matched_docs
 
     def _load_persistent_db(self):
-        """Load persistent vector database"""
+        """Load persistent vector database and its stored embeddings into the hybrid index"""
         if os.path.exists(self.persistent_db_path):
+            start_time = time.perf_counter()
             self.vectorstore_db = Chroma(
                 collection_name=self.persistent_collection_name,
                 embedding_function=self.embeddings,
                 persist_directory=self.persistent_db_path
             )
-            print(f"Loaded persistent database, path: {self.persistent_db_path}, collection name: {self.persistent_collection_name}")
+            stored = self.vectorstore_db.get(include=["embeddings", "documents", "metadatas"])
+            documents = [
+                Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(stored["documents"], stored["metadatas"])
+            ]
+            self._build_hybrid_index(documents, stored["embeddings"])
+            self.index_build_time = time.perf_counter() - start_time
+            print(f"Loaded persistent database, path: {self.persistent_db_path}, collection name: {self.persistent_collection_name}, "
+                  f"{len(documents)} documents in {self.index_build_time:.2f}s")
         else:
             raise ValueError(f"Persistent database path does not exist: {self.persistent_db_path}")
 
@@ -387,13 +448,39 @@ class EmbeddingMatcher:
         if self.vectorstore_db is None:
             self._load_persistent_db()
         
-        # Add documents
-        self.vectorstore_db.add_documents(documents)
-        
-        # Persist to disk
-        self.vectorstore_db.persist()
+        # Embed once, then update both the Chroma store and the in-memory index
+        documents, vectors = self._embed_documents(documents)
+        self._add_embeddings_to_chroma(documents, vectors)
+        existing_vectors = self.doc_matrix.tolist() if self.doc_matrix is not None else []
+        self._build_hybrid_index(self.documents + documents, existing_vectors + [list(v) for v in vectors])
         print(f"Added {len(documents)} documents to persistent database")
 
+    def _vector_search(self, user_input: str, k: int) -> List[Tuple[int, float]]:
+        """Cosine similarity search over the preloaded embedding matrix"""
+        if self.doc_matrix is None or not len(self.documents):
+            return []
+        query = np.asarray(self.embeddings.embed_query(user_input), dtype=np.float32)
+        query /= (np.linalg.norm(query) or 1.0)
+        scores = self.doc_matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def _record_query_latency(self, start_time: float) -> None:
+        self.query_latencies.append(time.perf_counter() - start_time)
+
+    def get_timing_stats(self) -> Dict[str, float]:
+        """Index build time and query latency statistics in seconds"""
+        latencies = sorted(self.query_latencies)
+        return {
+            "documents": len(self.documents),
+            "index_build_time": round(self.index_build_time, 4),
+            "queries": len(latencies),
+            "query_latency_avg": round(sum(latencies) / len(latencies), 6) if latencies else 0.0,
+            "query_latency_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 6) if latencies else 0.0,
+        }
+
     def match_docs(self, user_input, docs=None, result_processor=None):
         """
         Execute similarity search
@@ -401,15 +488,20 @@ class EmbeddingMatcher:
         Parameters:
             user_input: User input query
             docs: Documents to search, if None and persistent database is enabled, use persistent database
-            result_processor: Optional result processing function
+            result_processor: Optional result processing function, receives (Document, distance) pairs,
+                lower is closer, as Chroma's similarity_search_with_score reports them
         """
+        previous_index = self._index_state() if docs is not None else None
         if docs is not None:
             self._prepare_vectorstore_for_search(docs)
 
-        results = self.vectorstore_db.similarity_search_with_score(user_input, k=self.topk)
+        start_time = time.perf_counter()
+        # Squared L2 distance of the normalized embeddings (Chroma's default space): 2 - 2 * cosine
+        results = [(self.documents[i], 2.0 - 2.0 * score) for i, score in self._vector_search(user_input, self.topk)]
+        self._record_query_latency(start_time)
         
         if docs is not None or not self.persistent_db:
-            self._cleanup_vectorstore()
+            self._cleanup_vectorstore(previous_index)
 
         # Process results
         processor = result_processor or self._default_similarity_processor
@@ -417,41 +509,34 @@ class EmbeddingMatcher:
 
     def match_docs_with_bm25(self, user_input, docs=None, result_processor=None):
         """
-        Execute BM25 and vector search ensemble retrieval
+        Execute BM25 and vector hybrid retrieval with reciprocal rank fusion
         
         Parameters:
             user_input: User input query
             docs: Documents to search, if None and persistent database is enabled, use persistent database
             result_processor: Optional result processing function
         """
+        previous_index = self._index_state() if docs is not None else None
         if docs is not None:
             self._prepare_vectorstore_for_search(docs)
-            
-        # First use vector search to get topk*2 documents instead of loading all documents
-        initial_retriever_results = self.vectorstore_db.similarity_search(
-            user_input, 
-            k=max(self.topk*10, 100)
-        )
-        
-        # Create BM25 retriever
-        bm25_retriever = BM25Retriever.from_documents(initial_retriever_results)
-        bm25_retriever.k = self.topk
         
-        # Create ensemble retriever
-        ensemble_retriever = EnsembleRetriever(
-            retrievers=[self.vectorstore_db.as_retriever(search_kwargs={"k": self.topk}), bm25_retriever],
-            weights=[self.embedding_weight, 1 - self.embedding_weight]
+        start_time = time.perf_counter()
+        candidates = max(self.topk * 10, 100)
+        vector_ranking = [i for i, _ in self._vector_search(user_input, candidates)]
+        bm25_ranking = [i for i, _ in self.bm25_index.search(user_input, candidates)] if self.bm25_index else []
+        fused = reciprocal_rank_fusion(
+            [vector_ranking, bm25_ranking],
+            weights=[self.embedding_weight, 1 - self.embedding_weight],
         )
-        
-        # Retrieve documents
-        results = ensemble_retriever.get_relevant_documents(user_input)
+        results = [self.documents[i] for i, _ in fused[:self.topk]]
+        self._record_query_latency(start_time)
         
         if docs is not None or not self.persistent_db:
-            self._cleanup_vectorstore()
+            self._cleanup_vectorstore(previous_index)
         
         # Process results
         processor = result_processor or self._default_ensemble_processor
-        return processor(results[:self.topk])
+        return processor(results)
 
     def retrieve_docs(self, user_input, docs, result_processor=None):
         """
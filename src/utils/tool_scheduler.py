@@ -0,0 +1,69 @@
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+def _tool_call_name(tool_call: Dict[str, Any]) -> str:
+    return (tool_call.get("function") or {}).get("name", "")
+
+
+class ToolCallScheduler:
+    """Run the tool calls of one assistant message concurrently where it is safe
+
+    Tools declared side-effect-free (read-only queries, web searches) run in parallel, at most
+    max_concurrency at a time. Every other tool is exclusive: it starts after all earlier calls
+    have finished and later calls wait for it, so writes and shell commands keep the order the
+    model asked for. Results are returned in the order of the tool calls.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv("REPOMASTER_TOOL_CALL_CONCURRENCY", "4"))
+        self.side_effect_free: Set[str] = set()
+        self.stats = {"messages": 0, "calls": 0, "parallel_calls": 0, "max_parallel": 0}
+
+    def declare(self, name: str, side_effect_free: bool = False) -> None:
+        if side_effect_free:
+            self.side_effect_free.add(name)
+        else:
+            self.side_effect_free.discard(name)
+
+    def is_side_effect_free(self, tool_call: Dict[str, Any]) -> bool:
+        return _tool_call_name(tool_call) in self.side_effect_free
+
+    async def run(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        execute: Callable[[Dict[str, Any]], Awaitable[Any]],
+    ) -> List[Any]:
+        """Execute tool calls and return their results in call order"""
+        results: List[Any] = [None] * len(tool_calls)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        running: List[asyncio.Task] = []
+
+        async def _run_one(index: int, tool_call: Dict[str, Any]) -> None:
+            async with semaphore:
+                results[index] = await execute(tool_call)
+
+        async def _drain() -> None:
+            if running:
+                self.stats["max_parallel"] = max(self.stats["max_parallel"], min(len(running), self.max_concurrency))
+                if len(running) > 1:
+                    self.stats["parallel_calls"] += len(running)
+                await asyncio.gather(*running)
+                running.clear()
+
+        try:
+            for index, tool_call in enumerate(tool_calls):
+                if self.is_side_effect_free(tool_call):
+                    running.append(asyncio.ensure_future(_run_one(index, tool_call)))
+                    continue
+                await _drain()
+                results[index] = await execute(tool_call)
+            await _drain()
+        finally:
+            for task in running:
+                task.cancel()
+
+        self.stats["messages"] += 1
+        self.stats["calls"] += len(tool_calls)
+        return results
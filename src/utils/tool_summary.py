@@ -1,4 +1,4 @@
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.llm_client_registry import get_chat_client
 from textwrap import dedent
 
 def generate_summary(messages):
@@ -24,8 +24,8 @@ def generate_summary(messages):
     </history_messages>
     """)
 
-    # Use AzureGPT4Chat to generate summary
-    llm = AzureGPT4Chat()
+    # Use the shared chat client to generate summary
+    llm = get_chat_client()
     summary = llm.chat_with_message_format(question=summary_prompt, system_prompt=system_prompt)
     return summary
 
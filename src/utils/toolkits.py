@@ -1,9 +1,11 @@
-from typing import List, Callable
+from typing import Dict, List, Callable, Iterable, Optional
 from functools import wraps
 from pandas import DataFrame
 from autogen import register_function, ConversableAgent
 import inspect
 
+from src.utils.tool_executor import make_async_tool
+
 
 def stringify_output(func):
     @wraps(func)
@@ -24,14 +26,39 @@ def register_toolkits(
     config: List[Callable],
     caller: ConversableAgent,
     executor: ConversableAgent,
+    offload_sync: bool = False,
+    tool_timeouts: Optional[Dict[str, float]] = None,
+    default_timeout: Optional[float] = None,
+    side_effect_free_tools: Optional[Iterable[str]] = None,
     **kwargs
 ):
-    """Register tools from a configuration list."""
+    """Register tools from a configuration list.
+
+    Args:
+        offload_sync: Register synchronous tools as async wrappers running in the shared worker
+            pool, so blocking tools do not stall the event loop of async chats
+        tool_timeouts: Per tool name timeout in seconds for offloaded tools
+        default_timeout: Timeout for offloaded tools without an entry in tool_timeouts
+        side_effect_free_tools: Names of tools the executor may run concurrently with other calls
+            of the same message; all other tools run exclusively, in call order
+
+    A tool can also be given as a dict with "function" and optional "name", "description",
+    "offload", "timeout" and "side_effect_free" keys.
+    """
+    tool_timeouts = tool_timeouts or {}
+    side_effect_free_tools = set(side_effect_free_tools or ())
 
     for tool in config:
 
         if isinstance(tool, type):
-            register_tookits_from_cls(caller, executor, tool, **kwargs)
+            register_tookits_from_cls(
+                caller, executor, tool,
+                offload_sync=offload_sync,
+                tool_timeouts=tool_timeouts,
+                default_timeout=default_timeout,
+                side_effect_free_tools=side_effect_free_tools,
+                **kwargs
+            )
             continue
 
         tool_dict = {"function": tool} if callable(tool) else tool
@@ -43,6 +70,9 @@ def register_toolkits(
         tool_function = tool_dict["function"]
         name = tool_dict.get("name", tool_function.__name__)
         description = tool_dict.get("description", tool_function.__doc__)
+        if tool_dict.get("offload", offload_sync):
+            timeout = tool_dict.get("timeout", tool_timeouts.get(name, default_timeout))
+            tool_function = make_async_tool(tool_function, timeout=timeout)
         register_function(
             stringify_output(tool_function),
             caller=caller,
@@ -50,6 +80,9 @@ def register_toolkits(
             name=name,
             description=description,
         )
+        declare_tool = getattr(executor, "declare_tool", None)
+        if declare_tool is not None:
+            declare_tool(name, side_effect_free=tool_dict.get("side_effect_free", name in side_effect_free_tools))
 
 
 
@@ -58,6 +91,7 @@ def register_tookits_from_cls(
     executor: ConversableAgent,
     cls: type,
     include_private: bool = False,
+    **kwargs
 ):
     """Register all methods of a class as tools."""
     if include_private:
@@ -74,4 +108,4 @@ def register_tookits_from_cls(
             and not func.startswith("__")
             and not func.startswith("_")
         ]
-    register_toolkits([getattr(cls, func) for func in funcs], caller, executor)
+    register_toolkits([getattr(cls, func) for func in funcs], caller, executor, **kwargs)
@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+
+DEFAULT_USAGE_DB_PATH = os.getenv("USAGE_DB_PATH", "db/usage/usage.sqlite")
+USAGE_LOG_NAME = "token_usage.log"
+
+# calls, prompt_tokens, completion_tokens, total_tokens, cached_tokens, then responses served from the
+# LLM response cache and the tokens they would have cost (not spend, kept out of the other counters)
+_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "cached_tokens", "cache_hits", "saved_tokens")
+
+
+def _session_key(log_dir: str) -> str:
+    return os.path.abspath(log_dir)
+
+
+def _usage_counts(entry: Dict[str, Any]) -> Optional[list]:
+    usage = entry.get("usage")
+    if not isinstance(usage, dict):
+        return None
+    prompt = int(usage.get("prompt_tokens") or 0)
+    completion = int(usage.get("completion_tokens") or 0)
+    total = int(usage.get("total_tokens") or (prompt + completion))
+    if entry.get("response_cache_hit"):
+        # The stored usage of a cached response: nothing was sent, the tokens were saved
+        return [0, 0, 0, 0, 0, 1, total]
+    return [1, prompt, completion, total, int(usage.get("cached_tokens") or 0), 0, 0]
+
+
+class UsageAccountant:
+    """Running token usage per session, model and agent
+
+    A session is the directory whose token_usage.log the entry belongs to (the agent's work_dir
+    or ./logs). Counters live in memory, so totals and cost for a session are answered without
+    touching the log. A background thread flushes the counter deltas every flush_interval_s to a
+    small SQLite table with one row per (session, model, agent); a session seen again after a
+    restart is loaded from there once. Sessions recorded before this store existed are imported
+    from their token_usage.log the first time they are used.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_USAGE_DB_PATH, flush_interval_s: Optional[float] = None):
+        self.db_path = db_path
+        self.flush_interval_s = flush_interval_s or float(os.getenv("USAGE_FLUSH_INTERVAL_S", "5"))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._totals: Dict[str, Dict[Tuple[str, str], list]] = {}
+        self._pending: Dict[Tuple[str, str, str], list] = defaultdict(lambda: [0] * len(_FIELDS))
+        # Bytes appended to each log by record_usage since the last flush: already accounted, never imported
+        self._log_written: Dict[str, int] = defaultdict(int)
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._price_map: Optional[Dict[str, Tuple[float, float]]] = None
+
+        self.flushes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage_totals ("
+                "session TEXT NOT NULL, model TEXT NOT NULL, agent TEXT NOT NULL, "
+                "calls INTEGER NOT NULL, prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+                "total_tokens INTEGER NOT NULL, cached_tokens INTEGER NOT NULL, "
+                "cache_hits INTEGER NOT NULL DEFAULT 0, saved_tokens INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL, "
+                "PRIMARY KEY (session, model, agent))"
+            )
+            # Stores created before the response cache counters
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(usage_totals)")}
+            for field in _FIELDS:
+                if field not in columns:
+                    self._conn.execute(f"ALTER TABLE usage_totals ADD COLUMN {field} INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS imported_logs (path TEXT PRIMARY KEY, offset INTEGER NOT NULL, imported REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="usage-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval_s):
+            self.flush()
+
+    def _add(self, session: str, model: str, agent: str, counts: list) -> None:
+        """Add counts to the in-memory totals and the pending deltas (caller holds the lock)"""
+        row = self._totals[session].setdefault((model, agent), [0] * len(_FIELDS))
+        pending = self._pending[(session, model, agent)]
+        for i, value in enumerate(counts):
+            row[i] += value
+            pending[i] += value
+
+    def _ensure_loaded(self, session: str) -> None:
+        """Load a session's stored totals once; import its legacy log if it was never accounted (caller holds the lock)"""
+        if session in self._totals:
+            return
+        db = self._db()
+        self._totals[session] = {}
+        for model, agent, *counts in db.execute(
+            "SELECT model, agent, " + ", ".join(_FIELDS) + " FROM usage_totals WHERE session = ?", (session,)
+        ):
+            self._totals[session][(model, agent)] = list(counts)
+        log_path = os.path.join(session, USAGE_LOG_NAME)
+        if db.execute("SELECT 1 FROM imported_logs WHERE path = ?", (log_path,)).fetchone() is None:
+            self._import_log(session, log_path)
+
+    def _import_log(self, session: str, log_path: str) -> int:
+        """Add the usage entries of log_path beyond its last imported offset (caller holds the lock)"""
+        db = self._db()
+        row = db.execute("SELECT offset FROM imported_logs WHERE path = ?", (log_path,)).fetchone()
+        offset = row[0] if row else 0
+        imported = 0
+        if os.path.exists(log_path):
+            with open(log_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    counts = _usage_counts(entry) if isinstance(entry, dict) else None
+                    if counts:
+                        self._add(session, entry.get("model") or "unknown", entry.get("agent") or "", counts)
+                        imported += 1
+        db.execute(
+            "INSERT OR REPLACE INTO imported_logs (path, offset, imported) VALUES (?, ?, ?)",
+            (log_path, offset, time.time()),
+        )
+        db.commit()
+        return imported
+
+    def record(self, log_dir: str, entry: Dict[str, Any]) -> None:
+        session = _session_key(log_dir)
+        counts = _usage_counts(entry)
+        with self._lock:
+            self._ensure_loaded(session)
+            if counts:
+                self._add(session, entry.get("model") or "unknown", entry.get("agent") or "", counts)
+        self._start_flusher()
+
+    def log_written(self, log_dir: str, num_bytes: int) -> None:
+        """Note a line appended to the session's log after record(), so a later import skips it"""
+        with self._lock:
+            self._log_written[os.path.join(_session_key(log_dir), USAGE_LOG_NAME)] += num_bytes
+
+    def flush(self) -> None:
+        """Write pending counter deltas to the store"""
+        with self._lock:
+            if not self._pending and not self._log_written:
+                return
+            pending, self._pending = self._pending, defaultdict(lambda: [0] * len(_FIELDS))
+            log_written, self._log_written = self._log_written, defaultdict(int)
+            now = time.time()
+            db = self._db()
+            db.executemany(
+                "UPDATE imported_logs SET offset = offset + ? WHERE path = ?",
+                [(num_bytes, path) for path, num_bytes in log_written.items()],
+            )
+            db.executemany(
+                "INSERT INTO usage_totals (session, model, agent, " + ", ".join(_FIELDS) + ", updated) "
+                "VALUES (" + ", ".join("?" * (len(_FIELDS) + 4)) + ") ON CONFLICT (session, model, agent) DO UPDATE SET "
+                + ", ".join(f"{f} = {f} + excluded.{f}" for f in _FIELDS) + ", updated = excluded.updated",
+                [(*key, *counts, now) for key, counts in pending.items()],
+            )
+            db.commit()
+            self.flushes += 1
+
+    def import_log(self, log_path: str) -> int:
+        """Migrate an existing token_usage.log into the store; re-importing only adds new lines"""
+        session = _session_key(os.path.dirname(log_path) or ".")
+        self.flush()
+        with self._lock:
+            self._ensure_loaded(session)
+            imported = self._import_log(session, os.path.join(session, os.path.basename(log_path)))
+        self.flush()
+        return imported
+
+    def session_totals(self, log_dir: str, by: str = "model") -> Dict[str, Dict[str, int]]:
+        """Token totals of a session by "model" or "agent" """
+        session = _session_key(log_dir)
+        with self._lock:
+            self._ensure_loaded(session)
+            rows = list(self._totals[session].items())
+        totals: Dict[str, Dict[str, int]] = {}
+        for (model, agent), counts in rows:
+            bucket = totals.setdefault(model if by == "model" else agent, dict.fromkeys(_FIELDS, 0))
+            for field, value in zip(_FIELDS, counts):
+                bucket[field] += value
+        return totals
+
+    def price_map(self) -> Dict[str, Tuple[float, float]]:
+        """(prompt, completion) price per 1k tokens by model, from the oai_config price entries"""
+        if self._price_map is None:
+            price_map = {}
+            try:
+                from configs.oai_config import get_api_config
+                for provider in get_api_config().values():
+                    for cfg in provider.get("config_list", []):
+                        price = cfg.get("price")
+                        if cfg.get("model") and isinstance(price, list) and len(price) == 2:
+                            price_map[cfg["model"]] = (float(price[0]), float(price[1]))
+            except Exception:
+                pass
+            self._price_map = price_map
+        return self._price_map
+
+    def session_cost(self, log_dir: str) -> Dict[str, Any]:
+        """Totals and estimated cost by model for a session; total_cost is None when no model has a price"""
+        prices = self.price_map()
+        models = {}
+        total_cost = None
+        for model, counts in self.session_totals(log_dir).items():
+            cost = None
+            if model in prices:
+                prompt_price, completion_price = prices[model]
+                cost = counts["prompt_tokens"] / 1000.0 * prompt_price + counts["completion_tokens"] / 1000.0 * completion_price
+                total_cost = (total_cost or 0.0) + cost
+            models[model] = {**counts, "cost": cost}
+        return {"models": models, "total_cost": total_cost}
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+usage_accountant = UsageAccountant()
+
+
+def record_usage(log_dir: str, entry: Dict[str, Any]) -> None:
+    """Account an LLM usage entry and append it to <log_dir>/token_usage.log
+
+    Set TOKEN_USAGE_LOG=0 to keep only the aggregated counters and skip the per-call log line.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    usage_accountant.record(log_dir, entry)
+    if os.getenv("TOKEN_USAGE_LOG", "1").lower() in ("0", "false", "no"):
+        return
+    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    with open(os.path.join(log_dir, USAGE_LOG_NAME), "ab") as f:
+        f.write(line)
+    usage_accountant.log_written(log_dir, len(line))
+
+
+def main(argv: Optional[list] = None) -> None:
+    """python -m src.utils.usage_accounting import <token_usage.log>... | report <log_dir>"""
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) >= 2 and argv[0] == "import":
+        for path in argv[1:]:
+            print(f"{path}: imported {usage_accountant.import_log(path)} usage entries")
+    elif len(argv) == 2 and argv[0] == "report":
+        print(json.dumps(usage_accountant.session_cost(argv[1]), ensure_ascii=False, indent=2))
+    else:
+        print(main.__doc__)
+
+
+if __name__ == "__main__":
+    main()
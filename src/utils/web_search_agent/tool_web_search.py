@@ -1,6 +1,7 @@
 import json
 from typing import List, Dict, Annotated, Optional, Any
-from src.utils.agent_gpt4 import AzureGPT4Chat
+from src.utils.llm_client_registry import get_chat_client
+from src.utils.llm_router import get_routed_chat_client
 from src.utils.tools_util import display, get_output_handler
 from src.utils.web_search_agent.tool_web_engine import SerperSearchEngine
 from streamlit_extras.colored_header import colored_header
@@ -64,7 +65,7 @@ class WebSearchAgent:
             context = self._prepare_context(all_search_results)
             display(f"📊 Context: {len(context)} characters | {len(search_results)} results", output_handler=output_handler)
             
-            has_sufficient_info = self._has_sufficient_information(query, context)
+            has_sufficient_info = await self._has_sufficient_information(query, context)
             display(f"✅ Sufficient Information: {'Yes' if has_sufficient_info else 'No'}", output_handler=output_handler)
             
             if has_sufficient_info:
@@ -72,7 +73,7 @@ class WebSearchAgent:
                 return all_search_results, context
             
             prev_query = query
-            query = self._improve_query(query, context)
+            query = await self._improve_query(query, context)
             display(f"🔄 Refined Query: {query}", output_handler=output_handler)
             display("---", output_handler=output_handler)
         
@@ -86,18 +87,18 @@ class WebSearchAgent:
             for result in search_results
         ])
 
-    def _has_sufficient_information(self, query: str, context: str) -> bool:
+    async def _has_sufficient_information(self, query: str, context: str) -> bool:
         """Check if there's enough information to answer the query."""
         messages = [
             {"role": "system", "content": SYSTEM_MESSAGE_HAS_SUFFICIENT_INFO},
             {"role": "user", "content": f"Query: {query}\n\nSearch Results:\n{context}\n\nIs there enough information to answer the query?"}
         ]
         
-        response = AzureGPT4Chat().chat_with_message(messages)
+        response = await get_routed_chat_client(latency_critical=True, task="search_sufficiency").a_chat_with_message(messages)
         
         return 'yes' in response.strip().lower()
 
-    def _improve_query(self, query: str, context: str) -> str:
+    async def _improve_query(self, query: str, context: str) -> str:
         """Suggest an improved search query using Think on Graph (ToG) approach."""
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         messages = [
@@ -105,7 +106,7 @@ class WebSearchAgent:
             {"role": "user", "content": f"Initial Query: {query}\n\nSearch Results:\n{context}\n\nImproved query:"}
         ]
         
-        response = AzureGPT4Chat().chat_with_message(messages)
+        response = await get_routed_chat_client(latency_critical=True, task="query_rewrite").a_chat_with_message(messages)
         
         return response    
 
@@ -117,7 +118,7 @@ class WebSearchAgent:
             {"role": "user", "content": f"Query: {query}\n\nSearch Results:\n{context}\n\nAnswer:"}
         ]
         
-        response = AzureGPT4Chat().chat_with_message(messages)
+        response = get_chat_client().chat_with_message(messages)
         
         return response
 
@@ -189,7 +190,7 @@ class WebSearchAgent:
             {"role": "system", "content": "Rate confidence in answering (0-1) based on:"},
             {"role": "user", "content": f"Query: {query}\nContext: {context[:3000]}"}
         ]
-        return float(AzureGPT4Chat().chat_with_message(messages).strip())
+        return float(get_chat_client().chat_with_message(messages).strip())
 
 
 if __name__ == "__main__":
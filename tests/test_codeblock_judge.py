@@ -0,0 +1,54 @@
+import pytest
+
+from src.services.autogen_upgrade.codeblock_judge import rule_based_judge
+
+
+def _blocks(*blocks):
+    return [{"index": i, "language": language, "code": code} for i, (language, code) in enumerate(blocks)]
+
+
+def _order(*blocks):
+    verdict = rule_based_judge(_blocks(*blocks))
+    return verdict["order"] if verdict else None
+
+
+def test_install_before_other_block_is_settled_in_order():
+    assert _order(("sh", "pip install -r requirements.txt"), ("sh", "./scripts/download.sh")) == [0, 1]
+
+
+@pytest.mark.parametrize("setup", [
+    "git clone https://github.com/x/y && cd y",
+    "python -m venv .venv && source .venv/bin/activate",
+])
+def test_block_preparing_the_install_goes_to_the_llm(setup):
+    assert _order(("sh", setup), ("sh", "pip install -r requirements.txt")) is None
+
+
+def test_install_after_other_block_is_not_reordered():
+    assert _order(("sh", "rm -rf build"), ("sh", "pip install -e .")) is None
+
+
+def test_install_python_block_and_run_are_ordered():
+    verdict = rule_based_judge(_blocks(("sh", "python run.py"), ("sh", "pip install torch"), ("python", "print(1)")))
+    assert verdict["order"] == [1, 2, 0]
+    assert verdict["blocks"][2]["target_file"] == "run.py"
+
+
+def test_duplicate_block_is_dropped():
+    verdict = rule_based_judge(_blocks(("python", "print(1)"), ("python", "print(1)")))
+    assert verdict["order"] == [0]
+    assert [block["keep"] for block in verdict["blocks"]] == [True, False]
+
+
+def test_block_extended_by_another_is_dropped():
+    verdict = rule_based_judge(_blocks(("python", "import os"), ("python", "import os\nprint(os.getcwd())")))
+    assert verdict["order"] == [1]
+
+
+def test_later_block_contained_in_an_earlier_one_is_dropped():
+    verdict = rule_based_judge(_blocks(("python", "import os\nprint(os.getcwd())"), ("python", "import os")))
+    assert verdict["order"] == [0]
+
+
+def test_unclear_blocks_go_to_the_llm():
+    assert _order(("sh", "make"), ("sh", "./configure")) is None
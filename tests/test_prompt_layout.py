@@ -0,0 +1,39 @@
+from src.core.prompt_layout import PromptLayout
+
+
+def test_appended_messages_keep_the_prefix():
+    layout = PromptLayout()
+    history = [{"role": "system", "content": "s"}, {"role": "user", "content": "q"}]
+    layout.observe(history)
+    history.append({"role": "assistant", "content": "a"})
+    layout.observe(history)
+    assert layout.last_request["stable_prefix_messages"] == 2
+    assert not layout.last_request["prefix_break"]
+
+
+def test_in_place_edit_is_a_prefix_break():
+    layout = PromptLayout()
+    system = {"role": "system", "content": "s"}
+    layout.observe([system, {"role": "user", "content": "q"}])
+    system["content"] = "updated"
+    layout.observe([system, {"role": "user", "content": "q"}])
+    assert layout.last_request["stable_prefix_messages"] == 0
+    assert layout.stats()["in_place_edits"] == 1
+    assert layout.stats()["prefix_breaks"] == 1
+
+
+def test_rewritten_history_is_a_prefix_break():
+    layout = PromptLayout()
+    layout.observe([{"role": "system", "content": "s"}, {"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}])
+    layout.observe([{"role": "system", "content": "s"}, {"role": "user", "content": "summary"}])
+    assert layout.last_request["stable_prefix_messages"] == 1
+    assert layout.stats()["in_place_edits"] == 0
+
+
+def test_changed_tools_break_the_whole_prefix():
+    layout = PromptLayout()
+    messages = [{"role": "system", "content": "s"}]
+    layout.observe(messages, tools=[{"name": "a"}])
+    layout.observe(messages, tools=[{"name": "b"}])
+    assert layout.last_request["tools_changed"]
+    assert layout.last_request["stable_prefix_messages"] == 0